@@ -0,0 +1,292 @@
+"""
+Maintenance commands over the existing models.
+
+Run with:
+    python admin.py rebuild-indexes
+    python admin.py seed-categories --all-users --workers 4
+    python admin.py export --user-id <id> --output exports/
+    python admin.py recompute-aggregates --all-users --dry-run
+    python admin.py delete-account --user-id <id> --yes
+
+Per-user commands take `--user-id` (repeatable) or `--all-users` (active
+users). Users are processed by `--workers` threads, each sleeping
+`--throttle` seconds between users, so a batch run can be kept gentle on a
+database that also serves the UI. `--dry-run` reports what each command
+would do without writing.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
+
+from bson import ObjectId, json_util
+
+import config
+from database.category_models import CategoryModel
+from database.dashboard_snapshot import DashboardSnapshotModel
+from database.data_version import DataVersionModel
+from database.database_manager import DatabaseManager
+from database.quantile_sketch import QuantileSketchModel
+from database.transaction_buckets import TransactionBucketModel
+from database.transaction_model import TransactionModel
+from database.user_model import UserModel
+
+
+# -----------------------------------------------------------
+# PROGRESS
+# -----------------------------------------------------------
+class Progress:
+    """Single-line progress bar on stderr, safe to update from worker threads"""
+
+    WIDTH = 30
+
+    def __init__(self, label: str, total: int, stream=sys.stderr):
+        self.label = label
+        self.total = total
+        self.stream = stream
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def advance(self, failed: bool = False):
+        with self._lock:
+            self.done += 1
+            self.failed += failed
+            self._draw()
+
+    def _draw(self):
+        filled = self.WIDTH * self.done // self.total if self.total else self.WIDTH
+        failed = f", {self.failed} failed" if self.failed else ""
+        self.stream.write(
+            f"\r{self.label} [{'#' * filled}{'.' * (self.WIDTH - filled)}] "
+            f"{self.done}/{self.total}{failed} {time.monotonic() - self.started:.1f}s"
+        )
+        if self.done == self.total:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+def run_for_users(label: str, user_ids: list[str], action: Callable[[str], dict],
+                  workers: int = 1, throttle_seconds: float = 0.0) -> dict:
+    """
+    Apply `action` to every user with a thread pool.
+
+    Returns:
+        dict: {user_id: result dict, or {'error': message} when it raised}
+    """
+    progress = Progress(label, len(user_ids))
+    results = {}
+
+    def run(user_id):
+        try:
+            return action(user_id)
+        finally:
+            if throttle_seconds:
+                time.sleep(throttle_seconds)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="admin") as executor:
+        futures = {executor.submit(run, user_id): user_id for user_id in user_ids}
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                results[user_id] = future.result()
+                progress.advance()
+            except Exception as e:
+                results[user_id] = {"error": str(e)}
+                progress.advance(failed=True)
+    return results
+
+
+# -----------------------------------------------------------
+# COMMANDS
+# -----------------------------------------------------------
+def rebuild_indexes(dry_run: bool = False) -> dict:
+    """(Re)create the indexes of the main database and every partition"""
+    db_manager = DatabaseManager()
+    databases = [db_manager.db] + db_manager._partition_databases()
+
+    def index_count():
+        return sum(len(db[name].index_information()) for db in databases for name in db.list_collection_names())
+
+    before = index_count()
+    if dry_run:
+        return {"databases": len(databases), "indexes": before}
+    failures = db_manager._create_index()
+    return {
+        "databases": len(databases), "indexes_before": before, "indexes_after": index_count(), "failed": failures
+    }
+
+
+def seed_categories(user_id: str, dry_run: bool = False) -> dict:
+    """Create the default categories a user is missing"""
+    defaults = {"Expense": config.DEFAULT_CATEGORIES_EXPENSE, "Income": config.DEFAULT_CATEGORIES_INCOME}
+    present = CategoryModel().collection.find(
+        {"user_id": ObjectId(user_id)}, {"type": 1, "name": 1}
+    )
+    present = {(c["type"], c["name"]) for c in present}
+    missing = [(t, name) for t, names in defaults.items() for name in names if (t, name) not in present]
+
+    if missing and not dry_run:
+        CategoryModel.drop_catalog(user_id)
+        # CategoryModel(user_id) creates the defaults that are missing
+        CategoryModel(user_id)
+    return {"missing": len(missing)} if dry_run else {"created": len(missing)}
+
+
+def export_user(user_id: str, output_dir: str, dry_run: bool = False) -> dict:
+    """
+    Write a user's data to <output_dir>/<user_id>.json (MongoDB extended
+    JSON): the user document, categories and every transaction, archived
+    ones included. Transactions are streamed, not loaded at once.
+    """
+    user = UserModel().get_user_by_id(user_id)
+    if user is None:
+        raise ValueError("User not found")
+    user.pop("api_tokens", None)
+    categories = list(CategoryModel().collection.find({"user_id": ObjectId(user_id)}))
+    transaction_model = TransactionModel(user_id)
+
+    if dry_run:
+        summary = UserModel().get_user_data_summary(user_id)
+        return {"transactions": summary["transactions"], "categories": len(categories)}
+
+    def dumps(doc):
+        return json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS)
+
+    path = os.path.join(output_dir, f"{user_id}.json")
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'{{"user": {dumps(user)},\n"categories": [{", ".join(dumps(c) for c in categories)}],\n"transactions": [')
+        for transaction in transaction_model.iter_transactions(batch_size=1000):
+            f.write(("\n" if count == 0 else ",\n") + dumps(transaction))
+            count += 1
+        f.write("\n]}\n")
+    return {"path": path, "transactions": count, "categories": len(categories)}
+
+
+def recompute_aggregates(user_id: str, dry_run: bool = False) -> dict:
+    """
+    Rebuild a user's derived data from the transactions: quantile sketches,
+    month buckets (bucket layout only) and the dashboard snapshot.
+    """
+    sketches = QuantileSketchModel()
+    buckets = TransactionBucketModel()
+    snapshots = DashboardSnapshotModel()
+    user_oid = ObjectId(user_id)
+
+    if dry_run:
+        return {
+            "sketches": sketches.collection.count_documents({"user_id": user_oid}),
+            "buckets": buckets.collection.count_documents({"user_id": user_oid}) if buckets.enabled else 0,
+            "snapshots": snapshots.collection.count_documents({"user_id": user_oid}),
+        }
+
+    # pandas is only needed here
+    from analytics.precompute import PrecomputeWorker
+
+    sketches.delete_user_sketches(user_id)
+    for transaction_type in config.TRANSACTION_TYPES:
+        # rebuilds a sketch for every category of the type
+        sketches.get_sketch(user_id, transaction_type)
+
+    rebuilt_buckets = 0
+    if buckets.enabled:
+        buckets.delete_user_buckets(user_id)
+        rebuilt_buckets = len(buckets.get_buckets(user_id))
+
+    # drop read caches holding pre-rebuild results, then store a fresh snapshot
+    DataVersionModel().bump(user_id)
+    PrecomputeWorker().refresh(user_id)
+    return {
+        "sketches": sketches.collection.count_documents({"user_id": user_oid}),
+        "buckets": rebuilt_buckets,
+        "snapshots": 1,
+    }
+
+
+def delete_account(user_id: str, dry_run: bool = False) -> dict:
+    """Delete a user and all related data (the same throttled job as the UI)"""
+    users = UserModel()
+    if dry_run:
+        if users.get_user_by_id(user_id) is None:
+            raise ValueError("User not found")
+        return users.get_user_data_summary(user_id)
+    return users.delete_user_cascade(user_id)
+
+
+# -----------------------------------------------------------
+# CLI
+# -----------------------------------------------------------
+def _user_ids(args) -> list[str]:
+    if args.all_users:
+        return UserModel().get_active_user_ids()
+    return [str(ObjectId(user_id)) for user_id in args.user_id]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Finance tracker maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("rebuild-indexes", help="Create missing indexes on every database")
+    index_parser.add_argument("--dry-run", action="store_true", help="Count indexes without creating any")
+
+    user_commands = {
+        "seed-categories": "Create missing default categories",
+        "export": "Export user data as extended JSON",
+        "recompute-aggregates": "Rebuild sketches, buckets and dashboard snapshots",
+        "delete-account": "Delete users and all their data",
+    }
+    user_parsers = {}
+    for name, help_text in user_commands.items():
+        sub = commands.add_parser(name, help=help_text)
+        users = sub.add_mutually_exclusive_group(required=True)
+        users.add_argument("--user-id", action="append", help="User id (repeatable)")
+        users.add_argument("--all-users", action="store_true", help="Every active user")
+        sub.add_argument("--workers", type=int, default=1, help="Users processed in parallel")
+        sub.add_argument("--throttle", type=float, default=0.0, help="Seconds each worker sleeps between users")
+        sub.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+        user_parsers[name] = sub
+    user_parsers["export"].add_argument("--output", default="exports", help="Directory for the export files")
+    user_parsers["delete-account"].add_argument("--yes", action="store_true", help="Confirm deletion")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild-indexes":
+        result = rebuild_indexes(dry_run=args.dry_run)
+        print(result)
+        return 1 if result.get("failed") else 0
+
+    if args.command == "delete-account" and not (args.yes or args.dry_run):
+        parser.error("delete-account needs --yes (or --dry-run)")
+
+    if args.command == "export":
+        os.makedirs(args.output, exist_ok=True)
+        action = lambda user_id: export_user(user_id, args.output, dry_run=args.dry_run)
+    else:
+        command = {
+            "seed-categories": seed_categories,
+            "recompute-aggregates": recompute_aggregates,
+            "delete-account": delete_account,
+        }[args.command]
+        action = lambda user_id: command(user_id, dry_run=args.dry_run)
+
+    user_ids = _user_ids(args)
+    label = f"{args.command}{' (dry run)' if args.dry_run else ''}"
+    results = run_for_users(label, user_ids, action, workers=args.workers, throttle_seconds=args.throttle)
+
+    failed = {user_id: r["error"] for user_id, r in results.items() if "error" in r}
+    for user_id in user_ids:
+        if user_id not in failed:
+            print(f"{user_id}: {results[user_id]}")
+    for user_id, error in failed.items():
+        print(f"{user_id}: FAILED {error}")
+    print({"users": len(user_ids), "failed": len(failed)})
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,22 @@
-from .analyzer import FinanceAnalyzer
-from .visualizer import FinanceVisualizer
+"""
+Analytics package.
+
+Submodules pull in pandas / plotly, so they are imported on first attribute
+access instead of when the package is imported.
+"""
+import importlib
+
+_LAZY = {
+    "FinanceAnalyzer": ".analyzer",
+    "FinanceVisualizer": ".visualizer",
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 __all__ = [
     "FinanceAnalyzer",
     "FinanceVisualizer",
@@ -1,8 +1,26 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from database.transaction_model import TransactionModel 
+from datetime import datetime, timedelta, date
+from database.transaction_model import TransactionModel, AMOUNT_CENTS_EXPR
+from utils import from_cents
 
 class FinanceAnalyzer:
+
+    # Pure reads, safe to serve from the version-keyed cache (utils.CachedReads)
+    CACHEABLE_READS = (
+        "get_transactions_dataframe",
+        "calculate_total_by_type",
+        "get_spending_by_category",
+        "get_monthly_trend",
+        "get_daily_average",
+        "detect_anomalies",
+        "predict_next_month_spending",
+        "get_statistics_summary",
+        "get_spending_quantiles",
+        "get_spending_heatmap_grid",
+        "get_timeline_window",
+    )
+
     def __init__(self, 
                  transaction_model: TransactionModel):
         self.transaction_model = transaction_model
@@ -27,8 +45,9 @@ class FinanceAnalyzer:
         else:
             transactions = self.transaction_model.get_transactions()
         
-        total = sum(t['amount'] for t in transactions if t['type'] == transaction_type)
-        return total
+        # summed as integer cents, so the total is exact
+        total = sum(t['amount_cents'] for t in transactions if t['type'] == transaction_type)
+        return from_cents(total)
     
     def get_spending_by_category(self, start_date=None, end_date=None):
         """Get spending grouped by category"""
@@ -50,8 +69,10 @@ class FinanceAnalyzer:
         if expenses.empty:
             return pd.DataFrame()
         
-        category_spending = expenses.groupby('category')['amount'].agg(['sum', 'count', 'mean']).reset_index()
+        category_spending = expenses.groupby('category')['amount_cents'].agg(['sum', 'count', 'mean']).reset_index()
         category_spending.columns = ['Category', 'Total', 'Count', 'Average']
+        category_spending['Total'] = category_spending['Total'] / 100
+        category_spending['Average'] = category_spending['Average'] / 100
         category_spending = category_spending.sort_values('Total', ascending=False)
         
         return category_spending
@@ -61,20 +82,16 @@ class FinanceAnalyzer:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months*30)
         
-        transactions = self.transaction_model.get_transactions_by_date_range(
-            start_date, end_date
-        )
-        
-        df = pd.DataFrame(transactions)
+        # per-month totals in cents, computed by the model (bucket totals or a $group)
+        totals = self.transaction_model.get_monthly_totals(start_date, end_date)
         
-        if df.empty:
+        if not totals:
             return pd.DataFrame()
         
-        df['date'] = pd.to_datetime(df['date'])
-        df['month'] = df['date'].dt.to_period('M')
-        
-        monthly_data = df.groupby(['month', 'type'])['amount'].sum().unstack(fill_value=0)
-        monthly_data.index = monthly_data.index.to_timestamp()
+        monthly_data = pd.DataFrame.from_dict(totals, orient='index').fillna(0).sort_index() / 100
+        monthly_data.index = pd.to_datetime(monthly_data.index)
+        monthly_data.index.name = 'month'
+        monthly_data.columns.name = 'type'
         
         return monthly_data
     
@@ -96,7 +113,7 @@ class FinanceAnalyzer:
         df['date'] = pd.to_datetime(df['created_at']) # ensure convert properly datetime format
         
         date_range = (df['date'].max() - df['date'].min()).days + 1
-        total_spending = df['amount'].sum()
+        total_spending = from_cents(df['amount_cents'].sum())
         
         return total_spending / date_range if date_range > 0 else 0
     
@@ -147,17 +164,114 @@ class FinanceAnalyzer:
         expenses = df[df['type'] == 'Expense']
         income = df[df['type'] == 'Income']
         
+        expense_cents = int(expenses['amount_cents'].sum()) if not expenses.empty else 0
+        income_cents = int(income['amount_cents'].sum()) if not income.empty else 0
+
         summary = {
-            'total_expenses': expenses['amount'].sum() if not expenses.empty else 0,
-            'total_income': income['amount'].sum() if not income.empty else 0,
-            'avg_expense': expenses['amount'].mean() if not expenses.empty else 0,
-            'avg_income': income['amount'].mean() if not income.empty else 0,
-            'median_expense': expenses['amount'].median() if not expenses.empty else 0,
+            'total_expenses': from_cents(expense_cents),
+            'total_income': from_cents(income_cents),
+            'avg_expense': expenses['amount_cents'].mean() / 100 if not expenses.empty else 0,
+            'avg_income': income['amount_cents'].mean() / 100 if not income.empty else 0,
+            'median_expense': (self.get_spending_quantiles((0.5,))[0.5] or 0) if not expenses.empty else 0,
             'transaction_count': len(df),
             'expense_count': len(expenses),
             'income_count': len(income),
         }
         
-        summary['net_balance'] = summary['total_income'] - summary['total_expenses']
+        summary['net_balance'] = from_cents(income_cents - expense_cents)
         
         return summary
+
+    def get_spending_quantiles(self, quantiles=(0.5, 0.9, 0.99), category=None, exact=False):
+        """
+        Get expense percentiles (median, p90, p99, ...).
+
+        Answered from the per-category quantile sketches maintained on write,
+        without loading transactions. Sketches are exact for small histories;
+        pass exact=True to compute from the raw transactions instead.
+        """
+        if exact:
+            filters = {"transaction_type": "Expense"}
+            if category:
+                filters["category"] = category
+            transactions = self.transaction_model.get_transactions(filters)
+            if not transactions:
+                return {q: None for q in quantiles}
+            amounts = pd.Series([t['amount'] for t in transactions])
+            return {q: amounts.quantile(q) for q in quantiles}
+
+        sketch = self.transaction_model.get_amount_sketch("Expense", category)
+        return sketch.quantiles(quantiles)
+
+    def get_spending_heatmap_grid(self, start_date=None, end_date=None):
+        """
+        Get expenses summed per (ISO year, ISO week, weekday).
+
+        Grouping runs server-side; the result is a dense matrix with one row per
+        ISO week in the range (empty weeks included) and one column per weekday.
+
+        Returns:
+            dict: {'weeks': ['2025-W52', ...], 'days': ['Monday', ...], 'values': ndarray (weeks x 7)}
+        """
+        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+        filters = {"transaction_type": "Expense", "start_date": start_date, "end_date": end_date}
+        rows = self.transaction_model.aggregate(
+            [
+                {"$group": {
+                    "_id": {
+                        "year": {"$isoWeekYear": "$date"},
+                        "week": {"$isoWeek": "$date"},
+                        "day": {"$isoDayOfWeek": "$date"}
+                    },
+                    "total": {"$sum": AMOUNT_CENTS_EXPR},
+                    "first": {"$min": "$date"},
+                    "last": {"$max": "$date"}
+                }}
+            ],
+            advanced_filters=filters
+        )
+
+        if not rows:
+            return {'weeks': [], 'days': days, 'values': np.zeros((0, 7))}
+
+        # Week rows run from the Monday of the first week to the Monday of the last
+        first = start_date or min(r['first'] for r in rows)
+        last = end_date or max(r['last'] for r in rows)
+        first = first.date() if isinstance(first, datetime) else first
+        last = last.date() if isinstance(last, datetime) else last
+        monday = first - timedelta(days=first.weekday())
+
+        week_index = {}
+        while monday <= last:
+            iso_year, iso_week, _ = monday.isocalendar()
+            week_index[(iso_year, iso_week)] = len(week_index)
+            monday += timedelta(days=7)
+
+        values = np.zeros((len(week_index), 7))
+        for row in rows:
+            key = (row['_id']['year'], row['_id']['week'])
+            if key in week_index:
+                values[week_index[key], row['_id']['day'] - 1] += row['total'] / 100
+
+        weeks = [f"{year}-W{week:02d}" for year, week in week_index]
+        return {'weeks': weeks, 'days': days, 'values': values}
+
+    def get_timeline_window(self, start_date=None, end_date=None):
+        """
+        Get the transactions of one timeline zoom window.
+
+        Only the visible range and the fields the timeline plots are fetched,
+        so zooming in refetches detail for that window alone.
+        """
+        transactions = self.transaction_model.get_transactions(
+            advanced_filters={"start_date": start_date, "end_date": end_date},
+            projection={"date": 1, "amount_cents": 1, "amount": 1, "type": 1, "category_id": 1, "category": 1, "description": 1}
+        )
+
+        if not transactions:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(transactions)
+        df['date'] = pd.to_datetime(df['date'])
+        return df.sort_values('date')
@@ -0,0 +1,213 @@
+"""
+Nightly batch analytics for every user.
+
+Run with:
+    python -m analytics.batch_job --workers 4
+
+Users are split into chunks and processed by a process pool. Each worker streams
+one user's transactions at a time, computes the summary / anomalies / forecast
+with FinanceAnalyzer and stores them in the `analytics_results` collection.
+Finished users are checkpointed per run, so re-running the same --run-id resumes
+where the previous run stopped.
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, date
+
+import config
+from database.database_manager import DatabaseManager
+from database.transaction_model import TransactionModel
+from database.user_model import UserModel
+from database.quantile_sketch import KLLSketch
+from analytics.analyzer import FinanceAnalyzer
+from utils import handler_datetime
+
+
+# -----------------------------------------------------------
+# IN-MEMORY SNAPSHOT
+# -----------------------------------------------------------
+class _TransactionSnapshot:
+    """
+    Read-only stand-in for TransactionModel over one user's streamed rows,
+    so FinanceAnalyzer does a single database pass per user.
+    """
+
+    def __init__(self, transactions: list[dict]):
+        self.transactions = transactions
+
+    def get_transactions(self, advanced_filters=None) -> list[dict]:
+        return self.transactions
+
+    def get_transactions_by_date_range(self, start_date, end_date) -> list[dict]:
+        start_date = handler_datetime(start_date)
+        # a plain date includes the whole day, as in TransactionModel._build_query
+        if isinstance(end_date, date) and not isinstance(end_date, datetime):
+            end_date = datetime.combine(end_date, datetime.max.time())
+        end_date = handler_datetime(end_date)
+        return [t for t in self.transactions if start_date <= t["date"] <= end_date]
+
+    def get_monthly_totals(self, start_date=None, end_date=None) -> dict:
+        rows = self.get_transactions_by_date_range(start_date, end_date) if start_date and end_date else self.transactions
+        totals = {}
+        for t in rows:
+            month = totals.setdefault(datetime(t["date"].year, t["date"].month, 1), {})
+            month[t["type"]] = month.get(t["type"], 0) + t["amount_cents"]
+        return totals
+
+    def get_amount_sketch(self, transaction_type: str, category=None) -> KLLSketch:
+        return KLLSketch.from_values(
+            t["amount"] for t in self.transactions
+            if t["type"] == transaction_type and (category is None or t["category"] == category)
+        )
+
+
+def _to_bson(value):
+    """Convert numpy / pandas scalars into plain Python values for MongoDB"""
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+# -----------------------------------------------------------
+# WORKER
+# -----------------------------------------------------------
+def _process_chunk(run_id: str, user_ids: list[str], batch_size: int) -> dict:
+    """Compute and store analytics for a chunk of users (runs in a worker process)"""
+    db_manager = DatabaseManager()
+    results = db_manager.get_collection(config.COLLECTIONS["analytics_result"])
+    checkpoints = db_manager.get_collection(config.COLLECTIONS["batch_checkpoint"])
+    transaction_model = TransactionModel()
+
+    stats = {"users": 0, "transactions": 0, "failed": []}
+
+    for user_id in user_ids:
+        try:
+            transaction_model.set_user_id(user_id)
+            transactions = list(transaction_model.iter_transactions(batch_size=batch_size))
+            analyzer = FinanceAnalyzer(_TransactionSnapshot(transactions))
+
+            summary = {k: _to_bson(v) for k, v in analyzer.get_statistics_summary().items()}
+
+            anomalies = analyzer.detect_anomalies()
+            anomaly_records = [
+                {k: _to_bson(v) for k, v in row.items()}
+                for row in anomalies.to_dict("records")
+            ] if not anomalies.empty else []
+
+            forecast = _to_bson(analyzer.predict_next_month_spending())
+
+            results.update_one(
+                {"user_id": transaction_model.user_id, "run_id": run_id},
+                {"$set": {
+                    "summary": summary,
+                    "anomalies": anomaly_records,
+                    "forecast_next_month": forecast,
+                    "transaction_count": len(transactions),
+                    "computed_at": datetime.now()
+                }},
+                upsert=True
+            )
+            checkpoints.update_one(
+                {"run_id": run_id, "user_id": user_id},
+                {"$set": {"completed_at": datetime.now()}},
+                upsert=True
+            )
+
+            stats["users"] += 1
+            stats["transactions"] += len(transactions)
+        except Exception as e:
+            print(f"Error processing user {user_id}: {e}")
+            stats["failed"].append(user_id)
+
+    return stats
+
+
+# -----------------------------------------------------------
+# DRIVER
+# -----------------------------------------------------------
+def _chunk(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_batch(
+    run_id: str = None,
+    workers: int = 4,
+    chunk_size: int = 50,
+    batch_size: int = 500
+) -> dict:
+    """
+    Run the analytics batch for all active users.
+
+    Args:
+        run_id: Checkpoint key; re-using an id resumes that run (default: today's date)
+        workers: Number of worker processes
+        chunk_size: Users handed to a worker per task
+        batch_size: Cursor batch size used when streaming transactions
+
+    Returns:
+        dict: Run summary with counts and throughput
+    """
+    run_id = run_id or datetime.now().strftime("%Y-%m-%d")
+
+    db_manager = DatabaseManager()
+    checkpoints = db_manager.get_collection(config.COLLECTIONS["batch_checkpoint"])
+
+    user_ids = UserModel().get_active_user_ids()
+    done = {c["user_id"] for c in checkpoints.find({"run_id": run_id}, {"user_id": 1})}
+    pending = [u for u in user_ids if u not in done]
+
+    print(f"[batch {run_id}] {len(pending)} users pending, {len(done)} already done")
+
+    totals = {"users": 0, "transactions": 0, "failed": []}
+    started = time.perf_counter()
+
+    if pending:
+        # spawn: MongoClient must not be shared with forked children
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_process_chunk, run_id, chunk, batch_size)
+                for chunk in _chunk(pending, chunk_size)
+            ]
+            for future in as_completed(futures):
+                stats = future.result()
+                totals["users"] += stats["users"]
+                totals["transactions"] += stats["transactions"]
+                totals["failed"].extend(stats["failed"])
+
+                elapsed = time.perf_counter() - started
+                print(
+                    f"[batch {run_id}] {totals['users']}/{len(pending)} users | "
+                    f"{totals['users'] / elapsed:.1f} users/s | "
+                    f"{totals['transactions'] / elapsed:.0f} tx/s"
+                )
+
+    elapsed = time.perf_counter() - started
+    totals.update({
+        "run_id": run_id,
+        "skipped": len(done),
+        "elapsed_seconds": round(elapsed, 2),
+        "users_per_second": round(totals["users"] / elapsed, 2) if elapsed > 0 else 0,
+        "transactions_per_second": round(totals["transactions"] / elapsed, 2) if elapsed > 0 else 0,
+    })
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute analytics for all users")
+    parser.add_argument("--run-id", default=None, help="Resume / name a run (default: today)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    summary = run_batch(
+        run_id=args.run_id,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size
+    )
+    print(summary)
@@ -0,0 +1,137 @@
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_figure_class():
+    # Built on first use so importing this module does not pull in plotly
+    import plotly.graph_objects as go
+
+    class CachedFigure(go.Figure):
+        """
+        Figure backed by cached plotly JSON.
+
+        st.plotly_chart calls to_dict() on Figure objects and skips re-validation,
+        so handing it this object costs one json.loads instead of a rebuild.
+        """
+
+        def __init__(self, figure_json: str):
+            super().__init__()
+            self._figure_json = figure_json
+
+        def to_dict(self):
+            return json.loads(self._figure_json)
+
+        def __reduce__(self):
+            return (make_cached_figure, (self._figure_json,))
+
+    return CachedFigure
+
+
+def make_cached_figure(figure_json: str):
+    """Wrap serialized figure JSON in a CachedFigure."""
+    return _cached_figure_class()(figure_json)
+
+
+class FigureCache:
+    """Bounded LRU of serialized figures keyed by chart name + input fingerprint."""
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            figure_json = self._entries.get(key)
+            if figure_json is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return figure_json
+
+    def put(self, key: str, figure_json: str):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = figure_json
+            self._bytes += len(figure_json)
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Shared by every session in the process; keys only depend on data, so that is safe
+figure_cache = FigureCache()
+
+
+def fingerprint(value) -> str:
+    """Cheap content hash of chart inputs (DataFrames, arrays, dicts, scalars)."""
+    digest = hashlib.blake2b(digest_size=16)
+    _update_digest(digest, value)
+    return digest.hexdigest()
+
+
+def _update_digest(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr((value.shape, list(value.columns))).encode())
+        if not value.empty:
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(repr((value.name, len(value))).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.shape, value.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(repr(key).encode())
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}:{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+def cached_figure(plot_function):
+    """
+    Serve a FinanceVisualizer chart from figure_cache.
+
+    The key is the chart name plus a fingerprint of all arguments; unchanged
+    inputs return a CachedFigure without rebuilding anything.
+    """
+
+    @functools.wraps(plot_function)
+    def wrapper(*args, **kwargs):
+        key = f"{plot_function.__qualname__}:{fingerprint([args, kwargs])}"
+
+        figure_json = figure_cache.get(key)
+        if figure_json is None:
+            fig = plot_function(*args, **kwargs)
+            if fig is None:
+                return None
+            figure_json = fig.to_json()
+            figure_cache.put(key, figure_json)
+
+        return make_cached_figure(figure_json)
+
+    return wrapper
@@ -0,0 +1,215 @@
+"""
+Background refresh of the Home dashboard aggregates.
+
+Every write bumps the user's data version (DataVersionModel.bump); the
+PrecomputeWorker listens for those bumps, coalesces them per user and
+recomputes the dashboard in a background thread. The Home page then reads
+the stored snapshot through PrecomputedAnalyzer instead of recomputing
+inside the script run.
+
+pandas / FinanceAnalyzer are imported inside the functions that need them,
+so starting the worker does not slow down the first page load.
+"""
+
+import threading
+from typing import Optional
+
+from database.data_version import DataVersionModel
+from database.dashboard_snapshot import DashboardSnapshotModel
+from database.transaction_model import TransactionModel
+from utils import get_date_range_options
+
+DASHBOARD_MONTHS = 6
+
+
+def _range_key(start_date, end_date) -> str:
+    """Snapshot key of a dashboard date range ("" for open ends)"""
+    return f"{start_date.isoformat() if start_date else ''}|{end_date.isoformat() if end_date else ''}"
+
+
+# -----------------------------------------------------------
+# COMPUTE
+# -----------------------------------------------------------
+def compute_dashboard(transactions: list[dict]) -> dict:
+    """
+    Compute everything the Home dashboard shows, for every predefined range.
+
+    Returns:
+        dict: {'ranges': {range_key: {...}}, 'daily_average': float, 'monthly_trend': [...]}
+    """
+    from analytics.analyzer import FinanceAnalyzer
+    from analytics.batch_job import _TransactionSnapshot, _to_bson
+
+    analyzer = FinanceAnalyzer(_TransactionSnapshot(transactions))
+
+    ranges = {}
+    for start_date, end_date in get_date_range_options().values():
+        category_spending = analyzer.get_spending_by_category(start_date, end_date)
+        ranges[_range_key(start_date, end_date)] = {
+            "total_expense": _to_bson(analyzer.calculate_total_by_type("Expense", start_date, end_date)),
+            "total_income": _to_bson(analyzer.calculate_total_by_type("Income", start_date, end_date)),
+            "category_spending": [
+                {k: _to_bson(v) for k, v in row.items()}
+                for row in category_spending.to_dict("records")
+            ],
+        }
+
+    monthly_trend = analyzer.get_monthly_trend(months=DASHBOARD_MONTHS)
+    monthly_records = [
+        {"month": month.to_pydatetime(), **{str(k): _to_bson(v) for k, v in row.items()}}
+        for month, row in monthly_trend.iterrows()
+    ] if not monthly_trend.empty else []
+
+    return {
+        "ranges": ranges,
+        "daily_average": _to_bson(analyzer.get_daily_average()),
+        "monthly_trend": monthly_records,
+        "transaction_count": len(transactions),
+    }
+
+
+# -----------------------------------------------------------
+# WORKER
+# -----------------------------------------------------------
+class PrecomputeWorker:
+    """
+    Background thread that refreshes dashboard snapshots of dirty users.
+
+    Dirty user ids are kept in a set, so any number of writes for a user
+    before the worker gets to it results in a single refresh. After waking
+    up the worker waits `debounce_seconds` to let a burst of writes settle.
+    """
+
+    def __init__(self, debounce_seconds: float = 1.0):
+        self.debounce_seconds = debounce_seconds
+        self.transaction_model = TransactionModel()
+        self.versions = DataVersionModel()
+        self.snapshots = DashboardSnapshotModel()
+
+        self._dirty: set = set()
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.marked = 0
+        self.refreshed = 0
+
+    def start(self) -> "PrecomputeWorker":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="dashboard-precompute", daemon=True)
+            self._thread.start()
+            DataVersionModel.add_listener(self._on_version_bump)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        DataVersionModel.remove_listener(self._on_version_bump)
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def mark_dirty(self, user_id):
+        with self._condition:
+            self._dirty.add(str(user_id))
+            self.marked += 1
+            self._condition.notify()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._dirty)
+
+    def _on_version_bump(self, user_id, version):
+        self.mark_dirty(user_id)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._condition:
+                while not self._dirty and not self._stop.is_set():
+                    self._condition.wait()
+
+            # let a burst of writes settle, then take everything queued so far
+            if self._stop.wait(self.debounce_seconds):
+                break
+            with self._condition:
+                user_ids, self._dirty = self._dirty, set()
+
+            for user_id in user_ids:
+                try:
+                    self.refresh(user_id)
+                except Exception as e:
+                    print(f"Error precomputing dashboard for user {user_id}: {e}")
+
+    def refresh(self, user_id) -> bool:
+        """Recompute and store one user's dashboard snapshot."""
+        # read the version first: a write during the computation bumps it
+        # again and queues another refresh
+        version = self.versions.get_version(user_id)
+
+        self.transaction_model.set_user_id(user_id)
+        transactions = list(self.transaction_model.iter_transactions())
+
+        saved = self.snapshots.save(user_id, version, compute_dashboard(transactions))
+        self.refreshed += 1
+        return saved
+
+
+# -----------------------------------------------------------
+# READ SIDE
+# -----------------------------------------------------------
+class PrecomputedAnalyzer:
+    """
+    FinanceAnalyzer facade for the Home page.
+
+    Dashboard reads are answered from the user's current snapshot when
+    there is one; anything else (and every read when the snapshot is
+    missing or outdated) goes to the wrapped analyzer.
+    """
+
+    def __init__(self, analyzer, snapshot: Optional[dict] = None):
+        self._analyzer = analyzer
+        self._snapshot = snapshot
+
+    @property
+    def is_precomputed(self) -> bool:
+        return self._snapshot is not None
+
+    def _range(self, start_date, end_date) -> Optional[dict]:
+        if self._snapshot is None:
+            return None
+        return self._snapshot["ranges"].get(_range_key(start_date, end_date))
+
+    def calculate_total_by_type(self, transaction_type, start_date=None, end_date=None):
+        cached = self._range(start_date, end_date)
+        if cached is None or transaction_type not in ("Expense", "Income"):
+            return self._analyzer.calculate_total_by_type(transaction_type, start_date, end_date)
+        return cached["total_expense" if transaction_type == "Expense" else "total_income"]
+
+    def get_spending_by_category(self, start_date=None, end_date=None):
+        import pandas as pd
+
+        cached = self._range(start_date, end_date)
+        if cached is None:
+            return self._analyzer.get_spending_by_category(start_date, end_date)
+        return pd.DataFrame(cached["category_spending"])
+
+    def get_daily_average(self):
+        if self._snapshot is None:
+            return self._analyzer.get_daily_average()
+        return self._snapshot["daily_average"]
+
+    def get_monthly_trend(self, user_id="default_user", months=6):
+        import pandas as pd
+
+        if self._snapshot is None or months != DASHBOARD_MONTHS:
+            return self._analyzer.get_monthly_trend(months=months)
+        records = self._snapshot["monthly_trend"]
+        if not records:
+            return pd.DataFrame()
+        monthly_data = pd.DataFrame(records).set_index("month")
+        monthly_data.index = pd.to_datetime(monthly_data.index)
+        return monthly_data
+
+    def __getattr__(self, name):
+        return getattr(self._analyzer, name)
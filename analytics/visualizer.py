@@ -1,21 +1,88 @@
 """
-pip install seaborn plotly
+pip install plotly
+
+plotly is imported inside each chart method, so importing this module stays
+cheap until the first chart is actually needed.
 """
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
+from analytics.figure_cache import cached_figure
+
+# Timeline: above this many points switch to WebGL and downsample
+TIMELINE_WEBGL_THRESHOLD = 1000
+TIMELINE_MAX_POINTS = 1500
+
+
+def _lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets, vectorized.
+
+    Each bucket keeps the point forming the largest triangle with the
+    averages of its neighbour buckets (the bucket average stands in for
+    the previously selected point, so all buckets are solved at once).
+    First and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # bucket edges for the inner points [1, n-1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    starts = edges[:-1]
+    counts = np.diff(edges)
+    keep = counts > 0
+    starts, counts = starts[keep], counts[keep]
+
+    mean_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+
+    # neighbours: previous / next bucket averages, first / last point at the ends
+    prev_x = np.concatenate(([x[0]], mean_x[:-1]))
+    prev_y = np.concatenate(([y[0]], mean_y[:-1]))
+    next_x = np.concatenate((mean_x[1:], [x[-1]]))
+    next_y = np.concatenate((mean_y[1:], [y[-1]]))
+
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    px_, py_ = x[1:n - 1], y[1:n - 1]
+    area = np.abs(
+        (prev_x[bucket] - next_x[bucket]) * (py_ - prev_y[bucket])
+        - (prev_x[bucket] - px_) * (next_y[bucket] - prev_y[bucket])
+    )
+
+    # first index of the max area inside every bucket
+    order = np.lexsort((-area, bucket))
+    first_in_bucket = np.concatenate(([True], bucket[order][1:] != bucket[order][:-1]))
+    selected = order[first_in_bucket] + 1
 
-# Set common style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (10, 6)
+    return np.concatenate(([0], selected, [n - 1]))
+
+
+def _downsample_timeline(df, max_points, outlier_z=3):
+    """Downsample one series with LTTB, always keeping amount outliers."""
+    if len(df) <= max_points:
+        return df
+
+    df = df.sort_values('date')
+    x = df['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+    y = df['amount'].to_numpy(dtype=float)
+
+    indices = _lttb_indices(x, y, max_points)
+
+    std = y.std()
+    if std > 0:
+        outliers = np.flatnonzero(np.abs(y - y.mean()) / std > outlier_z)
+        indices = np.union1d(indices, outliers)
+
+    return df.iloc[indices]
 
 class FinanceVisualizer:
     
     @staticmethod
+    @cached_figure
     def plot_category_spending(category_data):
         """Create bar chart for spending by category"""
+        import plotly.express as px
+
         if category_data.empty:
             return None
         
@@ -38,8 +105,11 @@ class FinanceVisualizer:
         return fig
     
     @staticmethod
+    @cached_figure
     def plot_pie_chart(category_data):
         """Create pie chart for category distribution"""
+        import plotly.express as px
+
         if category_data.empty:
             return  # early exist
         
@@ -56,8 +126,11 @@ class FinanceVisualizer:
         return fig
     
     @staticmethod
+    @cached_figure
     def plot_monthly_trend(monthly_data):
         """Create line chart for monthly trend"""
+        import plotly.graph_objects as go
+
         if monthly_data.empty:
             return None
         
@@ -92,8 +165,11 @@ class FinanceVisualizer:
         return fig
     
     @staticmethod
+    @cached_figure
     def plot_budget_comparison(budget_data, actual_data):
         """Create comparison chart for budget vs actual"""
+        import plotly.graph_objects as go
+
         if budget_data.empty:
             return None
         
@@ -132,27 +208,19 @@ class FinanceVisualizer:
         return fig
     
     @staticmethod
-    def plot_daily_spending_heatmap(df):
-        """Create heatmap for spending by day of week and hour"""
-        if df.empty:
-            return None
-        
-        expenses = df[df['type'] == 'Expense'].copy()
-        
-        if expenses.empty:
+    @cached_figure
+    def plot_daily_spending_heatmap(heatmap_grid):
+        """Create heatmap of spending by ISO week and day of week"""
+        import plotly.express as px
+
+        if not heatmap_grid or len(heatmap_grid['weeks']) == 0:
             return None
         
-        expenses['day_of_week'] = expenses['date'].dt.day_name()
-        expenses['week'] = expenses['date'].dt.isocalendar().week
-        
-        heatmap_data = expenses.groupby(['week', 'day_of_week'])['amount'].sum().unstack(fill_value=0)
-        
-        # Reorder days
-        days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        heatmap_data = heatmap_data.reindex(columns=days_order, fill_value=0)
-        
+        # Grid comes precomputed from FinanceAnalyzer.get_spending_heatmap_grid
         fig = px.imshow(
-            heatmap_data,
+            heatmap_grid['values'],
+            x=heatmap_grid['days'],
+            y=heatmap_grid['weeks'],
             labels=dict(x="Day of Week", y="Week", color="Amount ($)"),
             title="Spending Heatmap by Week and Day",
             color_continuous_scale="Reds",
@@ -162,22 +230,65 @@ class FinanceVisualizer:
         return fig
     
     @staticmethod
-    def plot_transaction_timeline(df):
-        """Create timeline of transactions"""
+    @cached_figure
+    def plot_transaction_timeline(df,
+                                  max_points=TIMELINE_MAX_POINTS,
+                                  webgl_threshold=TIMELINE_WEBGL_THRESHOLD):
+        """
+        Create timeline of transactions.
+
+        Small frames keep the full px.scatter chart. Above `webgl_threshold`
+        points each type is downsampled (LTTB, outliers kept) to `max_points`
+        and drawn with Scattergl.
+        """
+        import plotly.express as px
+        import plotly.graph_objects as go
+
         if df.empty:
             return None
         
-        fig = px.scatter(
-            df,
-            x='date',
-            y='amount',
-            color='type',
-            size='amount',
-            hover_data=['category', 'description'],
-            title='Transaction Timeline',
-            color_discrete_map={'Expense': 'red', 'Income': 'green'}
-        )
+        if len(df) <= webgl_threshold:
+            fig = px.scatter(
+                df,
+                x='date',
+                y='amount',
+                color='type',
+                size='amount',
+                hover_data=['category', 'description'],
+                title='Transaction Timeline',
+                color_discrete_map={'Expense': 'red', 'Income': 'green'}
+            )
+            fig.update_layout(height=500)
+            return fig
         
-        fig.update_layout(height=500)
+        colors = {'Expense': 'red', 'Income': 'green'}
+        max_amount = df['amount'].max() or 1
+        fig = go.Figure()
         
-        return fig
\ No newline at end of file
+        for transaction_type, group in df.groupby('type'):
+            # keep each type's share of the point budget
+            budget = max(3, int(max_points * len(group) / len(df)))
+            sampled = _downsample_timeline(group, budget)
+            
+            fig.add_trace(go.Scattergl(
+                x=sampled['date'],
+                y=sampled['amount'],
+                mode='markers',
+                name=transaction_type,
+                marker=dict(
+                    color=colors.get(transaction_type),
+                    size=4 + 16 * np.sqrt(sampled['amount'] / max_amount),
+                    opacity=0.7
+                ),
+                customdata=sampled[['category', 'description']].fillna('').to_numpy(),
+                hovertemplate='%{x|%Y-%m-%d}<br>$%{y:,.2f}<br>%{customdata[0]}<br>%{customdata[1]}<extra></extra>'
+            ))
+        
+        fig.update_layout(
+            title=f'Transaction Timeline ({len(df):,} transactions, downsampled)',
+            xaxis_title='date',
+            yaxis_title='amount',
+            height=500
+        )
+        
+        return fig
@@ -0,0 +1,5 @@
+"""Headless JSON API over the finance models (see api.server)."""
+
+from .server import make_app
+
+__all__ = ["make_app"]
@@ -0,0 +1,487 @@
+"""
+Headless JSON API.
+
+Serves TransactionModel, CategoryModel and FinanceAnalyzer over HTTP, as a
+process separate from the Streamlit UI:
+
+    python -m api.server serve --port 8600
+    python -m api.server issue-token <user_id>
+
+Requests authenticate with `Authorization: Bearer <token>`. GET responses
+carry an ETag built from the user's data version, so `If-None-Match`
+answers 304 without touching transactions until the user's data changes;
+bodies of unchanged resources are also reused across clients. Responses are
+gzipped when the client accepts it.
+
+Model calls are blocking (pymongo) and run on a thread pool, so a slow
+query does not stall the event loop. make_app() builds the application for
+in-process clients (tornado.testing, httpx against a bound port).
+"""
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from typing import Any, Callable, Optional
+
+import tornado.web
+from bson import ObjectId
+
+import config
+from database.category_models import CategoryModel
+from database.data_version import DataVersionModel
+from database.transaction_model import TransactionModel
+from database.user_model import UserModel
+from utils import handler_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Serialized GET bodies kept per (user, data version, day, URI)
+RESPONSE_CACHE_SIZE = 1024
+
+TRANSACTION_FIELDS = ("type", "category", "amount", "date", "description")
+
+
+# -----------------------------------------------------------
+# JSON
+# -----------------------------------------------------------
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        # numpy / pandas scalars, bson Int64
+        return value.item()
+    if isinstance(value, int):
+        return int(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _clean(value):
+    """NaN / inf are not valid JSON"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    return value
+
+
+def dumps(payload) -> str:
+    return json.dumps(_clean(payload), default=_json_default, separators=(",", ":"))
+
+
+def transaction_json(transaction: dict) -> dict:
+    return {
+        "id": str(transaction["_id"]),
+        "type": transaction.get("type"),
+        "category": transaction.get("category"),
+        "amount": transaction.get("amount"),
+        "amount_cents": transaction.get("amount_cents"),
+        "date": transaction.get("date"),
+        "description": transaction.get("description", ""),
+        "created_at": transaction.get("created_at"),
+        "last_modified": transaction.get("last_modified"),
+    }
+
+
+def _records(df, index_name: Optional[str] = None) -> list[dict]:
+    if df is None or df.empty:
+        return []
+    if index_name:
+        df = df.reset_index().rename(columns={"index": index_name})
+    return df.to_dict("records")
+
+
+# -----------------------------------------------------------
+# BASE HANDLER
+# -----------------------------------------------------------
+class BaseHandler(tornado.web.RequestHandler):
+
+    def initialize(self, executor: ThreadPoolExecutor, response_cache: OrderedDict):
+        self.executor = executor
+        self.response_cache = response_cache
+        self.user_id: Optional[str] = None
+
+    async def prepare(self):
+        header = self.request.headers.get("Authorization", "")
+        token = header[7:].strip() if header.lower().startswith("bearer ") else ""
+        self.user_id = await self.run(UserModel().get_user_id_for_token, token) if token else None
+        if self.user_id is None:
+            raise tornado.web.HTTPError(401, reason="Missing or invalid API token")
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run a blocking model call on the worker pool"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    # ----------------------
+    # RESPONSES
+    # ----------------------
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+
+    def write_json(self, payload, status: int = 200):
+        self.set_status(status)
+        self.finish(dumps(payload))
+
+    def write_error(self, status_code: int, **kwargs):
+        self.finish(dumps({"error": self._reason, "status": status_code}))
+
+    def compute_etag(self):
+        # ETags come from the data version (respond_versioned), not from hashing bodies
+        return None
+
+    async def respond_versioned(self, compute: Callable[[], Any]):
+        """
+        GET response tagged with the user's data version.
+
+        A matching If-None-Match is answered 304 without calling `compute`;
+        otherwise the body is served from the response cache when another
+        request already built it for this version.
+        """
+        version = await self.run(DataVersionModel().get_version, self.user_id)
+        # the day is part of the tag: relative ranges ("last 6 months") move at midnight
+        tag = hashlib.sha1(f"{self.user_id}:{version}:{date.today()}:{self.request.uri}".encode()).hexdigest()
+        self.set_header("Etag", f'"{tag}"')
+        self.set_header("Cache-Control", "private, no-cache")
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return
+
+        body = self.response_cache.get(tag)
+        if body is None:
+            body = dumps(await self.run(compute))
+            self.response_cache[tag] = body
+            while len(self.response_cache) > RESPONSE_CACHE_SIZE:
+                self.response_cache.popitem(last=False)
+        else:
+            self.response_cache.move_to_end(tag)
+        self.finish(body)
+
+    # ----------------------
+    # REQUEST PARSING
+    # ----------------------
+    def json_body(self) -> dict:
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Request body must be a JSON object")
+        return body
+
+    def int_argument(self, name: str, default: int, minimum: int = 0, maximum: Optional[int] = None) -> int:
+        value = self.get_query_argument(name, None)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"{name} must be an integer")
+        if value < minimum or (maximum is not None and value > maximum):
+            raise tornado.web.HTTPError(400, reason=f"{name} must be between {minimum} and {maximum}")
+        return value
+
+    def date_argument(self, name: str) -> Optional[datetime]:
+        value = self.get_query_argument(name, None)
+        if not value:
+            return None
+        try:
+            return handler_datetime(value)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=f"{name}: {e}")
+
+    def float_argument(self, name: str) -> Optional[float]:
+        value = self.get_query_argument(name, None)
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"{name} must be a number")
+
+
+def _transaction_fields(body: dict, partial: bool) -> dict:
+    """Validated transaction fields from a request body"""
+    unknown = set(body) - set(TRANSACTION_FIELDS)
+    if unknown:
+        raise tornado.web.HTTPError(400, reason=f"Unknown field(s): {', '.join(sorted(unknown))}")
+    if not partial:
+        missing = [f for f in ("type", "category", "amount", "date") if f not in body]
+        if missing:
+            raise tornado.web.HTTPError(400, reason=f"Missing field(s): {', '.join(missing)}")
+
+    fields = dict(body)
+    if "type" in fields and fields["type"] not in config.TRANSACTION_TYPES:
+        raise tornado.web.HTTPError(400, reason=f"type must be one of {', '.join(config.TRANSACTION_TYPES)}")
+    if "category" in fields and not (isinstance(fields["category"], str) and fields["category"].strip()):
+        raise tornado.web.HTTPError(400, reason="category must be a non-empty string")
+    if "amount" in fields:
+        amount = fields["amount"]
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not amount > 0:
+            raise tornado.web.HTTPError(400, reason="amount must be a number greater than 0")
+    if "date" in fields:
+        try:
+            fields["date"] = handler_datetime(fields["date"])
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, reason="date must be an ISO date (YYYY-MM-DD)")
+    if "description" in fields and not isinstance(fields["description"], str):
+        raise tornado.web.HTTPError(400, reason="description must be a string")
+    return fields
+
+
+# -----------------------------------------------------------
+# TRANSACTIONS
+# -----------------------------------------------------------
+class TransactionsHandler(BaseHandler):
+
+    def _filters(self) -> dict:
+        filters = {}
+        if self.get_query_argument("type", None):
+            filters["transaction_type"] = self.get_query_argument("type")
+        if self.get_query_argument("category", None):
+            filters["category"] = self.get_query_argument("category")
+        if self.get_query_argument("q", None):
+            filters["search_text"] = self.get_query_argument("q")
+        for name in ("start_date", "end_date"):
+            value = self.date_argument(name)
+            if value is not None:
+                filters[name] = value
+        for name in ("min_amount", "max_amount"):
+            value = self.float_argument(name)
+            if value is not None:
+                filters[name] = value
+        return filters
+
+    async def get(self):
+        filters = self._filters()
+        page = self.int_argument("page", 1, minimum=1)
+        page_size = self.int_argument("page_size", DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+
+        def compute():
+            rows, has_more = TransactionModel(self.user_id).get_transactions_page(
+                filters, offset=(page - 1) * page_size, limit=page_size
+            )
+            return {
+                "items": [transaction_json(t) for t in rows],
+                "page": page,
+                "page_size": page_size,
+                "has_more": has_more,
+            }
+
+        await self.respond_versioned(compute)
+
+    async def post(self):
+        fields = _transaction_fields(self.json_body(), partial=False)
+        idempotency_key = self.request.headers.get("Idempotency-Key")
+
+        def create():
+            if CategoryModel(self.user_id).get_category_id(fields["type"], fields["category"]) is None:
+                raise tornado.web.HTTPError(400, reason=f"Unknown {fields['type']} category {fields['category']!r}")
+            return TransactionModel(self.user_id).add_transaction(
+                transaction_type=fields["type"],
+                category=fields["category"],
+                amount=fields["amount"],
+                transaction_date=fields["date"],
+                description=fields.get("description", ""),
+                idempotency_key=idempotency_key
+            )
+
+        transaction_id = await self.run(create)
+        if transaction_id is None:
+            raise tornado.web.HTTPError(503, reason="Could not store the transaction, retry with the same Idempotency-Key")
+        self.set_header("Location", f"/api/transactions/{transaction_id}")
+        self.write_json({"id": transaction_id}, status=201)
+
+
+class TransactionHandler(BaseHandler):
+
+    async def get(self, transaction_id: str):
+        def compute():
+            transaction = TransactionModel(self.user_id).get_transaction_by_id(transaction_id)
+            if transaction is None:
+                raise tornado.web.HTTPError(404, reason="Transaction not found")
+            return transaction_json(transaction)
+
+        await self.respond_versioned(compute)
+
+    async def patch(self, transaction_id: str):
+        fields = _transaction_fields(self.json_body(), partial=True)
+        if not fields:
+            raise tornado.web.HTTPError(400, reason="Nothing to update")
+
+        def update():
+            model = TransactionModel(self.user_id)
+            existing = model.get_transaction_by_id(transaction_id)
+            if existing is None:
+                raise tornado.web.HTTPError(404, reason="Transaction not found")
+            category_type = fields.get("type", existing["type"])
+            category = fields.get("category", existing.get("category"))
+            if ("type" in fields or "category" in fields) and \
+                    CategoryModel(self.user_id).get_category_id(category_type, category) is None:
+                raise tornado.web.HTTPError(400, reason=f"Unknown {category_type} category {category!r}")
+            model.update_transaction(transaction_id, **fields)
+            return model.get_transaction_by_id(transaction_id)
+
+        self.write_json(transaction_json(await self.run(update)))
+
+    async def delete(self, transaction_id: str):
+        deleted = await self.run(TransactionModel(self.user_id).delete_transaction, transaction_id)
+        if not deleted:
+            raise tornado.web.HTTPError(404, reason="Transaction not found")
+        self.set_status(204)
+        self.finish()
+
+
+# -----------------------------------------------------------
+# CATEGORIES
+# -----------------------------------------------------------
+class CategoriesHandler(BaseHandler):
+
+    async def get(self):
+        category_type = self.get_query_argument("type", None)
+        types = [category_type] if category_type else list(config.TRANSACTION_TYPES)
+        if category_type and category_type not in config.TRANSACTION_TYPES:
+            raise tornado.web.HTTPError(400, reason=f"type must be one of {', '.join(config.TRANSACTION_TYPES)}")
+
+        def compute():
+            model = CategoryModel(self.user_id)
+            return {t: [c["name"] for c in model.get_categories_by_type(t)] for t in types}
+
+        await self.respond_versioned(compute)
+
+    async def post(self):
+        body = self.json_body()
+        category_type, name = body.get("type"), (body.get("name") or "").strip()
+        if category_type not in config.TRANSACTION_TYPES:
+            raise tornado.web.HTTPError(400, reason=f"type must be one of {', '.join(config.TRANSACTION_TYPES)}")
+        if not name:
+            raise tornado.web.HTTPError(400, reason="name is required")
+
+        result = await self.run(CategoryModel(self.user_id).upsert_category, category_type, name)
+        created = result not in (None, True)
+        self.write_json({"type": category_type, "name": name, "created": created}, status=201 if created else 200)
+
+
+# -----------------------------------------------------------
+# ANALYTICS
+# -----------------------------------------------------------
+class AnalyticsHandler(BaseHandler):
+    """GET /api/analytics/<report>; reports are pure reads of FinanceAnalyzer"""
+
+    REPORTS = ("summary", "monthly-trend", "spending-by-category", "quantiles", "daily-average")
+
+    async def get(self, report: str):
+        if report not in self.REPORTS:
+            raise tornado.web.HTTPError(404, reason=f"Unknown report {report!r}")
+
+        months = self.int_argument("months", 6, minimum=1, maximum=120)
+        start_date, end_date = self.date_argument("start_date"), self.date_argument("end_date")
+        category = self.get_query_argument("category", None)
+        try:
+            quantiles = tuple(float(q) for q in self.get_query_argument("q", "0.5,0.9,0.99").split(","))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="q must be a comma separated list of numbers")
+        if any(not 0 <= q <= 1 for q in quantiles):
+            raise tornado.web.HTTPError(400, reason="q values must be between 0 and 1")
+
+        def compute():
+            from analytics.analyzer import FinanceAnalyzer
+
+            analyzer = FinanceAnalyzer(TransactionModel(self.user_id))
+            if report == "summary":
+                return analyzer.get_statistics_summary()
+            if report == "monthly-trend":
+                trend = analyzer.get_monthly_trend(months=months)
+                return {"months": _records(trend, "month")}
+            if report == "spending-by-category":
+                return {"categories": _records(analyzer.get_spending_by_category(start_date, end_date))}
+            if report == "quantiles":
+                values = analyzer.get_spending_quantiles(quantiles, category=category)
+                return {"category": category, "quantiles": {str(q): v for q, v in values.items()}}
+            return {"daily_average": analyzer.get_daily_average()}
+
+        await self.respond_versioned(compute)
+
+
+class VersionHandler(BaseHandler):
+
+    async def get(self):
+        version = await self.run(DataVersionModel().get_version, self.user_id)
+        self.write_json({"user_id": self.user_id, "data_version": version})
+
+
+# -----------------------------------------------------------
+# APPLICATION
+# -----------------------------------------------------------
+def make_app(executor: Optional[ThreadPoolExecutor] = None, workers: int = 8, **settings) -> tornado.web.Application:
+    """
+    Build the API application.
+
+    Args:
+        executor: Pool for blocking model calls (default: a new pool of `workers` threads)
+        settings: Extra tornado.web.Application settings
+    """
+    shared = {
+        "executor": executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api"),
+        "response_cache": OrderedDict(),
+    }
+    object_id = r"([0-9a-fA-F]{24})"
+    return tornado.web.Application(
+        [
+            (r"/api/version", VersionHandler, shared),
+            (r"/api/transactions", TransactionsHandler, shared),
+            (rf"/api/transactions/{object_id}", TransactionHandler, shared),
+            (r"/api/categories", CategoriesHandler, shared),
+            (r"/api/analytics/([a-z-]+)", AnalyticsHandler, shared),
+        ],
+        compress_response=True,
+        **settings
+    )
+
+
+async def serve(port: int, address: str, workers: int, run_jobs: bool = False):
+    app = make_app(workers=workers)
+    app.listen(port, address=address)
+    if run_jobs:
+        # claims jobs queued by any process (the Streamlit UI too); off by default
+        from database.jobs import JobRunner
+        JobRunner().start()
+    print(f"API listening on http://{address or '0.0.0.0'}:{port}/api")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless JSON API for the finance tracker")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the API server")
+    serve_parser.add_argument("--port", type=int, default=8600)
+    serve_parser.add_argument("--address", default="")
+    serve_parser.add_argument("--workers", type=int, default=8, help="Threads for database calls")
+    serve_parser.add_argument("--run-jobs", action="store_true", help="Also run queued background jobs in this process")
+
+    token_parser = commands.add_parser("issue-token", help="Create an API token for a user")
+    token_parser.add_argument("user_id")
+    token_parser.add_argument("--label", default="")
+
+    revoke_parser = commands.add_parser("revoke-tokens", help="Revoke all API tokens of a user")
+    revoke_parser.add_argument("user_id")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(serve(args.port, args.address, args.workers, args.run_jobs))
+    elif args.command == "issue-token":
+        print(UserModel().create_api_token(args.user_id, args.label))
+    else:
+        print(f"Revoked {UserModel().revoke_api_tokens(args.user_id)} token(s)")
@@ -5,16 +5,12 @@ import config
 from database.category_models import CategoryModel
 from database.transaction_model import TransactionModel
 from database.user_model import UserModel
-
-# import analytics
-from analytics.analyzer import FinanceAnalyzer
-from analytics.visualizer import FinanceVisualizer
+from database.data_version import DataVersionModel
+from utils import CachedReads
 
 # import view modules
-from views.category_view import render_categories
-from views.transaction_view import render_transactions
+# (page views and analytics are imported inside the router, only for the page shown)
 from views.user_view import render_user_profile
-from views.home_views import render_dashboard
 
 # initialize models
 @st.cache_resource
@@ -24,13 +20,28 @@ def init_models():
         "category": CategoryModel(),
         "transaction": TransactionModel(),
         "user": UserModel(),
+        "version": DataVersionModel(),
     }
 
+# background refresh of dashboard aggregates after writes (one per process)
+@st.cache_resource
+def init_precompute_worker():
+    from analytics.precompute import PrecomputeWorker
+    return PrecomputeWorker().start()
+
+# chunked background jobs (category rename / reassign / cascade)
+@st.cache_resource
+def init_job_runner():
+    from database.jobs import JobRunner
+    return JobRunner().start()
+
 # initialize session per user
 if "models" not in st.session_state:
     st.session_state['models'] = init_models()
 
 models = st.session_state['models']
+precompute_worker = init_precompute_worker()
+init_job_runner()
 
 # Page configuration
 st.set_page_config(
@@ -128,8 +139,9 @@ else:
     # Display user profile
     render_user_profile(user_model, user)
 
-    # init analyzer
-    analyzer_model = FinanceAnalyzer(models['transaction'])
+    # reads served from cache, keyed by user + data version (writes pass through)
+    transaction_reads = CachedReads(models['transaction'], models['version'])
+    category_reads = CachedReads(models['category'], models['version'])
 
     # =============================================
     # 2. Navigation
@@ -146,18 +158,36 @@ else:
     # 3. Router
     # =============================================
     if page == "🏠 Home":
+        from analytics.analyzer import FinanceAnalyzer
+        from analytics.visualizer import FinanceVisualizer
+        from analytics.precompute import PrecomputedAnalyzer
+        from database.dashboard_snapshot import DashboardSnapshotModel
+        from views.home_views import render_dashboard
+
         st.title("Home")
+        analyzer_model = FinanceAnalyzer(models['transaction'])
+
+        # dashboard aggregates come from the background snapshot when it is current
+        snapshot = DashboardSnapshotModel().get_current(
+            mongo_user_id, models['version'].get_version(mongo_user_id)
+        )
+        if snapshot is None:
+            precompute_worker.mark_dirty(mongo_user_id)
+        analyzer_reads = PrecomputedAnalyzer(CachedReads(analyzer_model, models['version']), snapshot)
         visualizer_model = FinanceVisualizer
         render_dashboard(
-            analyzer_model=analyzer_model,
-            transaction_model=models['transaction'],
+            analyzer_model=analyzer_reads,
+            transaction_model=transaction_reads,
             visualizer_model=visualizer_model
         )
     elif page == "📝 Transaction":
-        category_model = models['category']
-        transaction_model = models['transaction']
+        from views.transaction_view import render_transactions
+
+        category_model = category_reads
+        transaction_model = transaction_reads
         render_transactions(transaction_model=transaction_model, category_model=category_model)
     elif page == "🏷️ Category":
-        category_model = models['category']
-        print(list(category_model.collection.find()))
+        from views.category_view import render_categories
+
+        category_model = category_reads
         render_categories(category_model=category_model)
@@ -2,10 +2,14 @@ from .database_manager import DatabaseManager
 from .category_models import CategoryModel
 from .transaction_model import TransactionModel
 from .user_model import UserModel
+from .data_version import DataVersionModel
+from .transaction_writer import BufferedTransactionWriter
 
 __all__ = [
     "DatabaseManager",
     "CategoryModel",
     "TransactionModel",
-    "UserModel"
+    "UserModel",
+    "DataVersionModel",
+    "BufferedTransactionWriter"
 ]
@@ -1,15 +1,47 @@
 from .database_manager import DatabaseManager
+from .quantile_sketch import QuantileSketchModel
+from .data_version import DataVersionModel
+from .transaction_sync import TransactionTombstoneModel
+from .transaction_buckets import TransactionBucketModel
+from .transaction_archive import TransactionArchiveModel
+from .jobs import JobModel, JobRunner, JobHandler, JOB_HANDLERS
 from typing import Optional
 from datetime import datetime
+import threading
+import time
 from bson import ObjectId
 import config
 
 
 class CategoryModel:
+
+    # Pure reads, safe to serve from the version-keyed cache (utils.CachedReads).
+    # Category lists are not listed: they come from the in-memory catalog.
+    CACHEABLE_READS = (
+        "count_transactions_by_category",
+    )
+
+    # Per-user category catalog {user_id: {type: [category docs]}}, shared by
+    # every CategoryModel in the process and kept current write-through
+    _catalogs: dict = {}
+    # user_id -> category_version the catalog is current for
+    _catalog_versions: dict = {}
+    # user_id -> when that version was last compared with the stored one
+    _catalog_checked: dict = {}
+    _catalog_lock = threading.RLock()
+    # How long a catalog is served without checking for other processes' writes
+    CATALOG_CHECK_SECONDS = 5
+
     def __init__(self, user_id: Optional[str] = None):
         self.db_manager = DatabaseManager()
         self.collection = self.db_manager.get_collection("categories")
         self.transactions = self.db_manager.get_collection("transactions")
+        self.sketches = QuantileSketchModel()
+        self.versions = DataVersionModel()
+        self.tombstones = TransactionTombstoneModel()
+        self.buckets = TransactionBucketModel()
+        self.archive = TransactionArchiveModel()
+        self.jobs = JobModel()
 
         self.user_id = ObjectId(user_id) if user_id else None
 
@@ -30,13 +62,140 @@ class CategoryModel:
         if not self.user_id:
             return
 
-        # Expense defaults
-        for name in config.DEFAULT_CATEGORIES_EXPENSE:
-            self.upsert_category("Expense", name)
+        catalog = self._catalog()
+        defaults = {
+            "Expense": config.DEFAULT_CATEGORIES_EXPENSE,
+            "Income": config.DEFAULT_CATEGORIES_INCOME,
+        }
+        for category_type, names in defaults.items():
+            present = {c["name"] for c in catalog.get(category_type, [])}
+            for name in names:
+                if name not in present:
+                    self.upsert_category(category_type, name)
+
+    # ---------------------------------------------------------------------
+    # CATEGORY CATALOG
+    # ---------------------------------------------------------------------
+    def _catalog(self) -> dict:
+        """
+        Both category types of the current user, loaded with one query.
 
-        # Income defaults
-        for name in config.DEFAULT_CATEGORIES_INCOME:
-            self.upsert_category("Income", name)
+        Writes through this class update the catalog in place. It is stamped
+        with the user's category_version and reloaded when that moved on
+        without this process knowing (a category written by the API, a job
+        runner or another Streamlit worker); the stamp is compared at most
+        every CATALOG_CHECK_SECONDS, so a rerun's reads stay in memory.
+        """
+        with self._catalog_lock:
+            catalog = self._catalogs.get(self.user_id)
+            checked = self._catalog_checked.get(self.user_id, 0)
+            if catalog is not None and time.monotonic() - checked < self.CATALOG_CHECK_SECONDS:
+                return catalog
+
+        # read before loading: a write racing with the load bumps past it
+        version = self.versions.get_category_version(self.user_id)
+        with self._catalog_lock:
+            catalog = self._catalogs.get(self.user_id)
+            if catalog is None or self._catalog_versions.get(self.user_id) != version:
+                catalog = {t: [] for t in config.TRANSACTION_TYPES}
+                for doc in self.collection.find(
+                    {"user_id": self.user_id},
+                    {"name": 1, "type": 1, "created_at": 1, "last_modified": 1}
+                ):
+                    catalog.setdefault(doc["type"], []).append(doc)
+                self._catalogs[self.user_id] = catalog
+                self._catalog_versions[self.user_id] = version
+            self._catalog_checked[self.user_id] = time.monotonic()
+            return catalog
+
+    @classmethod
+    def drop_catalog(cls, user_id):
+        """Forget a user's catalog; the next read reloads it."""
+        with cls._catalog_lock:
+            user_id = ObjectId(user_id) if user_id else None
+            cls._catalogs.pop(user_id, None)
+            cls._catalog_versions.pop(user_id, None)
+            cls._catalog_checked.pop(user_id, None)
+
+    def _categories_changed(self):
+        """
+        Bump after a category write of this class. The write is already
+        applied to the catalog, so if nothing else bumped in between the
+        catalog stays current.
+        """
+        version = self.versions.bump_categories(self.user_id)
+        if version is None:
+            return
+        with self._catalog_lock:
+            if self._catalog_versions.get(self.user_id) == version - 1:
+                self._catalog_versions[self.user_id] = version
+
+    def get_category_names(self, refresh: bool = False) -> dict:
+        """{category_id: name} of both types, for resolving transactions' category_id"""
+        if refresh:
+            self.drop_catalog(self.user_id)
+        return {
+            c["_id"]: c["name"]
+            for entries in self._catalog().values()
+            for c in entries if c.get("_id") is not None
+        }
+
+    def get_category_ids(self, category_name: str, category_type: Optional[str] = None) -> list:
+        """Ids of the categories with this name (of one type, or of both)"""
+        catalog = self._catalog()
+        types = [category_type] if category_type else list(catalog)
+        return [
+            c["_id"] for t in types for c in catalog.get(t, [])
+            if c["name"] == category_name and c.get("_id") is not None
+        ]
+
+    def get_category_id(self, category_type: str, category_name: str, create: bool = False) -> Optional[ObjectId]:
+        """
+        Id of one category, from the catalog.
+
+        A miss reloads the catalog once (the category may have been created
+        by another process); with create=True a missing category is created.
+        """
+        if not self.user_id:
+            return None
+
+        ids = self.get_category_ids(category_name, category_type)
+        if not ids:
+            self.drop_catalog(self.user_id)
+            ids = self.get_category_ids(category_name, category_type)
+        if not ids and create:
+            self.upsert_category(category_type, category_name)
+            self.drop_catalog(self.user_id)
+            ids = self.get_category_ids(category_name, category_type)
+        return ids[0] if ids else None
+
+    def _catalog_put(self, category_type: str, doc: dict):
+        with self._catalog_lock:
+            catalog = self._catalogs.get(self.user_id)
+            if catalog is None:
+                return
+            entries = catalog.setdefault(category_type, [])
+            for entry in entries:
+                if entry["name"] == doc["name"]:
+                    entry.update(doc)
+                    return
+            entries.append(doc)
+
+    def _catalog_rename(self, category_type: str, old_name: str, new_name: str):
+        with self._catalog_lock:
+            catalog = self._catalogs.get(self.user_id)
+            if catalog is None:
+                return
+            for entry in catalog.get(category_type, []):
+                if entry["name"] == old_name:
+                    entry.update({"name": new_name, "last_modified": datetime.now()})
+
+    def _catalog_remove(self, category_type: str, name: str):
+        with self._catalog_lock:
+            catalog = self._catalogs.get(self.user_id)
+            if catalog is None:
+                return
+            catalog[category_type] = [c for c in catalog.get(category_type, []) if c["name"] != name]
 
     # ---------------------------------------------------------------------
     # UPSERT CATEGORY + HANDLE RENAME
@@ -44,32 +203,35 @@ class CategoryModel:
     def upsert_category(self, category_type: str, category_name: str, old_name: Optional[str] = None):
         """
         Create, update, or rename a category.
-        When renaming: update all linked transactions.
+        When renaming: see rename_category.
         """
         if not self.user_id:
             return None
 
         # RENAME CATEGORY
         if old_name and old_name != category_name:
-            # Update category name
-            self.collection.update_one(
-                {"user_id": self.user_id, "type": category_type, "name": old_name},
-                {"$set": {"name": category_name, "last_modified": datetime.now()}}
-            )
-
-            # Also update linked transactions
-            return self.update_transactions_category(old_name, category_name, category_type)
+            return self.rename_category(category_type, old_name, category_name)
 
         # CREATE OR UPDATE CATEGORY (normal upsert)
+        now = datetime.now()
         result = self.collection.update_one(
             {"user_id": self.user_id, "type": category_type, "name": category_name},
             {
-                "$set": {"last_modified": datetime.now()},
-                "$setOnInsert": {"created_at": datetime.now()}
+                "$set": {"last_modified": now},
+                "$setOnInsert": {"created_at": now}
             },
             upsert=True
         )
 
+        doc = {"name": category_name, "type": category_type, "last_modified": now}
+        if result.upserted_id:
+            doc.update({"_id": result.upserted_id, "created_at": now})
+        self._catalog_put(category_type, doc)
+
+        # Re-upserting an existing category is not a data change
+        if result.upserted_id:
+            self._categories_changed()
+
         return result.upserted_id or True
 
     # ---------------------------------------------------------------------
@@ -80,22 +242,20 @@ class CategoryModel:
         if not self.user_id:
             return []
 
-        return list(self.collection.find(
-            {
-                "user_id": self.user_id,
-                "type": category_type,
-                "name": {"$ne": exclude_name}
-            },
-            {"name": 1}
-        ))
+        return [
+            {"_id": c.get("_id"), "name": c["name"]}
+            for c in self._catalog().get(category_type, [])
+            if c["name"] != exclude_name
+        ]
     
     def delete_category_safe(
         self,
         category_type: str,
         category_name: str,
         strategy: str = "Block",
-        new_category: Optional[str] = None
-    ) -> bool:
+        new_category: Optional[str] = None,
+        background: bool = True
+    ):
         """
         Delete a category safely.
 
@@ -103,62 +263,61 @@ class CategoryModel:
         - Block     → prevent delete if linked to transactions.
         - Reassign  → move transactions to another chosen category.
         - Cascade   → delete all transactions in this category.
+
+        Reassign / Cascade with linked transactions run as a chunked job
+        (see database.jobs) that deletes the category once all transactions
+        are handled; the job id is returned. Otherwise returns a bool.
         """
         if not self.user_id:
             return False
 
+        if strategy not in ("Block", "Reassign", "Cascade"):
+            raise ValueError("Strategy must be 'Block', 'Reassign', or 'Cascade'")
+
         tx_count = self.count_transactions_by_category(category_type, category_name)
 
-        # ----------------------
-        # STRATEGY: BLOCK
-        # ----------------------
-        if strategy == "Block":
-            if tx_count > 0:
+        if tx_count > 0:
+            # ----------------------
+            # STRATEGY: BLOCK
+            # ----------------------
+            if strategy == "Block":
                 return False
 
-        # ----------------------
-        # STRATEGY: REASSIGN
-        # ----------------------
-        elif strategy == "Reassign":
-            if tx_count > 0:
+            # ----------------------
+            # STRATEGY: REASSIGN
+            # ----------------------
+            if strategy == "Reassign":
                 if not new_category:
                     # UI error prevention
                     return False
-
-                # Update transactions to the new category
-                self.transactions.update_many(
-                    {
-                        "user_id": self.user_id,
-                        "type": category_type,
-                        "category": category_name
-                    },
-                    {"$set": {"category": new_category}}
+                return self._queue_job(
+                    "move_transactions",
+                    {"type": category_type, "from": category_name, "to": new_category, "delete_source": True},
+                    tx_count,
+                    background
                 )
 
-        # ----------------------
-        # STRATEGY: CASCADE
-        # ----------------------
-        elif strategy == "Cascade":
-            if tx_count > 0:
-                self.transactions.delete_many(
-                    {
-                        "user_id": self.user_id,
-                        "type": category_type,
-                        "category": category_name
-                    }
-                )
+            # ----------------------
+            # STRATEGY: CASCADE
+            # ----------------------
+            return self._queue_job(
+                "cascade_category",
+                {"type": category_type, "name": category_name},
+                tx_count,
+                background
+            )
 
-        else:
-            raise ValueError("Strategy must be 'Block', 'Reassign', or 'Cascade'")
+        return self._delete_category_document(category_type, category_name)
 
-        # ----------------------
-        # DELETE CATEGORY ITSELF
-        # ----------------------
+    def _delete_category_document(self, category_type: str, category_name: str) -> bool:
         result = self.collection.delete_one({
             "user_id": self.user_id,
             "type": category_type,
             "name": category_name
         })
+        self._catalog_remove(category_type, category_name)
+        self.sketches.invalidate(self.user_id, category_type, category_name)
+        self._categories_changed()
 
         return result.deleted_count > 0
 
@@ -169,70 +328,125 @@ class CategoryModel:
         """Return how many transactions use this category."""
         if not self.user_id:
             return 0
-        return self.transactions.count_documents({
-            "user_id": self.user_id,
-            "type": category_type,
-            "category": category_name
-        })
-    
-    def rename_category(self, category_type: str, old_name: str, new_name: str) -> int:
-        """
-        Rename a category and update all related transactions.
-        Returns number of updated transactions.
-        """
-        if not self.user_id:
-            return 0
+        match = self._category_match(category_type, category_name)
+        count = self.transactions.count_documents(match)
+        if self.archive.reaches(self.user_id):
+            count += self.archive.count_documents(match)
+        return count
 
-        # Update category document
-        self.collection.update_one(
-            {"user_id": self.user_id, "type": category_type, "name": old_name},
-            {"$set": {
-                "name": new_name,
-                "last_modified": datetime.now()
-            }}
-        )
+    def _category_match(self, category_type: str, category_name: str) -> dict:
+        """
+        Query for the transactions of one category.
 
-        # Corrected transaction update (self.transactions)
+        Transactions reference their category by `category_id`; rows not yet
+        backfilled by database.migrations.migrate_category_ids still carry
+        the name (and no id), so at most one branch matches a row.
+        """
+        match = [{"category": category_name}]
+        category_id = self.get_category_id(category_type, category_name)
+        if category_id is not None:
+            match.append({"category_id": category_id})
+        return {"user_id": self.user_id, "type": category_type, "$or": match}
+
+    def _backfill_category_ids(self, category_type: str, category_name: str, category_id) -> int:
+        """Give not-yet-migrated rows of a category its id; nothing to do once migrated."""
         result = self.transactions.update_many(
-            {
-                "user_id": self.user_id,
-                "type": category_type,
-                "category": old_name
-            },
-            {"$set": {"category": new_name}}
+            {"user_id": self.user_id, "type": category_type, "category": category_name,
+             "category_id": {"$exists": False}},
+            {"$set": {"category_id": category_id}, "$unset": {"category": ""}}
         )
+        modified = result.modified_count
+        if self.archive.reaches(self.user_id):
+            modified += self.archive.update_many(
+                {"user_id": self.user_id, "type": category_type, "category": category_name,
+                 "category_id": {"$exists": False}},
+                {"$set": {"category_id": category_id}, "$unset": {"category": ""}}
+            )
+        return modified
 
-        return result.modified_count
+    def rename_category(self, category_type: str, old_name: str, new_name: str, background: bool = True) -> Optional[str]:
+        """
+        Rename a category.
+
+        Transactions reference the category by id and get the name from the
+        catalog at read time, so only the category document changes.
+        Renaming onto another existing category merges the two: its
+        transactions move over in a background job, whose id is returned.
+        """
+        if not self.user_id or old_name == new_name:
+            return None
+
+        category_id = self.get_category_id(category_type, old_name)
+        if category_id is None:
+            return None
+
+        if self.get_category_id(category_type, new_name) is not None:
+            return self._queue_job(
+                "move_transactions",
+                {"type": category_type, "from": old_name, "to": new_name, "delete_source": True},
+                self.count_transactions_by_category(category_type, old_name),
+                background
+            )
+
+        if self._backfill_category_ids(category_type, old_name, category_id):
+            self.buckets.invalidate(self.user_id)
+        self.collection.update_one(
+            {"_id": category_id, "user_id": self.user_id},
+            {"$set": {"name": new_name, "last_modified": datetime.now()}}
+        )
+        self._catalog_rename(category_type, old_name, new_name)
+        self.sketches.rename_category(self.user_id, category_type, old_name, new_name)
+        self._categories_changed()
+        return None
 
 
-    def update_transactions_category(self, old_name: str, new_name: str, category_type: str) -> int:
-        """Update all transactions linked to a renamed category."""
+    def update_transactions_category(self, old_name: str, new_name: str, category_type: str, background: bool = True) -> Optional[str]:
+        """Move all transactions of one category to another (chunked job). Returns the job id."""
         if not self.user_id:
-            return 0
+            return None
 
-        result = self.transactions.update_many(
-            {
-                "user_id": self.user_id,
-                "type": category_type,
-                "category": old_name
-            },
-            {"$set": {"category": new_name}}
+        return self._queue_job(
+            "move_transactions",
+            {"type": category_type, "from": old_name, "to": new_name, "delete_source": False},
+            self.count_transactions_by_category(category_type, old_name),
+            background
         )
 
-        return result.modified_count
+    # ---------------------------------------------------------------------
+    # BACKGROUND JOBS
+    # ---------------------------------------------------------------------
+    def _queue_job(self, kind: str, params: dict, total: int, background: bool) -> str:
+        """Queue a job for the runner thread, or run it right here when background=False."""
+        job_id = self.jobs.create(self.user_id, kind, params, total)
+        if not background:
+            runner = JobRunner()
+            job = self.jobs.claim(runner.lease, job_id)
+            if job:
+                runner.run_job(job)
+        return job_id
+
+    def get_active_jobs(self) -> list[dict]:
+        """Pending / running category jobs of the current user, oldest first."""
+        if not self.user_id:
+            return []
+        return self.jobs.list_for_user(self.user_id)
+
+    def _after_transactions_changed(self, category_type: str, names: list[str]):
+        for name in names:
+            self.sketches.invalidate(self.user_id, category_type, name)
+        # jobs do not know the months they touched
+        self.buckets.invalidate(self.user_id)
+        self.versions.bump(self.user_id)
 
     # ---------------------------------------------------------------------
     # GETTERS
     # ---------------------------------------------------------------------
     def get_categories_by_type(self, category_type: str):
-        """Return all categories (name + timestamps) for UI listing."""
+        """Return all categories (name + timestamps) for UI listing, from the catalog."""
         if not self.user_id:
             return []
 
-        return list(self.collection.find(
-            {"user_id": self.user_id, "type": category_type},
-            {"name": 1, "type": 1, "created_at": 1, "last_modified": 1}
-        ))
+        return [dict(c) for c in self._catalog().get(category_type, [])]
 
 
 class InvalidCategoryError(Exception):
@@ -287,3 +501,81 @@ class InvalidCategoryError(Exception):
         
         result = self.collection.delete_many(query)
         return result.deleted_count
+
+
+# ---------------------------------------------------------------------
+# JOB HANDLERS
+# ---------------------------------------------------------------------
+class MoveTransactionsJob(JobHandler):
+    """Move a category's transactions to another category, batch by batch."""
+
+    collection_name = config.COLLECTIONS["transaction"]
+
+    def __init__(self, job: dict):
+        super().__init__(job)
+        self.categories = CategoryModel(self.user_id)
+        self.target_id = self.categories.get_category_id(self.params["type"], self.params["to"], create=True)
+
+    def query(self) -> dict:
+        return self.categories._category_match(self.params["type"], self.params["from"])
+
+    def apply(self, ids: list) -> int:
+        result = self.collection.update_many(
+            {"$and": [self.query(), {"_id": {"$in": ids}}]},
+            {"$set": {"category_id": self.target_id, "last_modified": datetime.now()},
+             "$unset": {"category": ""}}
+        )
+        self.categories._after_transactions_changed(
+            self.params["type"], [self.params["from"], self.params["to"]]
+        )
+        return result.modified_count
+
+    def finish(self):
+        # archived rows are few per category and cold: one update instead of batches
+        if self.categories.archive.reaches(self.user_id):
+            moved = self.categories.archive.update_many(
+                self.query(),
+                {"$set": {"category_id": self.target_id, "last_modified": datetime.now()}, "$unset": {"category": ""}}
+            )
+            if moved:
+                self.categories._after_transactions_changed(
+                    self.params["type"], [self.params["from"], self.params["to"]]
+                )
+        if self.params.get("delete_source"):
+            self.categories._delete_category_document(self.params["type"], self.params["from"])
+
+
+class CascadeCategoryJob(JobHandler):
+    """Delete a category's transactions batch by batch, then the category."""
+
+    collection_name = config.COLLECTIONS["transaction"]
+
+    def __init__(self, job: dict):
+        super().__init__(job)
+        self.categories = CategoryModel(self.user_id)
+
+    def query(self) -> dict:
+        return self.categories._category_match(self.params["type"], self.params["name"])
+
+    def apply(self, ids: list) -> int:
+        # re-check the match: a row moved to another category since the id scan stays
+        result = self.collection.delete_many({"$and": [self.query(), {"_id": {"$in": ids}}]})
+        kept = {doc["_id"] for doc in self.collection.find({"_id": {"$in": ids}, "user_id": self.user_id}, {"_id": 1})}
+        # tombstones let synced sessions drop the rows
+        self.categories.tombstones.record(self.user_id, [i for i in ids if i not in kept])
+        self.categories._after_transactions_changed(self.params["type"], [self.params["name"]])
+        return result.deleted_count
+
+    def finish(self):
+        if self.categories.archive.reaches(self.user_id):
+            deleted = self.categories.archive.delete_matching(self.query())
+            if deleted:
+                self.categories.tombstones.record(self.user_id, deleted)
+                self.categories._after_transactions_changed(self.params["type"], [self.params["name"]])
+        self.categories._delete_category_document(self.params["type"], self.params["name"])
+
+
+JOB_HANDLERS.update({
+    "move_transactions": MoveTransactionsJob,
+    "cascade_category": CascadeCategoryJob,
+})
@@ -0,0 +1,49 @@
+from datetime import datetime, date
+from typing import Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from .database_manager import DatabaseManager
+import config
+
+
+class DashboardSnapshotModel:
+    """
+    Precomputed Home dashboard aggregates, one document per user.
+
+    A snapshot is only served while it matches the user's current data
+    version and was computed today (date ranges like "Last 30 Days" move).
+    """
+
+    def __init__(self):
+        self.db_manager = DatabaseManager()
+        self.collection = self.db_manager.get_collection(config.COLLECTIONS["dashboard_snapshot"])
+
+    def get_current(self, user_id, data_version: int) -> Optional[dict]:
+        if not user_id:
+            return None
+        return self.collection.find_one({
+            "user_id": ObjectId(user_id),
+            "data_version": data_version,
+            "computed_for": date.today().isoformat()
+        })
+
+    def save(self, user_id, data_version: int, payload: dict) -> bool:
+        """Store a snapshot unless a newer version is already stored."""
+        try:
+            self.collection.update_one(
+                {"user_id": ObjectId(user_id), "data_version": {"$lte": data_version}},
+                {"$set": {
+                    **payload,
+                    "data_version": data_version,
+                    "computed_for": date.today().isoformat(),
+                    "computed_at": datetime.now()
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # a newer snapshot won the race
+            return False
+
+    def delete_user_snapshots(self, user_id) -> int:
+        return self.collection.delete_many({"user_id": ObjectId(user_id)}).deleted_count
@@ -0,0 +1,73 @@
+from typing import Optional, Callable
+from bson import ObjectId
+from pymongo import ReturnDocument
+from .database_manager import DatabaseManager
+import config
+
+
+class DataVersionModel:
+    """
+    Per-user data version, stored on the user document.
+
+    Every write to a user's transactions or categories bumps it, so caches
+    keyed on (user, version) are invalidated the moment data changes.
+    Category writes also bump `category_version`, which only the category
+    catalog (CategoryModel) is keyed on.
+    """
+
+    # Callbacks run after every bump as callback(user_id, new_version),
+    # e.g. the dashboard precompute worker marking the user dirty
+    _listeners: list = []
+
+    @classmethod
+    def add_listener(cls, callback: Callable):
+        if callback not in cls._listeners:
+            cls._listeners.append(callback)
+
+    @classmethod
+    def remove_listener(cls, callback: Callable):
+        if callback in cls._listeners:
+            cls._listeners.remove(callback)
+
+    def __init__(self):
+        self.db_manager = DatabaseManager()
+        self.collection = self.db_manager.get_collection(config.COLLECTIONS["user"])
+
+    def get_version(self, user_id) -> int:
+        if not user_id:
+            return 0
+        user = self.collection.find_one({"_id": ObjectId(user_id)}, {"data_version": 1})
+        return (user or {}).get("data_version", 0)
+
+    def get_category_version(self, user_id) -> int:
+        if not user_id:
+            return 0
+        user = self.collection.find_one({"_id": ObjectId(user_id)}, {"category_version": 1})
+        return (user or {}).get("category_version", 0)
+
+    def bump(self, user_id) -> Optional[int]:
+        return self._bump(user_id, categories=False).get("data_version")
+
+    def bump_categories(self, user_id) -> Optional[int]:
+        """bump() for a category write; returns the new category_version"""
+        return self._bump(user_id, categories=True).get("category_version")
+
+    def _bump(self, user_id, categories: bool) -> dict:
+        if not user_id:
+            return {}
+        increments = {"data_version": 1, "category_version": 1} if categories else {"data_version": 1}
+        user = self.collection.find_one_and_update(
+            {"_id": ObjectId(user_id)},
+            {"$inc": increments},
+            projection=dict.fromkeys(increments, 1),
+            return_document=ReturnDocument.AFTER
+        ) or {}
+        version = user.get("data_version")
+
+        for callback in list(self._listeners):
+            try:
+                callback(user_id, version)
+            except Exception as e:
+                print(f"Error in data version listener: {e}")
+
+        return user
@@ -1,14 +1,11 @@
-from pymongo import MongoClient, DESCENDING
-import streamlit as st
+from pymongo import DESCENDING
 import os
 import sys
 
 # Đảm bảo nhận diện được file config.py ở thư mục gốc
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-try:
-    import config
-except ImportError:
-    config = None
+import config
+from .partitioning import PartitionRouter, RoutedCollection, PARTITIONED_COLLECTIONS, get_client
 
 class DatabaseManager:
     _instance = None
@@ -20,41 +17,95 @@ class DatabaseManager:
         return cls._instance
 
     def _initialize(self):
-        # 1. Lấy URI từ Streamlit Secrets (Ưu tiên trên Web) hoặc file Config (Local)
-        mongo_uri = None
-        try:
-            if "mongo" in st.secrets:
-                mongo_uri = st.secrets["mongo"]["MONGO_URI"]
-        except:
-            pass
-            
-        if not mongo_uri and config:
-            mongo_uri = config.MONGO_URI_FINAL
+        # 1. Lấy URI từ settings (env -> .env -> Streamlit secrets), resolve một lần
+        settings = config.get_settings()
 
         # 2. Kết nối
-        print(f"Connecting to MongoDB...") 
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client["finance_tracker_db"]
+        print(f"Connecting to MongoDB (URI from {settings.source})...")
+        self.client = get_client(settings.mongo_uri)
+        self.db = self.client[settings.database_name]
+
+        # Dữ liệu theo user chia trên nhiều instance khi có MONGO_PARTITIONS
+        self.router = None
+        if settings.partitions:
+            self.router = PartitionRouter.from_settings(settings, self.db[config.COLLECTIONS["user"]])
+            print(f"Routing user data over {len(self.router.databases)} partitions")
         
         try:
             # Kiểm tra kết nối thực tế
             self.client.admin.command('ping')
+            for db in self._partition_databases():
+                db.client.admin.command('ping')
             print("MongoDB Connected Successfully!")
             self._create_index()
         except Exception as e:
             print(f"Connection Failed: {e}")
             raise e
 
-    def _create_index(self):
-        """Tạo index để tăng tốc độ truy vấn"""
-        try:
-            self.db.transactions.create_index([("user_id", DESCENDING), ("date", DESCENDING)])
-        except:
-            pass
+    def _create_index(self) -> list[str]:
+        """Tạo index để tăng tốc độ truy vấn; trả về các index tạo thất bại"""
+        failures = []
+        for db in [self.db] + self._partition_databases():
+            failures += self._create_database_index(db)
+        return failures
+
+    def _partition_databases(self) -> list:
+        if self.router is None:
+            return []
+        return [
+            db for db in self.router.databases.values()
+            if db.client is not self.client or db.name != self.db.name
+        ]
+
+    def _create_database_index(self, db) -> list[str]:
+        # (collection, keys, options); each is created on its own, so one failure
+        # (e.g. a conflicting existing index) does not skip the ones after it
+        indexes = [
+            ("transactions", [("user_id", DESCENDING), ("date", DESCENDING)], {}),
+            ("transactions", [("user_id", 1), ("last_modified", 1)], {}),
+            # list order (get_transactions / get_transactions_page) without an in-memory
+            # sort; a date range is filtered on the index keys (equality, sort, range)
+            ("transactions", [("user_id", 1), ("created_at", DESCENDING), ("_id", DESCENDING), ("date", 1)], {}),
+            ("transactions", [("user_id", 1), ("type", 1), ("category_id", 1)], {}),
+            # amount range filters; rows from before the cents migration match on `amount`
+            ("transactions", [("user_id", 1), ("amount_cents", 1)], {}),
+            ("transactions", [("user_id", 1), ("amount", 1)],
+             {"partialFilterExpression": {"amount": {"$exists": True}}}),
+            ("transactions", [("user_id", 1), ("idempotency_key", 1)],
+             {"unique": True, "partialFilterExpression": {"idempotency_key": {"$exists": True}}}),
+            ("transactions_archive", [("user_id", 1), ("date", 1)], {}),
+            ("transactions_archive", [("user_id", 1), ("created_at", DESCENDING), ("_id", DESCENDING), ("date", 1)], {}),
+            ("transactions_archive", [("user_id", 1), ("amount_cents", 1)], {}),
+            ("transactions_archive", [("user_id", 1), ("amount", 1)],
+             {"partialFilterExpression": {"amount": {"$exists": True}}}),
+            ("transaction_tombstones", [("user_id", 1), ("deleted_at", 1)], {}),
+            ("transaction_tombstones", "deleted_at",
+             {"expireAfterSeconds": config.TOMBSTONE_RETENTION_DAYS * 24 * 3600}),
+            ("batch_checkpoints", [("run_id", 1), ("user_id", 1)], {"unique": True}),
+            ("analytics_results", [("user_id", 1), ("run_id", 1)], {"unique": True}),
+            ("dashboard_snapshots", "user_id", {"unique": True}),
+            ("transaction_buckets", [("user_id", 1), ("month", 1)], {"unique": True}),
+            ("users", "api_tokens.hash", {"sparse": True}),
+            ("jobs", [("status", 1), ("created_at", 1)], {}),
+            ("jobs", [("user_id", 1), ("status", 1)], {}),
+            ("quantile_sketches", [("user_id", 1), ("type", 1), ("category", 1)], {"unique": True}),
+        ]
+        failures = []
+        for collection, keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+            except Exception as e:
+                print(f"Index creation failed on {db.name}.{collection} {keys}: {e}")
+                failures.append(f"{db.name}.{collection} {keys}: {e}")
+        return failures
 
     def get_collection(self, collection_name: str):
+        if self.router is not None and collection_name in PARTITIONED_COLLECTIONS:
+            return RoutedCollection(self.router, collection_name)
         return self.db[collection_name]
 
     def close_connection(self):
         if self.client:
             self.client.close()
+        for db in self._partition_databases():
+            db.client.close()
@@ -0,0 +1,259 @@
+"""
+Chunked, resumable background jobs.
+
+A job walks the documents matching its handler's query in `_id` order,
+applies the handler to one batch at a time and stores the last processed
+`_id` after every batch, so a job interrupted by a restart resumes where
+it stopped. Jobs are claimed with a lease; a job whose runner died is
+picked up again once the lease expires.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from .database_manager import DatabaseManager
+import config
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = [JOB_PENDING, JOB_RUNNING]
+
+# kind -> handler class, filled in by the modules that define handlers
+JOB_HANDLERS: dict = {}
+
+
+class JobHandler:
+    """
+    Base class for job kinds.
+
+    Subclasses set `collection_name` and implement query() / apply();
+    finish() runs once after the last batch and may return a result dict
+    that is stored on the job. `batch_size` / `throttle_seconds` override
+    the runner's defaults when set.
+    """
+
+    collection_name: str = ""
+    batch_size: Optional[int] = None
+    throttle_seconds: Optional[float] = None
+
+    def __init__(self, job: dict):
+        self.job = job
+        self.params = job["params"]
+        self.user_id = job["user_id"]
+        self.collection = DatabaseManager().get_collection(self.collection_name)
+
+    def query(self) -> dict:
+        raise NotImplementedError
+
+    def apply(self, ids: list) -> int:
+        """Process one batch of matching `_id`s; return how many were changed"""
+        raise NotImplementedError
+
+    def finish(self) -> Optional[dict]:
+        return None
+
+
+# ---------------------------------------------------------------------
+# STORAGE
+# ---------------------------------------------------------------------
+class JobModel:
+
+    # set whenever a job is queued, so an idle runner in this process wakes up
+    queued = threading.Event()
+
+    def __init__(self):
+        self.db_manager = DatabaseManager()
+        self.collection = self.db_manager.get_collection(config.COLLECTIONS["job"])
+
+    def create(self, user_id, kind: str, params: dict, total: int = 0) -> str:
+        """Queue a job; an identical active job is returned instead of a duplicate."""
+        existing = self.collection.find_one({
+            "user_id": ObjectId(user_id),
+            "kind": kind,
+            "params": params,
+            "status": {"$in": ACTIVE_STATUSES}
+        }, {"_id": 1})
+        if existing:
+            return str(existing["_id"])
+
+        result = self.collection.insert_one({
+            "user_id": ObjectId(user_id),
+            "kind": kind,
+            "params": params,
+            "status": JOB_PENDING,
+            "last_id": None,
+            "processed": 0,
+            "total": total,
+            "error": None,
+            "lease_until": None,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        })
+        self.queued.set()
+        return str(result.inserted_id)
+
+    def get(self, job_id) -> Optional[dict]:
+        return self.collection.find_one({"_id": ObjectId(job_id)})
+
+    def list_for_user(self, user_id, active_only: bool = True) -> list[dict]:
+        query = {"user_id": ObjectId(user_id)}
+        if active_only:
+            query["status"] = {"$in": ACTIVE_STATUSES}
+        return list(self.collection.find(query).sort("created_at", 1))
+
+    def claim(self, lease: timedelta, job_id=None) -> Optional[dict]:
+        """Atomically take the oldest runnable job (or `job_id`) and lease it."""
+        now = datetime.now()
+        query = {
+            "status": {"$in": ACTIVE_STATUSES},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+        }
+        if job_id:
+            query["_id"] = ObjectId(job_id)
+        return self.collection.find_one_and_update(
+            query,
+            {"$set": {"status": JOB_RUNNING, "lease_until": now + lease, "updated_at": now}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def save_progress(self, job_id, last_id, processed: int, lease: timedelta):
+        now = datetime.now()
+        self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "last_id": last_id,
+                "updated_at": now,
+                "lease_until": now + lease
+            }, "$inc": {"processed": processed}}
+        )
+
+    def finish(self, job_id, error: Optional[str] = None, result: Optional[dict] = None):
+        self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "status": JOB_FAILED if error else JOB_DONE,
+                "error": error,
+                "result": result,
+                "lease_until": None,
+                "updated_at": datetime.now()
+            }}
+        )
+
+    def delete_user_jobs(self, user_id, keep_job_id=None) -> int:
+        query = {"user_id": ObjectId(user_id)}
+        if keep_job_id:
+            query["_id"] = {"$ne": ObjectId(keep_job_id)}
+        return self.collection.delete_many(query).deleted_count
+
+
+# ---------------------------------------------------------------------
+# RUNNER
+# ---------------------------------------------------------------------
+class JobRunner:
+    """
+    Runs queued jobs batch by batch.
+
+    start() runs them on a daemon thread; run_job() / run_pending() run in
+    the caller's thread. `throttle_seconds` is slept between batches to
+    keep write pressure (and lock time) per batch small.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        throttle_seconds: float = 0.05,
+        poll_seconds: float = 5.0,
+        lease: timedelta = timedelta(seconds=60)
+    ):
+        self.batch_size = batch_size
+        self.throttle_seconds = throttle_seconds
+        self.poll_seconds = poll_seconds
+        self.lease = lease
+        self.jobs = JobModel()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "JobRunner":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="job-runner", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        JobModel.queued.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            JobModel.queued.clear()
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"Error in job runner: {e}")
+            JobModel.queued.wait(self.poll_seconds)
+
+    def run_pending(self) -> int:
+        """Run claimable jobs until none are left; returns how many ran."""
+        count = 0
+        while not self._stop.is_set():
+            job = self.jobs.claim(self.lease)
+            if job is None:
+                break
+            self.run_job(job)
+            count += 1
+        return count
+
+    def run_job(self, job: dict) -> dict:
+        """Run a claimed job to completion (or failure) and return its final state."""
+        try:
+            handler_class = JOB_HANDLERS.get(job["kind"])
+            if handler_class is None:
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+            handler = handler_class(job)
+            batch_size = handler.batch_size or self.batch_size
+            throttle_seconds = (
+                self.throttle_seconds if handler.throttle_seconds is None else handler.throttle_seconds
+            )
+
+            last_id = job.get("last_id")
+            while not self._stop.is_set():
+                query = handler.query()
+                if last_id is not None:
+                    query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+                ids = [
+                    doc["_id"] for doc in
+                    handler.collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size)
+                ]
+                if not ids:
+                    break
+
+                changed = handler.apply(ids)
+                last_id = ids[-1]
+                self.jobs.save_progress(job["_id"], last_id, changed, self.lease)
+
+                if throttle_seconds:
+                    time.sleep(throttle_seconds)
+
+            if self._stop.is_set():
+                # leave it running; the lease expires and it resumes from last_id
+                return self.jobs.get(job["_id"])
+
+            # final counters (processed) for the handler's summary
+            handler.job = self.jobs.get(job["_id"])
+            self.jobs.finish(job["_id"], result=handler.finish())
+        except Exception as e:
+            print(f"Error running job {job['_id']} ({job['kind']}): {e}")
+            self.jobs.finish(job["_id"], error=str(e))
+
+        return self.jobs.get(job["_id"])
+
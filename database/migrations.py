@@ -0,0 +1,250 @@
+"""
+Online data migrations.
+
+Run with:
+    python -m database.migrations amount-cents --batch-size 1000
+    python -m database.migrations category-ids
+    python -m database.migrations reset-buckets
+
+Each migration walks the documents it still has to convert in `_id` order,
+one batch per bulk_write, so it can run against a live database and be
+re-run after an interruption (converted documents no longer match).
+With MONGO_PARTITIONS set, the scans cover every partition and each update
+is routed by the user_id in its filter.
+"""
+
+import argparse
+import time
+from datetime import datetime
+from bson.int64 import Int64
+from pymongo import UpdateOne
+
+import config
+from database.database_manager import DatabaseManager
+from database.data_version import DataVersionModel
+from database.category_models import CategoryModel
+from database.transaction_buckets import TransactionBucketModel
+from utils import to_cents
+
+
+# -----------------------------------------------------------
+# AMOUNT -> AMOUNT_CENTS
+# -----------------------------------------------------------
+def migrate_amount_cents(
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    throttle_seconds: float = 0.0
+) -> dict:
+    """
+    Convert float `amount` fields to int64 `amount_cents`.
+
+    Each update is guarded on the old amount, so a row edited concurrently
+    (which the model already stores in cents) is left alone.
+
+    Args:
+        batch_size: Documents converted per bulk_write
+        dry_run: Only count what would be converted
+        throttle_seconds: Pause between batches to limit write pressure
+
+    Returns:
+        dict: {'scanned', 'converted', 'rounded', 'invalid', 'batches'}
+    """
+    collection = DatabaseManager().get_collection(config.COLLECTIONS["transaction"])
+    versions = DataVersionModel()
+    buckets = TransactionBucketModel()
+
+    query = {"amount_cents": {"$exists": False}, "amount": {"$exists": True}}
+    stats = {"scanned": 0, "converted": 0, "rounded": 0, "invalid": 0, "batches": 0}
+    started = time.perf_counter()
+    last_id = None
+
+    while True:
+        batch_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        rows = list(
+            collection.find(batch_query, {"amount": 1, "user_id": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not rows:
+            break
+        last_id = rows[-1]["_id"]
+
+        operations = []
+        user_ids = set()
+        now = datetime.now()
+        for row in rows:
+            try:
+                cents = to_cents(row["amount"])
+            except Exception:
+                print(f"Skipping transaction {row['_id']}: invalid amount {row['amount']!r}")
+                stats["invalid"] += 1
+                continue
+            if cents / 100 != row["amount"]:
+                stats["rounded"] += 1
+            operations.append(UpdateOne(
+                {"_id": row["_id"], "user_id": row["user_id"], "amount": row["amount"]},
+                {"$set": {"amount_cents": Int64(cents), "last_modified": now}, "$unset": {"amount": ""}}
+            ))
+            user_ids.add(row["user_id"])
+
+        stats["scanned"] += len(rows)
+        stats["batches"] += 1
+
+        if operations and not dry_run:
+            result = collection.bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+            for user_id in user_ids:
+                buckets.invalidate(user_id)
+                versions.bump(user_id)
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"[amount-cents] {stats['scanned']} scanned | {stats['converted']} converted | "
+            f"{stats['scanned'] / elapsed:.0f} docs/s"
+        )
+
+        if throttle_seconds:
+            time.sleep(throttle_seconds)
+
+    return stats
+
+
+# -----------------------------------------------------------
+# CATEGORY NAME -> CATEGORY_ID
+# -----------------------------------------------------------
+def migrate_category_ids(
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    throttle_seconds: float = 0.0
+) -> dict:
+    """
+    Replace transactions' `category` name with the `category_id` of the
+    user's category of that type and name.
+
+    Names without a category document (left behind by older renames) get
+    one, so every transaction resolves to a name afterwards. Updates are
+    guarded on the old name, so concurrent edits are left alone.
+
+    Args:
+        batch_size: Documents converted per bulk_write
+        dry_run: Only count what would be converted
+        throttle_seconds: Pause between batches to limit write pressure
+
+    Returns:
+        dict: {'scanned', 'converted', 'created_categories', 'batches'}
+    """
+    db_manager = DatabaseManager()
+    collection = db_manager.get_collection(config.COLLECTIONS["transaction"])
+    categories = db_manager.get_collection(config.COLLECTIONS["category"])
+    versions = DataVersionModel()
+    buckets = TransactionBucketModel()
+
+    query = {"category_id": {"$exists": False}, "category": {"$exists": True}}
+    stats = {"scanned": 0, "converted": 0, "created_categories": 0, "batches": 0}
+    category_ids = {}  # (user_id, type, name) -> _id
+    started = time.perf_counter()
+    last_id = None
+
+    def category_id(user_id, category_type, name):
+        key = (user_id, category_type, name)
+        if key not in category_ids:
+            doc = categories.find_one({"user_id": user_id, "type": category_type, "name": name}, {"_id": 1})
+            if doc is None and not dry_run:
+                now = datetime.now()
+                result = categories.update_one(
+                    {"user_id": user_id, "type": category_type, "name": name},
+                    {"$set": {"last_modified": now}, "$setOnInsert": {"created_at": now}},
+                    upsert=True
+                )
+                stats["created_categories"] += 1 if result.upserted_id else 0
+                doc = categories.find_one({"user_id": user_id, "type": category_type, "name": name}, {"_id": 1})
+            elif doc is None:
+                stats["created_categories"] += 1
+            category_ids[key] = doc["_id"] if doc else None
+        return category_ids[key]
+
+    while True:
+        batch_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        rows = list(
+            collection.find(batch_query, {"category": 1, "type": 1, "user_id": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not rows:
+            break
+        last_id = rows[-1]["_id"]
+
+        operations = []
+        user_ids = set()
+        now = datetime.now()
+        for row in rows:
+            target = category_id(row["user_id"], row.get("type"), row["category"])
+            if target is None:
+                continue
+            operations.append(UpdateOne(
+                {"_id": row["_id"], "user_id": row["user_id"], "category": row["category"], "category_id": {"$exists": False}},
+                {"$set": {"category_id": target, "last_modified": now}, "$unset": {"category": ""}}
+            ))
+            user_ids.add(row["user_id"])
+
+        stats["scanned"] += len(rows)
+        stats["batches"] += 1
+
+        if operations and not dry_run:
+            result = collection.bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+            for user_id in user_ids:
+                CategoryModel.drop_catalog(user_id)
+                buckets.invalidate(user_id)
+                # categories may have been created: other processes reload their catalog
+                versions.bump_categories(user_id)
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"[category-ids] {stats['scanned']} scanned | {stats['converted']} converted | "
+            f"{stats['scanned'] / elapsed:.0f} docs/s"
+        )
+
+        if throttle_seconds:
+            time.sleep(throttle_seconds)
+
+    return stats
+
+
+# -----------------------------------------------------------
+# BUCKET LAYOUT
+# -----------------------------------------------------------
+def reset_buckets(batch_size: int = 1000, dry_run: bool = False, throttle_seconds: float = 0.0) -> dict:
+    """
+    Drop all transaction buckets; they are rebuilt on their next read.
+
+    Writers only invalidate buckets while TRANSACTION_LAYOUT=bucket, so run
+    this when switching the layout back on after running without it.
+    """
+    collection = DatabaseManager().get_collection(config.COLLECTIONS["transaction_bucket"])
+    if dry_run:
+        return {"deleted": 0, "would_delete": collection.count_documents({})}
+    return {"deleted": collection.delete_many({}).deleted_count}
+
+
+MIGRATIONS = {
+    "amount-cents": migrate_amount_cents,
+    "category-ids": migrate_category_ids,
+    "reset-buckets": reset_buckets,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an online data migration")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--throttle", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents without changing them")
+    args = parser.parse_args()
+
+    summary = MIGRATIONS[args.migration](
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        throttle_seconds=args.throttle
+    )
+    print(summary)
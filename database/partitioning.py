@@ -0,0 +1,625 @@
+"""
+User-partitioned storage.
+
+With MONGO_PARTITIONS set, per-user collections (transactions, categories and
+the collections derived from them) are spread over several MongoDB instances.
+A user's documents all live on one partition, picked by consistent hashing of
+the user id, so adding a partition only moves the users whose ring position
+it takes over. Users, jobs and other shared collections stay on MONGO_URI.
+
+DatabaseManager.get_collection hands the models a RoutedCollection, which
+sends each operation to the partition of the user in its filter or document,
+so the models need no changes.
+
+A user can be pinned to a partition other than its ring partition (the
+`partition` field of the user document). Pins are how data stays reachable
+while the ring changes. While a user is being moved its user document also
+carries `moving`; writes for that user wait until the move has re-routed it:
+
+    python -m database.partitioning pin-all          # before changing MONGO_PARTITIONS
+    python -m database.partitioning rebalance        # after: move pinned users to their ring partition
+    python -m database.partitioning move-user <user_id> --to p1
+
+For local testing, mongomock://<name> URIs give in-memory instances (one per
+name and process).
+"""
+
+import argparse
+import bisect
+import hashlib
+import time
+from datetime import datetime
+from typing import Any, Iterable, Optional
+from bson import ObjectId
+from pymongo import MongoClient, InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError, PyMongoError
+import config
+
+# Collections holding one user's documents, always filtered by user_id
+PARTITIONED_COLLECTIONS = (
+    config.COLLECTIONS["transaction"],
+    config.COLLECTIONS["transaction_archive"],
+    config.COLLECTIONS["category"],
+    config.COLLECTIONS["budget"],
+    config.COLLECTIONS["transaction_tombstone"],
+    config.COLLECTIONS["quantile_sketch"],
+    config.COLLECTIONS["dashboard_snapshot"],
+    config.COLLECTIONS["transaction_bucket"],
+)
+
+# Rebuilt from the collections above on their next read, so a move drops them instead of copying
+DERIVED_COLLECTIONS = (
+    config.COLLECTIONS["quantile_sketch"],
+    config.COLLECTIONS["dashboard_snapshot"],
+    config.COLLECTIONS["transaction_bucket"],
+)
+
+# Transactions (hot and archived) always carry last_modified, so a move catches
+# up on what changed since it started; these small per-user collections have
+# no reliable timestamp (tombstones only deleted_at, categories from older
+# code none) and are copied again in full instead
+INCREMENTAL_COLLECTIONS = (
+    config.COLLECTIONS["transaction"],
+    config.COLLECTIONS["transaction_archive"],
+)
+
+VIRTUAL_NODES = 64
+# How long a process trusts its cached copy of a user's pin
+PIN_CACHE_SECONDS = 30
+# How long a write waits for the move of its user to finish, and how often it checks
+MOVE_WAIT_SECONDS = 120
+MOVE_POLL_SECONDS = 0.5
+
+
+class PartitionMoveError(PyMongoError):
+    """A write for a user whose move did not finish within MOVE_WAIT_SECONDS"""
+
+
+# -----------------------------------------------------------
+# CLIENTS
+# -----------------------------------------------------------
+_clients: dict[str, Any] = {}
+
+
+def get_client(uri: str):
+    """Shared client per URI; mongomock://<name> is an in-memory instance"""
+    if uri not in _clients:
+        if uri.startswith("mongomock://"):
+            try:
+                import mongomock
+            except ImportError:
+                raise RuntimeError(f"{uri} needs the mongomock package (pip install mongomock)")
+            _clients[uri] = mongomock.MongoClient()
+        else:
+            _clients[uri] = MongoClient(uri)
+    return _clients[uri]
+
+
+# -----------------------------------------------------------
+# HASH RING
+# -----------------------------------------------------------
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """Maps keys to node names; each node owns VIRTUAL_NODES points on the ring."""
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = VIRTUAL_NODES):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(virtual_nodes))
+        if not points:
+            raise ValueError("A hash ring needs at least one node")
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get(self, key) -> str:
+        i = bisect.bisect(self._hashes, _hash(str(key))) % len(self._hashes)
+        return self._nodes[i]
+
+
+# -----------------------------------------------------------
+# ROUTER
+# -----------------------------------------------------------
+class PartitionRouter:
+    """Resolves a user id to its partition: the pin on the user document, else the ring."""
+
+    def __init__(self, partitions: dict, users_collection):
+        """
+        Args:
+            partitions: {name: Database}, in MONGO_PARTITIONS order
+            users_collection: Unpartitioned users collection holding the pins
+        """
+        self.databases = dict(partitions)
+        self.ring = ConsistentHashRing(self.databases)
+        self.users = users_collection
+        self._pins: dict[ObjectId, tuple[str, bool, float]] = {}  # user_id -> (partition, moving, fetched at)
+
+    @classmethod
+    def from_settings(cls, settings, users_collection) -> "PartitionRouter":
+        return cls(
+            {name: get_client(uri)[settings.database_name] for name, uri in settings.partitions},
+            users_collection
+        )
+
+    def ring_partition(self, user_id) -> str:
+        return self.ring.get(ObjectId(user_id))
+
+    def _lookup(self, user_id: ObjectId, refresh: bool) -> tuple[str, bool]:
+        cached = self._pins.get(user_id)
+        # a moving user is looked up again every time, so its re-routing is seen at once
+        if cached and not cached[1] and not refresh and time.monotonic() - cached[2] < PIN_CACHE_SECONDS:
+            return cached[0], cached[1]
+
+        user = self.users.find_one({"_id": user_id}, {"partition": 1, "moving": 1}) or {}
+        pinned = user.get("partition")
+        partition = pinned if pinned in self.databases else self.ring_partition(user_id)
+        moving = bool(user.get("moving"))
+        self._pins[user_id] = (partition, moving, time.monotonic())
+        return partition, moving
+
+    def partition_for(self, user_id, refresh: bool = False) -> str:
+        return self._lookup(ObjectId(user_id), refresh)[0]
+
+    def partition_for_write(self, user_id) -> str:
+        """partition_for, waiting while the user is being moved"""
+        user_id = ObjectId(user_id)
+        partition, moving = self._lookup(user_id, refresh=False)
+        deadline = time.monotonic() + MOVE_WAIT_SECONDS
+        while moving:
+            if time.monotonic() >= deadline:
+                raise PartitionMoveError(f"User {user_id} is being moved to another partition, retry later")
+            time.sleep(MOVE_POLL_SECONDS)
+            partition, moving = self._lookup(user_id, refresh=True)
+        return partition
+
+    def set_moving(self, user_id, moving: bool):
+        """Flag (or unflag) a user as being moved: its writes wait while flagged"""
+        user_id = ObjectId(user_id)
+        if moving:
+            self.users.update_one({"_id": user_id}, {"$set": {"moving": True}})
+        else:
+            self.users.update_one({"_id": user_id}, {"$unset": {"moving": ""}})
+        self._pins.pop(user_id, None)
+
+    def pin(self, user_id, partition: str):
+        """Route user_id to `partition` (a pin on its ring partition is dropped); ends a move"""
+        if partition not in self.databases:
+            raise ValueError(f"Unknown partition {partition!r}")
+        user_id = ObjectId(user_id)
+        if partition == self.ring_partition(user_id):
+            self.users.update_one({"_id": user_id}, {"$unset": {"partition": "", "moving": ""}})
+        else:
+            self.users.update_one({"_id": user_id}, {"$set": {"partition": partition}, "$unset": {"moving": ""}})
+        self._pins[user_id] = (partition, False, time.monotonic())
+
+    def collection(self, name: str, partition: str, **options):
+        collection = self.databases[partition][name]
+        return collection.with_options(**options) if options else collection
+
+    def collections(self, name: str, **options) -> list:
+        return [self.collection(name, partition, **options) for partition in self.databases]
+
+
+def _user_of(query) -> Optional[ObjectId]:
+    """user_id an operation is scoped to (top level or inside $and), if any"""
+    if not isinstance(query, dict):
+        return None
+    value = query.get("user_id")
+    if isinstance(value, ObjectId) or (isinstance(value, str) and ObjectId.is_valid(value)):
+        return ObjectId(value)
+    for clause in query.get("$and", []):
+        user_id = _user_of(clause)
+        if user_id is not None:
+            return user_id
+    return None
+
+
+class _CombinedResult:
+    """Write result summed over partitions"""
+
+    def __init__(self, results: Iterable):
+        results = list(results)
+        for field in ("inserted_count", "matched_count", "modified_count", "deleted_count", "upserted_count"):
+            setattr(self, field, sum(getattr(r, field, 0) or 0 for r in results))
+        self.inserted_ids = [i for r in results for i in getattr(r, "inserted_ids", [])]
+        self.upserted_id = next((r.upserted_id for r in results if getattr(r, "upserted_id", None)), None)
+        self.acknowledged = all(getattr(r, "acknowledged", True) for r in results)
+
+
+class _FanOutCursor:
+    """Minimal cursor over the same find on every partition (sort / limit applied after merging)"""
+
+    def __init__(self, cursors: list):
+        self._cursors = cursors
+        self._sort = []
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        for cursor in self._cursors:
+            cursor.sort(self._sort)
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        for cursor in self._cursors:
+            cursor.limit(limit)
+        return self
+
+    def batch_size(self, batch_size: int):
+        for cursor in self._cursors:
+            cursor.batch_size(batch_size)
+        return self
+
+    def __iter__(self):
+        rows = [row for cursor in self._cursors for row in cursor]
+        for key, direction in reversed(self._sort):
+            rows.sort(key=lambda r: (r.get(key) is not None, r.get(key)), reverse=direction < 0)
+        return iter(rows[:self._limit] if self._limit else rows)
+
+
+class RoutedCollection:
+    """
+    Collection facade over one collection on every partition.
+
+    Operations scoped to a user (user_id in the filter or document) go to
+    that user's partition. Unscoped reads and *_many writes fan out to all
+    partitions; unscoped *_one writes apply to the first partition that
+    matches.
+    """
+
+    def __init__(self, router: PartitionRouter, name: str, **options):
+        self.router = router
+        self.name = name
+        self._options = options
+
+    def with_options(self, **options) -> "RoutedCollection":
+        return RoutedCollection(self.router, self.name, **{**self._options, **options})
+
+    def _for_user(self, user_id):
+        return self.router.collection(self.name, self.router.partition_for(user_id), **self._options)
+
+    def _route(self, query):
+        user_id = _user_of(query)
+        return self._for_user(user_id) if user_id is not None else None
+
+    def _route_write(self, query):
+        user_id = _user_of(query)
+        if user_id is None:
+            return None
+        return self.router.collection(self.name, self.router.partition_for_write(user_id), **self._options)
+
+    def _all(self) -> list:
+        return self.router.collections(self.name, **self._options)
+
+    # ----------------------
+    # READS
+    # ----------------------
+    def find(self, filter=None, *args, **kwargs):
+        collection = self._route(filter)
+        if collection is not None:
+            return collection.find(filter, *args, **kwargs)
+        return _FanOutCursor([c.find(filter, *args, **kwargs) for c in self._all()])
+
+    def find_one(self, filter=None, *args, **kwargs):
+        collection = self._route(filter)
+        if collection is not None:
+            return collection.find_one(filter, *args, **kwargs)
+        for c in self._all():
+            doc = c.find_one(filter, *args, **kwargs)
+            if doc is not None:
+                return doc
+        return None
+
+    def count_documents(self, filter, **kwargs) -> int:
+        collection = self._route(filter)
+        if collection is not None:
+            return collection.count_documents(filter, **kwargs)
+        return sum(c.count_documents(filter, **kwargs) for c in self._all())
+
+    def distinct(self, key, filter=None, **kwargs) -> list:
+        collection = self._route(filter)
+        if collection is not None:
+            return collection.distinct(key, filter, **kwargs)
+        values = []
+        for c in self._all():
+            values.extend(v for v in c.distinct(key, filter, **kwargs) if v not in values)
+        return values
+
+    def aggregate(self, pipeline: list, **kwargs):
+        first = pipeline[0].get("$match") if pipeline else None
+        collection = self._route(first)
+        if collection is not None:
+            return collection.aggregate(pipeline, **kwargs)
+        # per-partition results, not re-grouped: only meaningful for row-level pipelines
+        return iter([row for c in self._all() for row in c.aggregate(pipeline, **kwargs)])
+
+    # ----------------------
+    # WRITES
+    # ----------------------
+    def _require(self, doc: dict):
+        collection = self._route_write(doc)
+        if collection is None:
+            raise ValueError(f"Documents written to partitioned collection {self.name!r} need a user_id")
+        return collection
+
+    def insert_one(self, document: dict, **kwargs):
+        return self._require(document).insert_one(document, **kwargs)
+
+    def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs):
+        return self.bulk_write([InsertOne(d) for d in documents], ordered=ordered, **kwargs)
+
+    def bulk_write(self, requests: list, ordered: bool = True, **kwargs):
+        """One bulk_write per partition; BulkWriteError indexes refer to `requests`"""
+        groups: dict[str, list[int]] = {}
+        for i, request in enumerate(requests):
+            user_id = _user_of(getattr(request, "_filter", None)) or _user_of(getattr(request, "_doc", None))
+            if user_id is None:
+                raise ValueError(f"Bulk writes to partitioned collection {self.name!r} need a user_id per operation")
+            groups.setdefault(self.router.partition_for_write(user_id), []).append(i)
+
+        results, errors = [], []
+        counts = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0}
+        for partition, indexes in groups.items():
+            collection = self.router.collection(self.name, partition, **self._options)
+            try:
+                results.append(collection.bulk_write([requests[i] for i in indexes], ordered=ordered, **kwargs))
+            except BulkWriteError as e:
+                errors.extend({**error, "index": indexes[error["index"]]} for error in e.details.get("writeErrors", []))
+                for field in counts:
+                    counts[field] += e.details.get(field, 0)
+                if ordered:
+                    break
+
+        if errors:
+            combined = _CombinedResult(results)
+            counts["nInserted"] += combined.inserted_count
+            counts["nMatched"] += combined.matched_count
+            counts["nModified"] += combined.modified_count
+            counts["nRemoved"] += combined.deleted_count
+            counts["nUpserted"] += combined.upserted_count
+            raise BulkWriteError({"writeErrors": sorted(errors, key=lambda e: e["index"]), **counts})
+        result = _CombinedResult(results)
+        # pymongo assigns missing _ids on the caller's documents
+        result.inserted_ids = [r._doc.get("_id") for r in requests if isinstance(r, InsertOne)]
+        return result
+
+    def _write_one(self, method: str, filter, *args, **kwargs):
+        collection = self._route_write(filter)
+        if collection is not None:
+            return getattr(collection, method)(filter, *args, **kwargs)
+        if kwargs.get("upsert"):
+            raise ValueError(f"Upserts into partitioned collection {self.name!r} need a user_id")
+        result = None
+        for c in self._all():
+            result = getattr(c, method)(filter, *args, **kwargs)
+            if result is not None and getattr(result, "matched_count", getattr(result, "deleted_count", 1)):
+                break
+        return result
+
+    def _write_many(self, method: str, filter, *args, **kwargs):
+        collection = self._route_write(filter)
+        if collection is not None:
+            return getattr(collection, method)(filter, *args, **kwargs)
+        return _CombinedResult(getattr(c, method)(filter, *args, **kwargs) for c in self._all())
+
+    def update_one(self, filter, update, **kwargs):
+        return self._write_one("update_one", filter, update, **kwargs)
+
+    def replace_one(self, filter, replacement, **kwargs):
+        return self._write_one("replace_one", filter, replacement, **kwargs)
+
+    def delete_one(self, filter, **kwargs):
+        return self._write_one("delete_one", filter, **kwargs)
+
+    def find_one_and_update(self, filter, update, **kwargs):
+        return self._write_one("find_one_and_update", filter, update, **kwargs)
+
+    def find_one_and_delete(self, filter, **kwargs):
+        return self._write_one("find_one_and_delete", filter, **kwargs)
+
+    def update_many(self, filter, update, **kwargs):
+        return self._write_many("update_many", filter, update, **kwargs)
+
+    def delete_many(self, filter, **kwargs):
+        return self._write_many("delete_many", filter, **kwargs)
+
+    def create_index(self, keys, **kwargs):
+        return [c.create_index(keys, **kwargs) for c in self._all()][0]
+
+
+# -----------------------------------------------------------
+# REBALANCING
+# -----------------------------------------------------------
+def _router() -> PartitionRouter:
+    from database.database_manager import DatabaseManager
+
+    router = DatabaseManager().router
+    if router is None:
+        raise RuntimeError("Partitioning is not configured (set MONGO_PARTITIONS)")
+    return router
+
+
+def _copy_user_documents(router, name, user_id, source, target, batch_size, since=None) -> int:
+    query = {"user_id": user_id}
+    if since is not None:
+        query["last_modified"] = {"$gte": since}
+    destination = router.collection(name, target)
+
+    copied, batch = 0, []
+    for doc in router.collection(name, source).find(query).sort("_id", 1).batch_size(batch_size):
+        batch.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+        if len(batch) >= batch_size:
+            destination.bulk_write(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+    if batch:
+        destination.bulk_write(batch, ordered=False)
+        copied += len(batch)
+    return copied
+
+
+def _carry_deletes(router, user_id, source, target, since: datetime):
+    """Delete on the target what was deleted on the (frozen) source after the first copy"""
+    deleted = [
+        doc["transaction_id"] for doc in router.collection(config.COLLECTIONS["transaction_tombstone"], source).find(
+            {"user_id": user_id, "deleted_at": {"$gte": since}}, {"transaction_id": 1}
+        )
+    ]
+    if deleted:
+        for name in INCREMENTAL_COLLECTIONS:
+            router.collection(name, target).delete_many({"user_id": user_id, "_id": {"$in": deleted}})
+
+    # the collections copied in full: whatever the source no longer has
+    for name in (config.COLLECTIONS["category"], config.COLLECTIONS["budget"]):
+        kept = router.collection(name, source).distinct("_id", {"user_id": user_id})
+        router.collection(name, target).delete_many({"user_id": user_id, "_id": {"$nin": kept}})
+
+
+def move_user(
+    user_id,
+    target: Optional[str] = None,
+    batch_size: int = 500,
+    dry_run: bool = False,
+    settle_seconds: float = PIN_CACHE_SECONDS
+) -> dict:
+    """
+    Move one user's documents to another partition.
+
+    Copies in batches while the user keeps working on the source, then flags
+    the user as moving and waits until every process has seen the flag, so
+    the user's writes wait. With the source frozen it copies what was
+    modified meanwhile (categories, budgets and tombstones in full), carries
+    deletes over (tombstoned transactions, and categories / budgets gone from
+    the source), re-routes the user (pin, which lifts the flag) and deletes
+    the user's documents on the source.
+    Derived collections are not copied; they are rebuilt on the target.
+    Best run while the user is idle: their writes wait for up to about
+    settle_seconds plus the catch-up copy.
+
+    Args:
+        user_id: User to move
+        target: Destination partition (default: the user's ring partition)
+        batch_size: Documents per bulk_write
+        dry_run: Only count the documents that would move
+        settle_seconds: Wait after flagging the move before the catch-up
+            copy, so other processes have dropped their cached pin
+
+    Returns:
+        dict: {'user_id', 'source', 'target', 'copied': {collection: n}, 'deleted': {collection: n}}
+    """
+    router = _router()
+    user_id = ObjectId(user_id)
+    source = router.partition_for(user_id, refresh=True)
+    target = target or router.ring_partition(user_id)
+    if target not in router.databases:
+        raise ValueError(f"Unknown partition {target!r}")
+
+    summary = {"user_id": str(user_id), "source": source, "target": target, "copied": {}, "deleted": {}}
+    if source == target:
+        router.pin(user_id, target)
+        return summary
+
+    copied_names = [n for n in PARTITIONED_COLLECTIONS if n not in DERIVED_COLLECTIONS]
+    if dry_run:
+        summary["copied"] = {
+            n: router.collection(n, source).count_documents({"user_id": user_id}) for n in copied_names
+        }
+        return summary
+
+    started = datetime.now()
+    for name in copied_names:
+        summary["copied"][name] = _copy_user_documents(router, name, user_id, source, target, batch_size)
+
+    router.set_moving(user_id, True)
+    try:
+        # other processes keep writing to the source until their cached pin expires
+        time.sleep(settle_seconds)
+        for name in copied_names:
+            since = started if name in INCREMENTAL_COLLECTIONS else None
+            summary["copied"][name] += _copy_user_documents(
+                router, name, user_id, source, target, batch_size, since=since
+            )
+        _carry_deletes(router, user_id, source, target, since=started)
+        router.pin(user_id, target)
+    except BaseException:
+        router.set_moving(user_id, False)
+        raise
+
+    for name in PARTITIONED_COLLECTIONS:
+        summary["deleted"][name] = router.collection(name, source).delete_many({"user_id": user_id}).deleted_count
+
+    from database.category_models import CategoryModel
+    from database.data_version import DataVersionModel
+
+    CategoryModel.drop_catalog(user_id)
+    DataVersionModel().bump(user_id)
+    return summary
+
+
+def pin_all(dry_run: bool = False) -> dict:
+    """Pin every user to the partition it is on now, so a ring change moves nobody until rebalanced"""
+    router = _router()
+    pinned = 0
+    for user in router.users.find({}, {"_id": 1}):
+        partition = router.partition_for(user["_id"], refresh=True)
+        if not dry_run:
+            router.users.update_one({"_id": user["_id"]}, {"$set": {"partition": partition}})
+        pinned += 1
+    return {"pinned": pinned}
+
+
+def rebalance(batch_size: int = 500, dry_run: bool = False, settle_seconds: float = PIN_CACHE_SECONDS) -> dict:
+    """Move every user that is not on its ring partition there"""
+    router = _router()
+    stats = {"users": 0, "moved": 0, "failed": []}
+    for user in router.users.find({"partition": {"$exists": True}}, {"_id": 1}):
+        stats["users"] += 1
+        try:
+            summary = move_user(user["_id"], batch_size=batch_size, dry_run=dry_run, settle_seconds=settle_seconds)
+        except Exception as e:
+            print(f"Error moving user {user['_id']}: {e}")
+            stats["failed"].append(str(user["_id"]))
+            continue
+        if summary["source"] != summary["target"]:
+            stats["moved"] += 1
+            print(f"[rebalance] {summary['user_id']}: {summary['source']} -> {summary['target']} {summary['copied']}")
+    return stats
+
+
+if __name__ == "__main__":
+    # import by module path so the CLI shares the client registry with DatabaseManager
+    from database import partitioning
+
+    parser = argparse.ArgumentParser(description="Inspect and rebalance user partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    locate = commands.add_parser("locate", help="Show a user's partition")
+    locate.add_argument("user_id")
+
+    move = commands.add_parser("move-user", help="Move one user's documents to another partition")
+    move.add_argument("user_id")
+    move.add_argument("--to", dest="target", help="Target partition (default: the user's ring partition)")
+
+    commands.add_parser("pin-all", help="Pin every user to its current partition")
+    commands.add_parser("rebalance", help="Move pinned users to their ring partition")
+
+    for command in (move, commands.choices["pin-all"], commands.choices["rebalance"]):
+        command.add_argument("--dry-run", action="store_true", help="Report without moving anything")
+    for command in (move, commands.choices["rebalance"]):
+        command.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.command == "locate":
+        router = partitioning._router()
+        print({
+            "user_id": args.user_id,
+            "partition": router.partition_for(args.user_id, refresh=True),
+            "ring_partition": router.ring_partition(args.user_id)
+        })
+    elif args.command == "move-user":
+        print(partitioning.move_user(args.user_id, args.target, batch_size=args.batch_size, dry_run=args.dry_run))
+    elif args.command == "pin-all":
+        print(partitioning.pin_all(dry_run=args.dry_run))
+    else:
+        print(partitioning.rebalance(batch_size=args.batch_size, dry_run=args.dry_run))
@@ -0,0 +1,303 @@
+import math
+import random
+from datetime import datetime
+from typing import Optional, Iterable
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from .database_manager import DatabaseManager
+from .transaction_archive import TransactionArchiveModel
+from utils import normalize_amount
+import config
+
+
+# ---------------------------------------------------------------------
+# KLL SKETCH
+# ---------------------------------------------------------------------
+class KLLSketch:
+    """
+    Mergeable quantile sketch (Karnin-Lang-Liberty).
+
+    Keeps at most ~3k values regardless of stream length. While fewer than
+    k values have been seen nothing is compacted, so small histories are exact.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.compactors: list[list] = [[]]
+
+    # ----------------------
+    # SIZE BOOKKEEPING
+    # ----------------------
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _size(self) -> int:
+        return sum(len(c) for c in self.compactors)
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.compactors) == 1
+
+    # ----------------------
+    # UPDATE / MERGE
+    # ----------------------
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+
+        self.n += other.n
+        for bound in (other.min, other.max):
+            if bound is not None:
+                self.min = bound if self.min is None else min(self.min, bound)
+                self.max = bound if self.max is None else max(self.max, bound)
+
+        while self._size() >= self._max_size():
+            self._compress()
+        return self
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 >= len(self.compactors):
+                    self.compactors.append([])
+
+                items = sorted(self.compactors[level])
+                # odd length: the leftover item stays at this level
+                leftover = [items.pop()] if len(items) % 2 else []
+                offset = random.randint(0, 1)
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = leftover
+
+                if self._size() < self._max_size():
+                    break
+
+    # ----------------------
+    # QUERIES
+    # ----------------------
+    def quantile(self, q: float):
+        """Return the value at rank q (0..1). None if the sketch is empty."""
+        if self.n == 0:
+            return None
+
+        if self.is_exact:
+            # linear interpolation, same as pandas/numpy default
+            items = sorted(self.compactors[0])
+            position = q * (len(items) - 1)
+            lower = int(math.floor(position))
+            upper = min(lower + 1, len(items) - 1)
+            return items[lower] + (items[upper] - items[lower]) * (position - lower)
+
+        weighted = sorted(
+            (value, 2 ** level)
+            for level, items in enumerate(self.compactors)
+            for value in items
+        )
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return self.max
+
+    def quantiles(self, qs: Iterable[float]) -> dict:
+        return {q: self.quantile(q) for q in qs}
+
+    # ----------------------
+    # SERIALIZATION
+    # ----------------------
+    def to_dict(self) -> dict:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min,
+            "max": self.max,
+            "compactors": self.compactors
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "KLLSketch":
+        sketch = cls()
+        if not data:
+            return sketch
+        sketch.k = data.get("k", sketch.k)
+        sketch.n = data.get("n", 0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        sketch.compactors = data.get("compactors") or [[]]
+        return sketch
+
+    @classmethod
+    def from_values(cls, values: Iterable, k: int = 200) -> "KLLSketch":
+        sketch = cls(k=k)
+        for value in values:
+            sketch.update(value)
+        return sketch
+
+
+# ---------------------------------------------------------------------
+# PERSISTED SKETCHES (per user, type, category)
+# ---------------------------------------------------------------------
+class QuantileSketchModel:
+    """
+    Stores one KLLSketch per (user, transaction type, category).
+
+    Inserts are folded into the sketch on write. Sketches cannot forget values,
+    so updates and deletes mark the sketch stale and it is rebuilt from the
+    transactions on the next read.
+    """
+
+    MAX_RETRIES = 5
+
+    def __init__(self):
+        self.db_manager = DatabaseManager()
+        self.collection = self.db_manager.get_collection(config.COLLECTIONS["quantile_sketch"])
+        self.categories = self.db_manager.get_collection(config.COLLECTIONS["category"])
+        self.archive = TransactionArchiveModel()
+
+    @staticmethod
+    def _key(user_id, transaction_type: str, category: str) -> dict:
+        return {"user_id": ObjectId(user_id), "type": transaction_type, "category": category}
+
+    # ----------------------
+    # WRITE PATH
+    # ----------------------
+    def record(self, user_id, transaction_type: str, category: str, amount) -> bool:
+        """Fold one new amount into the sketch (optimistic concurrency on `version`)."""
+        return self.record_many(user_id, transaction_type, category, [amount])
+
+    def record_many(self, user_id, transaction_type: str, category: str, amounts: Iterable) -> bool:
+        """Fold several new amounts into the sketch with one update (batched inserts)."""
+        amounts = list(amounts)
+        key = self._key(user_id, transaction_type, category)
+
+        for _ in range(self.MAX_RETRIES):
+            doc = self.collection.find_one(key)
+
+            if doc is None:
+                # first write for this category: seed from history (includes this row)
+                self.rebuild(user_id, transaction_type, category)
+                return True
+
+            sketch = KLLSketch.from_dict(doc.get("sketch"))
+            for amount in amounts:
+                sketch.update(amount)
+            result = self.collection.update_one(
+                {"_id": doc["_id"], "version": doc.get("version", 0)},
+                {
+                    "$set": {"sketch": sketch.to_dict(), "last_modified": datetime.now()},
+                    "$inc": {"version": 1}
+                }
+            )
+            if result.matched_count:
+                return True
+
+        # too much contention: let the next read rebuild it
+        self.invalidate(user_id, transaction_type, category)
+        return False
+
+    def invalidate(self, user_id, transaction_type: str, category: Optional[str] = None):
+        """Mark sketches stale after updates / deletes."""
+        query = {"user_id": ObjectId(user_id), "type": transaction_type}
+        if category is not None:
+            query["category"] = category
+        self.collection.update_many(query, {"$set": {"stale": True}, "$inc": {"version": 1}})
+
+    def rename_category(self, user_id, transaction_type: str, old_name: str, new_name: str):
+        """Follow a category rename; sketches are keyed by category name."""
+        self.collection.delete_many(self._key(user_id, transaction_type, new_name))
+        self.collection.update_one(
+            self._key(user_id, transaction_type, old_name),
+            {"$set": {"category": new_name}, "$inc": {"version": 1}}
+        )
+
+    def delete_user_sketches(self, user_id) -> int:
+        result = self.collection.delete_many({"user_id": ObjectId(user_id)})
+        return result.deleted_count
+
+    # ----------------------
+    # READ PATH
+    # ----------------------
+    def rebuild(self, user_id, transaction_type: str, category: str) -> KLLSketch:
+        """Recompute one sketch from the stored transactions."""
+        key = self._key(user_id, transaction_type, category)
+
+        for _ in range(self.MAX_RETRIES):
+            doc = self.collection.find_one(key) or {}
+            cursor = self.archive.find(
+                key["user_id"],
+                {"user_id": key["user_id"], "type": transaction_type, "$or": self._category_match(key, category)},
+                {"amount_cents": 1, "amount": 1}
+            )
+            sketch = KLLSketch.from_values(normalize_amount(t)["amount"] for t in cursor)
+
+            try:
+                result = self.collection.update_one(
+                    {**key, "version": doc.get("version", 0)},
+                    {
+                        "$set": {"sketch": sketch.to_dict(), "stale": False, "last_modified": datetime.now()},
+                        "$inc": {"version": 1}
+                    },
+                    upsert=not doc
+                )
+            except DuplicateKeyError:
+                continue  # created concurrently
+            if result.matched_count or result.upserted_id:
+                return sketch
+
+        return sketch
+
+    def _category_match(self, key: dict, category: str) -> list[dict]:
+        """Transactions reference the category by id; rows not yet backfilled by name"""
+        match = [{"category": category}]
+        category_doc = self.categories.find_one(
+            {"user_id": key["user_id"], "type": key["type"], "name": category}, {"_id": 1}
+        )
+        if category_doc:
+            match.append({"category_id": category_doc["_id"]})
+        return match
+
+    def get_sketch(self, user_id, transaction_type: str, category: Optional[str] = None) -> KLLSketch:
+        """Merged sketch for one category, or for all categories of a type."""
+        query = {"user_id": ObjectId(user_id), "type": transaction_type}
+        if category is not None:
+            query["category"] = category
+
+        merged = KLLSketch()
+        seen = set()
+        for doc in self.collection.find(query):
+            seen.add(doc["category"])
+            if doc.get("stale"):
+                sketch = self.rebuild(user_id, transaction_type, doc["category"])
+            else:
+                sketch = KLLSketch.from_dict(doc.get("sketch"))
+            merged.merge(sketch)
+
+        # categories with history from before sketches existed: build them once
+        if category is not None:
+            names = {category}
+        else:
+            names = set(self.categories.distinct("name", {"user_id": query["user_id"], "type": transaction_type}))
+        for name in names - seen:
+            merged.merge(self.rebuild(user_id, transaction_type, name))
+
+        return merged
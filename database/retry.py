@@ -0,0 +1,32 @@
+"""
+Retries for transient MongoDB errors.
+
+Only writes that are safe to repeat go through these: inserts carry a
+client-assigned `_id` (and optionally an idempotency key), so a retry after
+a timeout that did reach the server fails on the unique index instead of
+inserting twice; $set updates and deletes by `_id` are idempotent as is.
+"""
+
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+DUPLICATE_KEY = 11000
+
+# AutoReconnect, NetworkTimeout and ServerSelectionTimeoutError are ConnectionFailures
+retry_transient = retry(
+    retry=retry_if_exception_type(ConnectionFailure),
+    wait=wait_exponential(multiplier=0.1, max=2.0),
+    stop=stop_after_attempt(5),
+    reraise=True
+)
+
+
+def only_duplicates(error: BulkWriteError) -> bool:
+    """True when every failed operation of a bulk write hit a unique index (already written)"""
+    errors = error.details.get("writeErrors", [])
+    return bool(errors) and all(e.get("code") == DUPLICATE_KEY for e in errors) \
+        and not error.details.get("writeConcernErrors")
+
+
+def is_duplicate(error: Exception) -> bool:
+    return isinstance(error, DuplicateKeyError) or (isinstance(error, BulkWriteError) and only_duplicates(error))
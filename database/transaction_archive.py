@@ -0,0 +1,270 @@
+"""
+Cold archive for old transactions.
+
+Transactions dated before a cutoff are moved from `transactions` into
+`transactions_archive` by a chunked background job, which keeps the hot
+collection (and its indexes) sized to the recent history the dashboard
+reads. Each user's cutoff is stored on the user document as
+`archived_before`; reads whose date range starts before it (or is open)
+also read the archive, all others never touch it.
+
+Run with:
+    python -m database.transaction_archive --older-than-days 730
+    python -m database.transaction_archive --user-id <id> --dry-run
+
+Editing or deleting an archived transaction first moves it back to
+`transactions`; the next archive run picks it up again.
+"""
+
+import argparse
+import heapq
+import itertools
+from datetime import datetime, date, timedelta
+from typing import Iterable, Optional
+from bson import ObjectId
+from pymongo import ReplaceOne, DeleteOne
+from .database_manager import DatabaseManager
+from .data_version import DataVersionModel
+from .jobs import JobHandler, JobModel, JobRunner, JOB_HANDLERS
+import config
+
+
+def archive_cutoff(older_than_days: int = config.TRANSACTION_ARCHIVE_AFTER_DAYS) -> datetime:
+    """Midnight `older_than_days` ago, so runs on the same day share one cutoff"""
+    return datetime.combine(date.today() - timedelta(days=older_than_days), datetime.min.time())
+
+
+def _unique(rows: Iterable[dict]):
+    """Drop the second copy of rows caught between the copy and the delete of a move"""
+    seen = set()
+    for row in rows:
+        row_id = row.get("_id")
+        if row_id is not None:
+            if row_id in seen:
+                continue
+            seen.add(row_id)
+        yield row
+
+
+class TransactionArchiveModel:
+
+    def __init__(self):
+        self.db_manager = DatabaseManager()
+        self.collection = self.db_manager.get_collection(config.COLLECTIONS["transaction_archive"])
+        self.transactions = self.db_manager.get_collection(config.COLLECTIONS["transaction"])
+        self.users = self.db_manager.get_collection(config.COLLECTIONS["user"])
+
+    # ----------------------
+    # CUTOFF
+    # ----------------------
+    def get_cutoff(self, user_id) -> Optional[datetime]:
+        """Rows dated before this may be archived; None when the user has no archive"""
+        if not user_id:
+            return None
+        user = self.users.find_one({"_id": ObjectId(user_id)}, {"archived_before": 1})
+        return (user or {}).get("archived_before")
+
+    def reaches(self, user_id, start_date=None) -> bool:
+        """Whether a read starting at start_date (None: open range) needs the archive"""
+        cutoff = self.get_cutoff(user_id)
+        if cutoff is None:
+            return False
+        if start_date is None:
+            return True
+        if isinstance(start_date, date) and not isinstance(start_date, datetime):
+            start_date = datetime.combine(start_date, datetime.min.time())
+        return start_date < cutoff
+
+    # ----------------------
+    # READ PATH
+    # ----------------------
+    def find(self, user_id, query: dict, projection: Optional[dict] = None, start_date=None,
+             sort: Optional[tuple] = None, batch_size: Optional[int] = None):
+        """
+        Rows matching `query` in `transactions`, plus the archive when the
+        range reaches past the user's cutoff.
+
+        Args:
+            sort: (field, direction); both sides are sorted server-side and merged
+            batch_size: Cursor batch size for streaming reads
+        """
+        cursors = [self.transactions.find(query, projection)]
+        if self.reaches(user_id, start_date):
+            cursors.append(self.collection.find(query, projection))
+
+        for cursor in cursors:
+            if sort:
+                cursor.sort(*sort)
+            if batch_size:
+                cursor.batch_size(batch_size)
+
+        if len(cursors) == 1:
+            return cursors[0]
+        if sort:
+            field, direction = sort
+            merged = heapq.merge(
+                *cursors, key=lambda t: t.get(field) or datetime.min, reverse=direction < 0
+            )
+        else:
+            merged = itertools.chain(*cursors)
+        return _unique(merged)
+
+    def find_one(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        return self.collection.find_one(query, projection)
+
+    def union_stage(self, match: dict) -> dict:
+        """$unionWith stage adding the archive's rows matching `match` to a pipeline"""
+        return {"$unionWith": {"coll": config.COLLECTIONS["transaction_archive"], "pipeline": [{"$match": match}]}}
+
+    def count_documents(self, query: dict) -> int:
+        return self.collection.count_documents(query)
+
+    # ----------------------
+    # MOVES
+    # ----------------------
+    def archive_rows(self, user_id, ids: list) -> int:
+        """
+        Move rows to the archive: copy, then delete each row only if it was
+        not modified since it was copied (it stays hot until the next run).
+        """
+        user_id = ObjectId(user_id)
+        rows = list(self.transactions.find({"_id": {"$in": ids}, "user_id": user_id}))
+        if not rows:
+            return 0
+
+        self.collection.bulk_write(
+            [ReplaceOne({"_id": row["_id"], "user_id": user_id}, row, upsert=True) for row in rows],
+            ordered=False
+        )
+        result = self.transactions.bulk_write(
+            [DeleteOne({"_id": row["_id"], "user_id": user_id, "last_modified": row.get("last_modified")}) for row in rows],
+            ordered=False
+        )
+        return result.deleted_count
+
+    def restore(self, user_id, ids: Iterable) -> int:
+        """Move archived rows back to `transactions` (before they are edited or deleted)"""
+        ids = [ObjectId(i) for i in ids]
+        if not ids or self.get_cutoff(user_id) is None:
+            return 0
+        user_id = ObjectId(user_id)
+
+        rows = list(self.collection.find({"_id": {"$in": ids}, "user_id": user_id}))
+        if not rows:
+            return 0
+        self.transactions.bulk_write(
+            [ReplaceOne({"_id": row["_id"], "user_id": user_id}, row, upsert=True) for row in rows],
+            ordered=False
+        )
+        self.collection.delete_many({"_id": {"$in": [row["_id"] for row in rows]}, "user_id": user_id})
+        return len(rows)
+
+    # ----------------------
+    # CATEGORY / ACCOUNT CHANGES
+    # ----------------------
+    def update_many(self, query: dict, update: dict) -> int:
+        return self.collection.update_many(query, update).modified_count
+
+    def delete_matching(self, query: dict) -> list:
+        """Delete archived rows matching `query`; returns their ids (for tombstones)"""
+        ids = [doc["_id"] for doc in self.collection.find(query, {"_id": 1})]
+        if ids:
+            self.collection.delete_many({"$and": [query, {"_id": {"$in": ids}}]})
+        return ids
+
+    def delete_user_archive(self, user_id) -> int:
+        return self.collection.delete_many({"user_id": ObjectId(user_id)}).deleted_count
+
+    # ----------------------
+    # SCHEDULING
+    # ----------------------
+    def schedule(self, user_id, before: datetime, background: bool = True) -> str:
+        """
+        Queue the archive job of one user for rows dated before `before`.
+
+        The cutoff is raised first, so reads cover the archive while rows
+        are being moved. Returns the job id.
+        """
+        user_id = ObjectId(user_id)
+        self.users.update_one(
+            {"_id": user_id, "$or": [{"archived_before": {"$exists": False}}, {"archived_before": {"$lt": before}}]},
+            {"$set": {"archived_before": before}}
+        )
+
+        jobs = JobModel()
+        job_id = jobs.create(
+            user_id,
+            "archive_transactions",
+            {"before": before},
+            total=self.transactions.count_documents({"user_id": user_id, "date": {"$lt": before}})
+        )
+        if not background:
+            runner = JobRunner()
+            job = jobs.claim(runner.lease, job_id)
+            if job:
+                runner.run_job(job)
+        return job_id
+
+
+# ---------------------------------------------------------------------
+# JOB HANDLER
+# ---------------------------------------------------------------------
+class ArchiveTransactionsJob(JobHandler):
+    """Move a user's transactions dated before params['before'] to the archive."""
+
+    collection_name = config.COLLECTIONS["transaction"]
+
+    def __init__(self, job: dict):
+        super().__init__(job)
+        self.archive = TransactionArchiveModel()
+
+    def query(self) -> dict:
+        return {"user_id": self.user_id, "date": {"$lt": self.params["before"]}}
+
+    def apply(self, ids: list) -> int:
+        return self.archive.archive_rows(self.user_id, ids)
+
+    def finish(self) -> dict:
+        # reads were merged throughout; the bump drops results cached mid-move
+        DataVersionModel().bump(self.user_id)
+        return {"archived": self.job.get("processed", 0), "before": self.params["before"]}
+
+
+JOB_HANDLERS["archive_transactions"] = ArchiveTransactionsJob
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old transactions to the archive collection")
+    parser.add_argument("--older-than-days", type=int, default=config.TRANSACTION_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--user-id", help="Archive one user only (default: every user)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--throttle", type=float, default=0.05, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Count transactions without moving them")
+    args = parser.parse_args()
+
+    archive = TransactionArchiveModel()
+    before = archive_cutoff(args.older_than_days)
+    if args.user_id:
+        user_ids = [ObjectId(args.user_id)]
+    else:
+        user_ids = [u["_id"] for u in archive.users.find({"pending_deletion": {"$ne": True}}, {"_id": 1})]
+
+    runner = JobRunner(batch_size=args.batch_size, throttle_seconds=args.throttle)
+    totals = {"users": 0, "archived": 0, "failed": []}
+    for user_id in user_ids:
+        if args.dry_run:
+            totals["archived"] += archive.transactions.count_documents({"user_id": user_id, "date": {"$lt": before}})
+            totals["users"] += 1
+            continue
+
+        job_id = archive.schedule(user_id, before)
+        job = runner.jobs.claim(runner.lease, job_id)
+        job = runner.run_job(job) if job else runner.jobs.get(job_id)
+        if job["status"] == "done":
+            totals["users"] += 1
+            totals["archived"] += (job.get("result") or {}).get("archived", 0)
+        else:
+            totals["failed"].append(str(user_id))
+        print(f"[archive] {user_id}: {job['status']} ({job.get('processed', 0)} moved)")
+
+    print({"before": before.isoformat(), **totals})
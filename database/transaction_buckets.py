@@ -0,0 +1,171 @@
+"""
+Bucket layout: one document per user and month.
+
+With TRANSACTION_LAYOUT=bucket, TransactionModel answers range reads and
+monthly totals from `transaction_buckets`. Each bucket packs a copy of the
+month's transaction rows together with per-type totals, so reading a year
+touches about twelve documents instead of one document (and index key) per
+transaction.
+
+The `transactions` collection stays the system of record: point reads,
+writes, delta syncs and jobs keep using it. Writers mark the affected
+months stale and a stale or missing bucket is rebuilt from `transactions`
+on its next read, like the quantile sketches.
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional
+from bson import ObjectId
+from bson.int64 import Int64
+from pymongo.errors import DuplicateKeyError
+from .database_manager import DatabaseManager
+from .transaction_archive import TransactionArchiveModel
+from utils import normalize_amount, handler_datetime
+import config
+
+
+def month_start(value) -> datetime:
+    """First instant of the month containing `value`"""
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+class TransactionBucketModel:
+
+    MAX_RETRIES = 3
+
+    def __init__(self):
+        self.db_manager = DatabaseManager()
+        self.collection = self.db_manager.get_collection(config.COLLECTIONS["transaction_bucket"])
+        self.transactions = self.db_manager.get_collection(config.COLLECTIONS["transaction"])
+        self.archive = TransactionArchiveModel()
+
+    @property
+    def enabled(self) -> bool:
+        return config.get_settings().transaction_layout == "bucket"
+
+    # ----------------------
+    # WRITE PATH
+    # ----------------------
+    def invalidate(self, user_id, dates: Optional[Iterable] = None):
+        """
+        Mark the buckets of the months of `dates` stale (all of the user's
+        buckets when dates is None). No-op unless the bucket layout is on.
+        """
+        if not self.enabled or not user_id:
+            return
+        user_id = ObjectId(user_id)
+
+        if dates is None:
+            self.collection.update_many({"user_id": user_id}, {"$set": {"stale": True}, "$inc": {"version": 1}})
+            return
+
+        for month in {month_start(d) for d in dates if d is not None}:
+            try:
+                # upsert, so a rebuild racing with this write cannot store its result
+                self.collection.update_one(
+                    {"user_id": user_id, "month": month},
+                    {"$set": {"stale": True}, "$inc": {"version": 1}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                continue
+
+    def delete_user_buckets(self, user_id) -> int:
+        return self.collection.delete_many({"user_id": ObjectId(user_id)}).deleted_count
+
+    # ----------------------
+    # READ PATH
+    # ----------------------
+    def get_buckets(self, user_id, start_date=None, end_date=None) -> list[dict]:
+        """
+        Current buckets of the months between start_date and end_date
+        (open ends extend to the user's first / last transaction).
+        """
+        user_id = ObjectId(user_id)
+        first, last = self._month_range(user_id, start_date, end_date)
+        if first is None:
+            return []
+
+        buckets = {
+            b["month"]: b for b in
+            self.collection.find({"user_id": user_id, "month": {"$gte": first, "$lte": last}})
+        }
+
+        result = []
+        month = first
+        while month <= last:
+            bucket = buckets.get(month)
+            if bucket is None or bucket.get("stale"):
+                bucket = self.rebuild(user_id, month, bucket)
+            if bucket["count"]:
+                result.append(bucket)
+            month = next_month(month)
+        return result
+
+    def _month_range(self, user_id, start_date, end_date) -> tuple[Optional[datetime], Optional[datetime]]:
+        if start_date is None or end_date is None:
+            # open range: bounded by the user's oldest / newest transaction (index on user_id, date)
+            oldest = self.transactions.find_one({"user_id": user_id}, {"date": 1}, sort=[("date", 1)])
+            newest = self.transactions.find_one({"user_id": user_id}, {"date": 1}, sort=[("date", -1)])
+            if self.archive.reaches(user_id):
+                # archived rows are the oldest; the newest is only archived when nothing is hot
+                archived = self.archive.collection.find_one({"user_id": user_id}, {"date": 1}, sort=[("date", 1)])
+                if archived and (oldest is None or archived["date"] < oldest["date"]):
+                    oldest = archived
+                newest = newest or self.archive.collection.find_one({"user_id": user_id}, {"date": 1}, sort=[("date", -1)])
+            if oldest is None:
+                return None, None
+            start_date = start_date if start_date is not None else oldest["date"]
+            end_date = end_date if end_date is not None else newest["date"]
+        start_date, end_date = handler_datetime(start_date), handler_datetime(end_date)
+        if start_date > end_date:
+            return None, None
+        return month_start(start_date), month_start(end_date)
+
+    def rebuild(self, user_id, month: datetime, doc: Optional[dict] = None) -> dict:
+        """Recompute one bucket from `transactions` (optimistic concurrency on `version`)."""
+        user_id = ObjectId(user_id)
+
+        for _ in range(self.MAX_RETRIES):
+            # months before the archive cutoff also read the archive
+            rows = list(self.archive.find(
+                user_id, {"user_id": user_id, "date": {"$gte": month, "$lt": next_month(month)}}, start_date=month
+            ))
+            totals = {t: 0 for t in config.TRANSACTION_TYPES}
+            counts = {t: 0 for t in config.TRANSACTION_TYPES}
+            for row in rows:
+                transaction_type = row.get("type")
+                totals[transaction_type] = totals.get(transaction_type, 0) + normalize_amount(dict(row))["amount_cents"]
+                counts[transaction_type] = counts.get(transaction_type, 0) + 1
+
+            bucket = {
+                "user_id": user_id,
+                "month": month,
+                "transactions": rows,
+                "count": len(rows),
+                "totals": {t: Int64(v) for t, v in totals.items()},
+                "counts": counts,
+                "stale": False,
+                "built_at": datetime.now()
+            }
+
+            version = (doc or {}).get("version", 0)
+            try:
+                result = self.collection.update_one(
+                    {"user_id": user_id, "month": month, "version": version},
+                    {"$set": bucket, "$inc": {"version": 1}},
+                    upsert=doc is None
+                )
+            except DuplicateKeyError:
+                result = None  # created or invalidated concurrently
+            if result is not None and (result.matched_count or result.upserted_id):
+                return bucket
+
+            doc = self.collection.find_one({"user_id": user_id, "month": month})
+
+        # still contended: serve what was computed, leave the bucket stale
+        return bucket
@@ -0,0 +1,64 @@
+"""
+Resumable CSV import of transactions.
+
+Run with:
+    python -m database.transaction_import <user_id> transactions.csv --batch-size 500
+
+The file needs the columns type, category, amount, date (ISO format) and
+optionally description and idempotency_key. Rows are keyed for idempotency
+(see TransactionModel.import_transactions), so re-running an interrupted or
+failed import only inserts the rows that are still missing.
+"""
+
+import argparse
+import csv
+from typing import Iterator
+
+from database.transaction_model import TransactionModel
+
+REQUIRED_COLUMNS = ("type", "category", "amount", "date")
+
+
+def read_csv(path: str) -> Iterator[dict]:
+    """Stream insert items from a CSV file"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path} is missing column(s): {', '.join(missing)}")
+
+        for line, row in enumerate(reader, start=2):
+            try:
+                item = {
+                    "transaction_type": row["type"].strip(),
+                    "category": row["category"].strip(),
+                    "amount": float(row["amount"]),
+                    "transaction_date": row["date"].strip(),
+                    "description": (row.get("description") or "").strip(),
+                }
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{path}:{line}: {e}")
+            if row.get("idempotency_key"):
+                item["idempotency_key"] = row["idempotency_key"].strip()
+            yield item
+
+
+def import_csv(user_id: str, path: str, batch_size: int = 500, import_id: str = "") -> dict:
+    """
+    Import a CSV file for one user.
+
+    Returns:
+        dict: {'inserted', 'skipped', 'batches'}
+    """
+    return TransactionModel(user_id).import_transactions(read_csv(path), batch_size=batch_size, import_id=import_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import transactions from a CSV file (safe to re-run)")
+    parser.add_argument("user_id")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--import-id", default="", help="Key prefix; a new id imports identical rows again")
+    args = parser.parse_args()
+
+    print(import_csv(args.user_id, args.path, batch_size=args.batch_size, import_id=args.import_id))
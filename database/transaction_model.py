@@ -1,19 +1,62 @@
-from typing import Optional, Any
-from datetime import datetime, date
+import hashlib
+import itertools
+import re
+from typing import Optional, Any, Iterable
+from datetime import datetime, date, timedelta
+from bson.int64 import Int64
 from bson.objectid import ObjectId
 from .database_manager import DatabaseManager
 import config
-from pymongo import DESCENDING, ASCENDING
-from utils import handler_datetime
+from pymongo import DESCENDING, ASCENDING, InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from utils import handler_datetime, to_cents, from_cents, normalize_amount
 from database.category_models import CategoryModel, InvalidCategoryError
+from database.quantile_sketch import QuantileSketchModel, KLLSketch
+from database.data_version import DataVersionModel
+from database.transaction_sync import TransactionTombstoneModel, TOMBSTONE_RETENTION, SYNC_OVERLAP, matches_filters
+from database.transaction_buckets import TransactionBucketModel, next_month
+from database.transaction_archive import TransactionArchiveModel
+from database.retry import retry_transient, only_duplicates
+
+# Exact amount in cents for aggregation pipelines; rows not yet converted by
+# database.migrations.migrate_amount_cents fall back to their float amount
+AMOUNT_CENTS_EXPR = {"$ifNull": ["$amount_cents", {"$multiply": ["$amount", 100]}]}
+
+
+def content_key(item: dict) -> str:
+    """Deterministic idempotency key of an insert item (type, category, cents, date, description)"""
+    transaction_date = item["transaction_date"]
+    if not isinstance(transaction_date, datetime):
+        transaction_date = handler_datetime(transaction_date)
+    content = "|".join([
+        item["transaction_type"], item["category"], str(to_cents(item["amount"])),
+        transaction_date.isoformat(), item.get("description") or ""
+    ])
+    return hashlib.sha256(content.encode()).hexdigest()[:32]
 
 
 class TransactionModel:
 
+    # Pure reads, safe to serve from the version-keyed cache (utils.CachedReads)
+    CACHEABLE_READS = (
+        "get_transactions",
+        "get_transaction_by_id",
+        "get_transactions_by_date_range",
+        "get_transactions_page",
+        "get_monthly_totals",
+        "aggregate",
+    )
+
     def __init__(self, user_id: Optional[str] = None):
         self.db_manager = DatabaseManager()
         self.collection = self.db_manager.get_collection(config.COLLECTIONS["transaction"])
         self.user_id = ObjectId(user_id) if user_id else None
+        self.sketches = QuantileSketchModel()
+        self.versions = DataVersionModel()
+        self.tombstones = TransactionTombstoneModel()
+        self.buckets = TransactionBucketModel()
+        self.archive = TransactionArchiveModel()
+        self._categories: Optional[CategoryModel] = None
 
     def set_user_id(self, user_id: Optional[str]):
         self.user_id = ObjectId(user_id) if user_id else None
@@ -21,11 +64,191 @@ class TransactionModel:
     # -----------------------------------------------------------
     # FETCH TRANSACTIONS
     # -----------------------------------------------------------
-    def get_transactions(self, advanced_filters: dict[str, Any] = None) -> list[dict]:
+    def get_transactions(self, advanced_filters: dict[str, Any] = None, projection: dict = None) -> list[dict]:
+
+        if self.buckets.enabled:
+            return self._bucket_transactions(advanced_filters)
+
+        query = self._build_query(advanced_filters)
+        cursor = self.archive.find(
+            self.user_id, query, projection, (advanced_filters or {}).get("start_date"), sort=("created_at", -1)
+        )
+        return list(self._resolve(cursor))
+
+    def iter_transactions(self, advanced_filters: dict[str, Any] = None, batch_size: int = 500):
+        """Stream transactions in server batches instead of loading them all at once"""
+        if self.buckets.enabled:
+            yield from self._bucket_transactions(advanced_filters)
+            return
 
         query = self._build_query(advanced_filters)
-        cursor = self.collection.find(query).sort("created_at", -1)
-        return list(cursor)
+        cursor = self.archive.find(
+            self.user_id, query, start_date=(advanced_filters or {}).get("start_date"),
+            sort=("created_at", -1), batch_size=batch_size
+        )
+        yield from self._resolve(cursor)
+
+    def get_transactions_page(
+        self,
+        advanced_filters: dict[str, Any] = None,
+        offset: int = 0,
+        limit: int = 50
+    ) -> tuple[list[dict], bool]:
+        """
+        One page of get_transactions (newest first).
+
+        Skip / limit run server-side when only `transactions` is read;
+        bucket and archive reads stream and stop after the page.
+
+        Returns:
+            tuple: (rows, has_more)
+        """
+        if self.buckets.enabled or self.archive.reaches(self.user_id, (advanced_filters or {}).get("start_date")):
+            rows = list(itertools.islice(
+                self.iter_transactions(advanced_filters, batch_size=min(offset + limit + 1, 1000)),
+                offset, offset + limit + 1
+            ))
+        else:
+            cursor = (
+                self.collection.find(self._build_query(advanced_filters))
+                .sort([("created_at", -1), ("_id", -1)])
+                .skip(offset)
+                .limit(limit + 1)
+            )
+            rows = list(self._resolve(cursor))
+        return rows[:limit], len(rows) > limit
+
+    def get_changes_since(self, since: Optional[datetime] = None) -> dict:
+        """
+        Delta fetch for TransactionSync.
+
+        Returns rows modified and ids deleted since `since` (minus a small
+        overlap), or every row when `since` is None or older than tombstone
+        retention.
+
+        Returns:
+            dict: {'changed': [...], 'deleted': [ObjectId], 'watermark': datetime, 'full': bool}
+        """
+        watermark = datetime.now()
+        full = since is None or since < watermark - TOMBSTONE_RETENTION
+
+        if full:
+            return {
+                "changed": list(self._resolve(self.archive.find(self.user_id, {"user_id": self.user_id}))),
+                "deleted": [],
+                "watermark": watermark,
+                "full": True
+            }
+
+        since = since - SYNC_OVERLAP
+        changed = list(self._resolve(self.collection.find(
+            {"user_id": self.user_id, "last_modified": {"$gte": since}}
+        )))
+        deleted = self.tombstones.deleted_since(self.user_id, since)
+        return {"changed": changed, "deleted": deleted, "watermark": watermark, "full": False}
+
+    def get_monthly_totals(self, start_date=None, end_date=None) -> dict:
+        """
+        Amount totals per month and type, in cents.
+
+        With the bucket layout, months fully inside the range come straight
+        from the bucket totals and only the edge months are summed row by
+        row; otherwise one server-side $group.
+
+        Returns:
+            dict: {month_start: {'Expense': cents, 'Income': cents}}
+        """
+        if not self.user_id:
+            return {}
+
+        if not self.buckets.enabled:
+            rows = self.aggregate(
+                [{"$group": {
+                    "_id": {"year": {"$year": "$date"}, "month": {"$month": "$date"}, "type": "$type"},
+                    "total": {"$sum": AMOUNT_CENTS_EXPR}
+                }}],
+                advanced_filters={"start_date": start_date, "end_date": end_date}
+            )
+            totals = {}
+            for row in rows:
+                month = datetime(row["_id"]["year"], row["_id"]["month"], 1)
+                totals.setdefault(month, {})[row["_id"]["type"]] = int(round(row["total"]))
+            return totals
+
+        start, end = self._date_bounds(start_date, end_date)
+        totals = {}
+        for bucket in self.buckets.get_buckets(self.user_id, start_date, end_date):
+            month = bucket["month"]
+            if (start is None or start <= month) and (end is None or next_month(month) - timedelta(microseconds=1) <= end):
+                month_totals = {t: int(v) for t, v in bucket["totals"].items() if bucket["counts"].get(t)}
+            else:
+                month_totals = {}
+                for row in bucket["transactions"]:
+                    if (start is None or row["date"] >= start) and (end is None or row["date"] <= end):
+                        cents = normalize_amount(dict(row))["amount_cents"]
+                        month_totals[row["type"]] = month_totals.get(row["type"], 0) + cents
+            if month_totals:
+                totals[month] = month_totals
+        return totals
+
+    def _bucket_transactions(self, filters: Optional[dict]) -> list[dict]:
+        """get_transactions over the bucket layout: a few bucket documents, filtered in memory (whole rows, no projection)"""
+        if not self.user_id:
+            return []
+        filters = filters or {}
+        buckets = self.buckets.get_buckets(self.user_id, filters.get("start_date"), filters.get("end_date"))
+        rows = self._resolve(t for bucket in buckets for t in bucket["transactions"])
+        rows = [t for t in rows if matches_filters(t, filters)]
+        return sorted(rows, key=lambda t: t.get("created_at") or datetime.min, reverse=True)
+
+    @staticmethod
+    def _date_bounds(start_date, end_date) -> tuple[Optional[datetime], Optional[datetime]]:
+        """Range bounds as in _build_query: a plain end date includes the whole day"""
+        if start_date is not None:
+            start_date = handler_datetime(start_date)
+        if isinstance(end_date, date) and not isinstance(end_date, datetime):
+            end_date = datetime.combine(end_date, datetime.max.time())
+        return start_date, end_date
+
+    # -----------------------------------------------------------
+    # CATEGORY REFERENCES
+    # -----------------------------------------------------------
+    def _category_model(self) -> CategoryModel:
+        if self._categories is None or self._categories.user_id != self.user_id:
+            self._categories = CategoryModel(self.user_id)
+        return self._categories
+
+    def _resolve(self, transactions: Iterable[dict]):
+        """
+        Tolerant read of stored rows: exact amounts (see normalize_amount)
+        and the category name looked up from `category_id` in the catalog.
+        Rows not yet backfilled keep the name they were stored with.
+        """
+        names = None
+        for transaction in transactions:
+            normalize_amount(transaction)
+            category_id = transaction.get("category_id")
+            if category_id is not None:
+                if names is None:
+                    names = self._category_model().get_category_names()
+                if category_id not in names:
+                    # created by another process since the catalog was loaded
+                    names = self._category_model().get_category_names(refresh=True)
+                transaction["category"] = names.get(category_id, transaction.get("category"))
+            yield transaction
+
+    def resolve_category_names(self, transactions: Iterable[dict]):
+        """Re-resolve category names of already loaded rows in place (after a rename)"""
+        for _ in self._resolve(transactions):
+            pass
+
+    def aggregate(self, pipeline: list[dict], advanced_filters: dict[str, Any] = None) -> list[dict]:
+        """Run an aggregation pipeline over this user's (filtered) transactions"""
+        match = self._build_query(advanced_filters)
+        stages = [{"$match": match}]
+        if self.archive.reaches(self.user_id, (advanced_filters or {}).get("start_date")):
+            stages.append(self.archive.union_stage(match))
+        return list(self.collection.aggregate(stages + pipeline))
 
     def _build_query(self, filters: Optional[dict]) -> dict:
         conditions = []
@@ -36,23 +259,33 @@ class TransactionModel:
         if "transaction_type" in filters:
             conditions.append({"type": filters["transaction_type"]})
 
-        # Filter category
+        # Filter category (by id; rows not yet backfilled by name)
         if "category" in filters:
-            conditions.append({"category": filters["category"]})
+            category_ids = self._category_model().get_category_ids(
+                filters["category"], filters.get("transaction_type")
+            )
+            conditions.append({"$or": [
+                {"category_id": {"$in": category_ids}},
+                {"category": filters["category"]}
+            ]})
 
         # Filter amount - only add if value > 0
         min_amount = filters.get("min_amount")
         max_amount = filters.get("max_amount")
         amount_query = {}
+        cents_query = {}
         
         if min_amount is not None and min_amount > 0:
             amount_query["$gte"] = min_amount
+            cents_query["$gte"] = to_cents(min_amount)
         
         if max_amount is not None and max_amount > 0:
             amount_query["$lte"] = max_amount
+            cents_query["$lte"] = to_cents(max_amount)
         
-        if amount_query:
-            conditions.append({"amount": amount_query})
+        if cents_query:
+            # converted rows have no float `amount`, so at most one branch matches
+            conditions.append({"$or": [{"amount_cents": cents_query}, {"amount": amount_query}]})
 
         # Filter date range - convert date to datetime properly
         start_date = filters.get("start_date")
@@ -79,10 +312,10 @@ class TransactionModel:
                 
             conditions.append({"date": date_query})
 
-        # Filter text
+        # Filter text (matched literally: `c++` or `(` are not patterns)
         if "search_text" in filters and filters["search_text"]:
             conditions.append({
-                "description": {"$regex": filters["search_text"], "$options": "i"}
+                "description": {"$regex": re.escape(filters["search_text"]), "$options": "i"}
             })
 
         return self._add_user_constraint(conditions)
@@ -100,19 +333,65 @@ class TransactionModel:
         category: str,
         amount: float,
         transaction_date: datetime,
-        description: str = ""
+        description: str = "",
+        idempotency_key: Optional[str] = None
     ) -> Optional[str]:
+        """
+        Insert one transaction and return its id.
 
-        # Validate category
-        category_model = CategoryModel(self.user_id)
+        The `_id` is assigned here, so a retry after a timeout cannot insert
+        twice. With an idempotency_key (unique per user), repeating the call
+        (a retried request, a double submit) returns the first insert's id.
+        """
+        transaction = self._build_transaction(
+            transaction_type, category, amount, transaction_date, description
+        )
+        transaction["_id"] = ObjectId()
+        if idempotency_key:
+            transaction["idempotency_key"] = idempotency_key
 
+        try:
+            retry_transient(self.collection.insert_one)(transaction)
+        except DuplicateKeyError:
+            stored = self.collection.find_one(
+                {"user_id": self.user_id, "idempotency_key": idempotency_key}, {"_id": 1}
+            ) if idempotency_key else None
+            if stored and stored["_id"] != transaction["_id"]:
+                return str(stored["_id"])
+            # otherwise an attempt that timed out did write this row
+        except PyMongoError as e:
+            print(f"Error adding transaction: {e}")
+            return None
+
+        self.buckets.invalidate(self.user_id, [transaction["date"]])
+        self.versions.bump(self.user_id)
+
+        try:
+            self.sketches.record(self.user_id, transaction_type, category, from_cents(transaction["amount_cents"]))
+        except Exception as e:
+            print(f"Error updating quantile sketch: {e}")
+
+        return str(transaction["_id"])
+
+    def _build_transaction(
+        self,
+        transaction_type: str,
+        category: str,
+        amount: float,
+        transaction_date: datetime,
+        description: str = "",
+        category_id: Optional[ObjectId] = None
+    ) -> dict:
         if not isinstance(transaction_date, datetime):
             transaction_date = handler_datetime(transaction_date)
 
-        transaction = {
+        if category_id is None:
+            category_id = self._category_model().get_category_id(transaction_type, category, create=True)
+
+        return {
             "type": transaction_type,
-            "category": category,
-            "amount": amount,
+            "category_id": category_id,
+            "amount_cents": Int64(to_cents(amount)),
             "date": transaction_date,
             "description": description,
             "created_at": datetime.now(),
@@ -120,57 +399,259 @@ class TransactionModel:
             "user_id": self.user_id
         }
 
+    def _storage_update(self, changes: dict, old: Optional[dict] = None) -> dict:
+        """
+        $set / $unset for a field update in the stored representation: a new
+        `amount` is stored as cents, a category (or a type change) as the
+        category_id of that name and type.
+        """
+        changes = dict(changes)
+        old = old or {}
+        unset = {}
+
+        if "amount" in changes:
+            changes["amount_cents"] = Int64(to_cents(changes.pop("amount")))
+            unset["amount"] = ""
+
+        if "category" in changes or ("type" in changes and old.get("category")):
+            category_type = changes.get("type", old.get("type"))
+            category = changes.pop("category", old.get("category"))
+            changes["category_id"] = self._category_model().get_category_id(category_type, category, create=True)
+            unset["category"] = ""
+
+        update = {"$set": changes}
+        if unset:
+            update["$unset"] = unset
+        return update
+
+    # -----------------------------------------------------------
+    # BATCH WRITES
+    # -----------------------------------------------------------
+    def bulk_apply(
+        self,
+        inserts: Optional[list[dict]] = None,
+        updates: Optional[dict[str, dict]] = None,
+        deletes: Optional[list[str]] = None
+    ) -> dict:
+        """
+        Apply many inserts, updates and deletes in a single bulk_write.
+
+        The batch is retried on transient errors. Inserts get their `_id`
+        here and may carry an 'idempotency_key'; inserts already stored (by
+        an earlier attempt or an earlier import) are counted as skipped.
+
+        Args:
+            inserts: [{'transaction_type', 'category', 'amount', 'transaction_date', 'description'[, 'idempotency_key']}]
+            updates: {transaction_id: {field: new_value}}
+            deletes: [transaction_id]
+
+        Returns:
+            dict: {'inserted': n, 'updated': n, 'deleted': n, 'skipped': n}
+        """
+        inserts, updates, deletes = inserts or [], updates or {}, deletes or []
+        summary = {"inserted": 0, "updated": 0, "deleted": 0, "skipped": 0}
+        if not self.user_id or not (inserts or updates or deletes):
+            return summary
+
+        # Old rows, so the sketches of every touched (type, category) can be invalidated
+        touched_ids = [ObjectId(i) for i in list(updates) + list(deletes)]
+        self.archive.restore(self.user_id, touched_ids)
+        old_rows = list(self._resolve(self.collection.find(
+            {"_id": {"$in": touched_ids}, "user_id": self.user_id},
+            {"type": 1, "category": 1, "category_id": 1, "date": 1}
+        ))) if touched_ids else []
+        old_by_id = {str(row["_id"]): row for row in old_rows}
+
+        operations = []
+        touched_keys = set()
+        touched_dates = [row.get("date") for row in old_rows]
+
+        for item in inserts:
+            item = dict(item)
+            idempotency_key = item.pop("idempotency_key", None)
+            transaction = self._build_transaction(**item)
+            transaction["_id"] = ObjectId()
+            if idempotency_key:
+                transaction["idempotency_key"] = idempotency_key
+            operations.append(InsertOne(transaction))
+            touched_keys.add((transaction["type"], item["category"]))
+            touched_dates.append(transaction["date"])
+
+        now = datetime.now()
+        for transaction_id, changes in updates.items():
+            old = old_by_id.get(transaction_id, {})
+            operations.append(UpdateOne(
+                {"_id": ObjectId(transaction_id), "user_id": self.user_id},
+                self._storage_update({**changes, "last_modified": now}, old)
+            ))
+            touched_keys.add((old.get("type"), old.get("category")))
+            touched_keys.add((changes.get("type", old.get("type")), changes.get("category", old.get("category"))))
+            touched_dates.append(changes.get("date"))
+
+        for transaction_id in deletes:
+            operations.append(DeleteOne({"_id": ObjectId(transaction_id), "user_id": self.user_id}))
+            old = old_by_id.get(transaction_id, {})
+            touched_keys.add((old.get("type"), old.get("category")))
+
         try:
-            result = self.collection.insert_one(transaction)
-            return str(result.inserted_id)
-        except Exception as e:
-            print(f"Error adding transaction: {e}")
-            return None
+            result = retry_transient(self.collection.bulk_write)(operations, ordered=False)
+            summary = {
+                "inserted": result.inserted_count,
+                "updated": result.modified_count,
+                "deleted": result.deleted_count,
+                "skipped": 0
+            }
+        except BulkWriteError as e:
+            if not only_duplicates(e):
+                raise
+            summary = {
+                "inserted": e.details.get("nInserted", 0),
+                "updated": e.details.get("nModified", 0),
+                "deleted": e.details.get("nRemoved", 0),
+                "skipped": len(e.details["writeErrors"])
+            }
+
+        # only ids that existed for this user can have been deleted
+        self.tombstones.record(self.user_id, [ObjectId(i) for i in deletes if i in old_by_id])
+        self.buckets.invalidate(self.user_id, touched_dates)
+        self.versions.bump(self.user_id)
+        for transaction_type, category in touched_keys:
+            if transaction_type and category:
+                self.sketches.invalidate(self.user_id, transaction_type, category)
+
+        return summary
+
+    def import_transactions(self, rows: Iterable[dict], batch_size: int = 500, import_id: str = "") -> dict:
+        """
+        Insert many transactions; safe to re-run after an interruption.
+
+        Each row is keyed by its own 'idempotency_key', else by content_key
+        plus how often that content already occurred in this import (so real
+        repeats, like two identical coffees, are both kept). Rows whose key
+        is already stored are skipped, so a re-run resumes where the last
+        one stopped instead of duplicating rows.
+
+        Args:
+            rows: Insert items as for bulk_apply
+            batch_size: Rows per bulk_write
+            import_id: Optional key prefix, to import the same content again on purpose
+
+        Returns:
+            dict: {'inserted', 'skipped', 'batches'}
+        """
+        stats = {"inserted": 0, "skipped": 0, "batches": 0}
+        if not self.user_id:
+            return stats
+
+        occurrences = {}
+        batch = []
+        for row in rows:
+            row = dict(row)
+            if not row.get("idempotency_key"):
+                key = content_key(row)
+                occurrence = occurrences.get(key, 0)
+                occurrences[key] = occurrence + 1
+                row["idempotency_key"] = f"{import_id}:{key}:{occurrence}" if import_id else f"{key}:{occurrence}"
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self._import_batch(batch, stats)
+                batch = []
+        if batch:
+            self._import_batch(batch, stats)
+        return stats
+
+    def _import_batch(self, batch: list[dict], stats: dict):
+        keys = [row["idempotency_key"] for row in batch]
+        stored = {
+            doc["idempotency_key"] for doc in self.archive.find(
+                self.user_id, {"user_id": self.user_id, "idempotency_key": {"$in": keys}}, {"idempotency_key": 1}
+            )
+        }
+        pending = [row for row in batch if row["idempotency_key"] not in stored]
+        summary = self.bulk_apply(inserts=pending) if pending else {"inserted": 0, "skipped": 0}
+
+        stats["inserted"] += summary["inserted"]
+        stats["skipped"] += len(batch) - len(pending) + summary["skipped"]
+        stats["batches"] += 1
 
     # -----------------------------------------------------------
     # UPDATE TRANSACTION
     # -----------------------------------------------------------
     def update_transaction(self, transaction_id: str, **kwargs) -> bool:
 
-        # If category is being updated → validate it
-        if "category" in kwargs:
+        existing = None
+        if self.buckets.enabled or {"type", "category", "amount"} & kwargs.keys():
             existing = self.get_transaction_by_id(transaction_id)
-            if existing:
-                category_model = CategoryModel(self.user_id)
 
         kwargs["last_modified"] = datetime.now()
 
         try:
-            result = self.collection.update_one(
+            # an archived row is moved back before it is edited
+            self.archive.restore(self.user_id, [transaction_id])
+            result = retry_transient(self.collection.update_one)(
                 {"_id": ObjectId(transaction_id), "user_id": self.user_id},
-                {"$set": kwargs}
+                self._storage_update(kwargs, existing)
             )
-            return result.modified_count > 0
         except Exception as e:
             print(f"Error updating transaction: {e}")
             return False
 
+        if result.modified_count > 0:
+            self.buckets.invalidate(self.user_id, [(existing or {}).get("date"), kwargs.get("date")])
+            self.versions.bump(self.user_id)
+            if existing:
+                self._invalidate_sketches(existing, kwargs)
+
+        return result.modified_count > 0
+
     # -----------------------------------------------------------
     # DELETE
     # -----------------------------------------------------------
     def delete_transaction(self, transaction_id: str) -> bool:
         try:
-            result = self.collection.delete_one(
+            self.archive.restore(self.user_id, [transaction_id])
+            deleted = retry_transient(self.collection.find_one_and_delete)(
                 {"_id": ObjectId(transaction_id), "user_id": self.user_id}
             )
-            return result.deleted_count > 0
         except Exception as e:
             print(f"Error deleting transaction: {e}")
             return False
 
+        if deleted:
+            self.tombstones.record(self.user_id, [deleted["_id"]])
+            self.buckets.invalidate(self.user_id, [deleted.get("date")])
+            self.versions.bump(self.user_id)
+            self._invalidate_sketches(next(self._resolve([deleted])))
+        return deleted is not None
+
+    # -----------------------------------------------------------
+    # QUANTILE SKETCHES
+    # -----------------------------------------------------------
+    def get_amount_sketch(self, transaction_type: str, category: Optional[str] = None) -> KLLSketch:
+        """Mergeable quantile sketch of amounts for one type (optionally one category)"""
+        if not self.user_id:
+            return KLLSketch()
+        return self.sketches.get_sketch(self.user_id, transaction_type, category)
+
+    def _invalidate_sketches(self, old: dict, changes: Optional[dict] = None):
+        changes = changes or {}
+        try:
+            self.sketches.invalidate(self.user_id, old.get("type"), old.get("category"))
+            new_type = changes.get("type", old.get("type"))
+            new_category = changes.get("category", old.get("category"))
+            if (new_type, new_category) != (old.get("type"), old.get("category")):
+                self.sketches.invalidate(self.user_id, new_type, new_category)
+        except Exception as e:
+            print(f"Error invalidating quantile sketch: {e}")
+
     # -----------------------------------------------------------
     # GET BY ID
     # -----------------------------------------------------------
     def get_transaction_by_id(self, transaction_id: str) -> Optional[dict]:
         try:
-            return self.collection.find_one(
-                {"_id": ObjectId(transaction_id), "user_id": self.user_id}
-            )
+            query = {"_id": ObjectId(transaction_id), "user_id": self.user_id}
+            transaction = self.collection.find_one(query) or self.archive.find_one(query)
+            return next(self._resolve([transaction])) if transaction else None
         except Exception as e:
             print(f"Error getting transaction: {e}")
             return None
@@ -0,0 +1,134 @@
+import re
+from datetime import datetime, date, timedelta
+from typing import Optional, Iterable
+from bson import ObjectId
+from .database_manager import DatabaseManager
+from utils import to_cents
+import config
+
+# Tombstones are kept this long (TTL index); a session whose watermark is
+# older than that cannot know what was deleted and reloads everything
+TOMBSTONE_RETENTION = timedelta(days=config.TOMBSTONE_RETENTION_DAYS)
+
+# Writers stamp last_modified before their write lands; re-reading this much
+# before the watermark catches writes that committed after the previous sync
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+# ---------------------------------------------------------------------
+# TOMBSTONES
+# ---------------------------------------------------------------------
+class TransactionTombstoneModel:
+    """Records deleted transaction ids so delta syncs can drop them."""
+
+    def __init__(self):
+        self.db_manager = DatabaseManager()
+        self.collection = self.db_manager.get_collection(config.COLLECTIONS["transaction_tombstone"])
+
+    def record(self, user_id, transaction_ids: Iterable):
+        docs = [
+            {"user_id": ObjectId(user_id), "transaction_id": transaction_id, "deleted_at": datetime.now()}
+            for transaction_id in transaction_ids
+        ]
+        if not docs:
+            return
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except Exception as e:
+            print(f"Error recording transaction tombstones: {e}")
+
+    def deleted_since(self, user_id, since: datetime) -> list:
+        cursor = self.collection.find(
+            {"user_id": ObjectId(user_id), "deleted_at": {"$gte": since}},
+            {"transaction_id": 1, "_id": 0}
+        )
+        return [doc["transaction_id"] for doc in cursor]
+
+    def delete_user_tombstones(self, user_id) -> int:
+        return self.collection.delete_many({"user_id": ObjectId(user_id)}).deleted_count
+
+
+# ---------------------------------------------------------------------
+# SESSION-SIDE MATERIALIZED VIEW
+# ---------------------------------------------------------------------
+class TransactionSync:
+    """
+    A session's copy of the user's transactions, kept current by delta syncs.
+
+    The first refresh loads everything; later refreshes skip the database
+    entirely while the user's data version is unchanged, and otherwise
+    fetch only rows modified (or tombstoned) since the watermark.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.rows: dict = {}
+        self.watermark: Optional[datetime] = None
+        self.data_version: Optional[int] = None
+        self.last_fetched = 0  # documents read by the most recent refresh
+
+    def refresh(self, transaction_model) -> list[dict]:
+        """Bring the rows up to date and return them, newest first."""
+        version = transaction_model.versions.get_version(self.user_id)
+        if self.watermark is not None and version == self.data_version:
+            self.last_fetched = 0
+            return self.transactions()
+
+        changes = transaction_model.get_changes_since(self.watermark)
+        if changes["full"]:
+            self.rows = {}
+        for transaction in changes["changed"]:
+            self.rows[transaction["_id"]] = transaction
+        for transaction_id in changes["deleted"]:
+            self.rows.pop(transaction_id, None)
+        # a category rename changes no rows; names come from the catalog
+        transaction_model.resolve_category_names(self.rows.values())
+
+        self.watermark = changes["watermark"]
+        self.data_version = version
+        self.last_fetched = len(changes["changed"]) + len(changes["deleted"])
+        return self.transactions()
+
+    def transactions(self, filters: Optional[dict] = None) -> list[dict]:
+        rows = self.rows.values()
+        if filters:
+            rows = [t for t in rows if matches_filters(t, filters)]
+        return sorted(rows, key=lambda t: t.get("created_at") or datetime.min, reverse=True)
+
+
+def matches_filters(transaction: dict, filters: dict) -> bool:
+    """In-memory equivalent of TransactionModel._build_query for synced rows."""
+    if "transaction_type" in filters and transaction.get("type") != filters["transaction_type"]:
+        return False
+    if "category" in filters and transaction.get("category") != filters["category"]:
+        return False
+
+    # compared in cents, like the amount_cents query
+    amount_cents = transaction.get("amount_cents", 0)
+    min_amount = filters.get("min_amount")
+    max_amount = filters.get("max_amount")
+    if min_amount is not None and min_amount > 0 and amount_cents < to_cents(min_amount):
+        return False
+    if max_amount is not None and max_amount > 0 and amount_cents > to_cents(max_amount):
+        return False
+
+    start_date = filters.get("start_date")
+    end_date = filters.get("end_date")
+    transaction_date = transaction.get("date")
+    if start_date is not None:
+        if isinstance(start_date, date) and not isinstance(start_date, datetime):
+            start_date = datetime.combine(start_date, datetime.min.time())
+        if transaction_date is None or transaction_date < start_date:
+            return False
+    if end_date is not None:
+        if isinstance(end_date, date) and not isinstance(end_date, datetime):
+            end_date = datetime.combine(end_date, datetime.max.time())
+        if transaction_date is None or transaction_date > end_date:
+            return False
+
+    search_text = filters.get("search_text")
+    # matched literally, as the $regex built by _build_query
+    if search_text and not re.search(re.escape(search_text), transaction.get("description") or "", re.IGNORECASE):
+        return False
+
+    return True
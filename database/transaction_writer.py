@@ -0,0 +1,271 @@
+"""
+Write-behind group commit for high-rate transaction ingestion.
+
+BufferedTransactionWriter queues transactions in memory and inserts them
+with one insert_many per batch, so feeds and API clients are limited by
+database throughput instead of one round trip per transaction:
+
+    writer = BufferedTransactionWriter(max_batch_size=500, flush_interval=0.2)
+    future = writer.submit(user_id, "Expense", "Food", 12.5, date.today())
+    transaction_id = future.result()   # resolves once the batch is written
+
+Pending writes are flushed on close() and at interpreter exit. Inserts are
+retried on transient errors; a transaction submitted with an idempotency key
+that is already stored resolves to the stored transaction's id.
+"""
+
+import atexit
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+from .transaction_model import TransactionModel
+from .category_models import CategoryModel
+from .retry import retry_transient, DUPLICATE_KEY
+from utils import from_cents
+
+# Durability per flush: what the database must confirm before futures resolve
+FLUSH_POLICIES = {
+    "fast": WriteConcern(w=1),
+    "journaled": WriteConcern(w=1, j=True),
+    "majority": WriteConcern(w="majority", j=True),
+}
+
+
+class BufferedTransactionWriter:
+    """
+    Buffers add_transaction calls and writes them in batches.
+
+    A batch is flushed when `max_batch_size` transactions are queued or
+    `flush_interval` seconds after the first one was queued, whichever
+    comes first. `max_pending` bounds memory: submit() blocks while that
+    many transactions are waiting.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 500,
+        flush_interval: float = 0.2,
+        max_pending: int = 10000,
+        flush_policy: str = "journaled"
+    ):
+        if flush_policy not in FLUSH_POLICIES:
+            raise ValueError(f"flush_policy must be one of {', '.join(FLUSH_POLICIES)}")
+
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self.transaction_model = TransactionModel()
+        self.collection = self.transaction_model.collection.with_options(
+            write_concern=FLUSH_POLICIES[flush_policy]
+        )
+
+        self._categories: dict = {}  # user_id -> CategoryModel
+        self._categories_lock = threading.Lock()
+        self._pending: list[tuple[dict, Future]] = []
+        self._first_queued_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self.flushed_batches = 0
+        self.flushed_transactions = 0
+
+        self._thread = threading.Thread(target=self._run, name="transaction-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # -----------------------------------------------------------
+    # PRODUCER SIDE
+    # -----------------------------------------------------------
+    def submit(
+        self,
+        user_id,
+        transaction_type: str,
+        category: str,
+        amount: float,
+        transaction_date: datetime,
+        description: str = "",
+        idempotency_key: Optional[str] = None
+    ) -> Future:
+        """Queue one transaction; the future resolves to its id once written."""
+        category_id = self._category_model(user_id).get_category_id(transaction_type, category, create=True)
+        transaction = self.transaction_model._build_transaction(
+            transaction_type, category, amount, transaction_date, description, category_id=category_id
+        )
+        # ids are assigned here so every future knows its id before the insert
+        transaction.update({"_id": ObjectId(), "user_id": ObjectId(user_id)})
+        if idempotency_key:
+            transaction["idempotency_key"] = idempotency_key
+
+        future = Future()
+        with self._condition:
+            while len(self._pending) >= self.max_pending and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                raise RuntimeError("BufferedTransactionWriter is closed")
+
+            if not self._pending:
+                # first queued item starts the flush_interval timer
+                self._first_queued_at = time.monotonic()
+                self._condition.notify_all()
+            self._pending.append((transaction, future))
+            if len(self._pending) >= self.max_batch_size:
+                self._condition.notify_all()
+        return future
+
+    def _category_model(self, user_id) -> CategoryModel:
+        user_id = ObjectId(user_id)
+        # producers and the flush thread both look models up
+        with self._categories_lock:
+            if user_id not in self._categories:
+                self._categories[user_id] = CategoryModel(user_id)
+            return self._categories[user_id]
+
+    def flush(self):
+        """Write everything queued so far, in the caller's thread."""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting writes and flush what is pending."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self.flush()
+        atexit.unregister(self.close)
+
+    # -----------------------------------------------------------
+    # FLUSH THREAD
+    # -----------------------------------------------------------
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._pending) >= self.max_batch_size:
+                        break
+                    if self._pending:
+                        remaining = self._first_queued_at + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+
+            batch = self._take_batch()
+            try:
+                self._write(batch)
+            except Exception as e:
+                # keep the thread alive: a dead writer would leave every later submit() hanging
+                print(f"Error flushing buffered transactions: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _take_batch(self) -> list[tuple[dict, Future]]:
+        with self._condition:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            self._first_queued_at = time.monotonic() if self._pending else None
+            self._condition.notify_all()
+        return batch
+
+    def _write(self, batch: list[tuple[dict, Future]]):
+        if not batch:
+            return
+
+        failed, existing, unconfirmed = {}, {}, {}
+        try:
+            retry_transient(self.collection.insert_many)([t for t, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                index = error["index"]
+                if error.get("code") == DUPLICATE_KEY:
+                    try:
+                        stored_id = self._stored_id(batch[index][0])
+                    except Exception as lookup_error:
+                        failed[index] = f"idempotency key lookup failed: {lookup_error}"
+                        continue
+                    if stored_id is None or stored_id == batch[index][0]["_id"]:
+                        continue  # this row, written by an attempt that timed out
+                    existing[index] = str(stored_id)
+                    continue
+                failed[index] = error.get("errmsg", "write failed")
+
+            # e.g. a wtimeout: the rows were applied, but not with the durability of
+            # the flush policy; writeConcernErrors carry no index, so it covers the batch
+            concern_errors = e.details.get("writeConcernErrors", [])
+            if concern_errors:
+                message = "write concern not satisfied: " + "; ".join(
+                    err.get("errmsg", "unknown error") for err in concern_errors
+                )
+                unconfirmed = {i: message for i in range(len(batch)) if i not in failed and i not in existing}
+        except Exception as e:
+            print(f"Error flushing buffered transactions: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        written = [t for i, (t, _) in enumerate(batch) if i not in failed and i not in existing]
+        for i, (transaction, future) in enumerate(batch):
+            if i in failed:
+                future.set_exception(RuntimeError(failed[i]))
+            elif i in unconfirmed:
+                # resubmit with the same idempotency key to confirm it
+                future.set_exception(RuntimeError(unconfirmed[i]))
+            elif i in existing:
+                future.set_result(existing[i])
+            else:
+                future.set_result(str(transaction["_id"]))
+
+        self.flushed_batches += 1
+        self.flushed_transactions += len(written)
+
+        # unconfirmed rows are stored on the primary: caches are updated for them too
+        self._after_write(written)
+
+    def _stored_id(self, transaction: dict) -> Optional[ObjectId]:
+        """_id of the stored row with this transaction's idempotency key, if any"""
+        if not transaction.get("idempotency_key"):
+            return None
+        doc = self.collection.find_one(
+            {"user_id": transaction["user_id"], "idempotency_key": transaction["idempotency_key"]}, {"_id": 1}
+        )
+        return doc["_id"] if doc else None
+
+    def _after_write(self, transactions: list[dict]):
+        """One version bump per user and one sketch update per touched category."""
+        amounts: dict = {}  # (user_id, type, category_id) -> amounts written
+        for t in transactions:
+            amounts.setdefault((t["user_id"], t["type"], t["category_id"]), []).append(from_cents(t["amount_cents"]))
+
+        for user_id in {t["user_id"] for t in transactions}:
+            try:
+                self.transaction_model.buckets.invalidate(
+                    user_id, [t["date"] for t in transactions if t["user_id"] == user_id]
+                )
+                self.transaction_model.versions.bump(user_id)
+            except Exception as e:
+                print(f"Error invalidating caches after buffered write: {e}")
+        for (user_id, transaction_type, category_id), values in amounts.items():
+            try:
+                category = self._category_model(user_id).get_category_names().get(category_id)
+                if category is None:
+                    # unknown id: let the next read rebuild the type's sketches
+                    self.transaction_model.sketches.invalidate(user_id, transaction_type)
+                else:
+                    self.transaction_model.sketches.record_many(user_id, transaction_type, category, values)
+            except Exception as e:
+                print(f"Error updating quantile sketch: {e}")
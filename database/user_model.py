@@ -1,7 +1,17 @@
 from database.database_manager import DatabaseManager
 import config
+import hashlib
+import secrets
 from datetime import datetime
+from typing import Optional
 from bson.objectid import ObjectId
+from database.quantile_sketch import QuantileSketchModel
+from database.transaction_sync import TransactionTombstoneModel
+from database.transaction_buckets import TransactionBucketModel
+from database.transaction_archive import TransactionArchiveModel
+from database.category_models import CategoryModel
+from database.dashboard_snapshot import DashboardSnapshotModel
+from database.jobs import JobModel, JobRunner, JobHandler, JOB_HANDLERS
 
 collection_name = config.COLLECTIONS['user']
 
@@ -32,7 +42,13 @@ class UserModel:
         if not user:
             return self.create_user(email)
 
-        # case 2: user exist but deactivate
+        # case 2: account deletion in progress
+        if user.get("pending_deletion"):
+            job = self.get_deletion_job(user["_id"])
+            progress = f" ({job['processed']}/{job['total']} transactions removed)" if job else ""
+            raise ValueError(f"This account is being deleted{progress}")
+
+        # case 3: user exist but deactivate
         # raise Error
         if user.get("is_activate") is not True:
             raise ValueError("This account is deactivated! Please connect to CS")
@@ -40,6 +56,11 @@ class UserModel:
         # all checking passed
         return str(user.get("_id"))
     
+    def get_active_user_ids(self) -> list[str]:
+        """Return ids of all active users"""
+        cursor = self.collection.find({"is_activate": True}, {"_id": 1}).sort("_id", 1)
+        return [str(user["_id"]) for user in cursor]
+
     def deactivate(self, user_id: str) -> bool:
         # find and update:
         user = self.collection.find_one({
@@ -59,6 +80,55 @@ class UserModel:
 
         return result.modified_count > 0
 
+    # =============================================
+    # API TOKENS
+    # =============================================
+    @staticmethod
+    def _token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def create_api_token(self, user_id: str, label: str = "") -> str:
+        """
+        Issue a bearer token for the JSON API (api.server).
+
+        Only its hash is stored, so the token is returned once and cannot
+        be shown again.
+        """
+        token = secrets.token_urlsafe(32)
+        result = self.collection.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$push": {"api_tokens": {
+                "hash": self._token_hash(token),
+                "label": label,
+                "created_at": datetime.now()
+            }}}
+        )
+        if result.matched_count == 0:
+            raise ValueError("User not found")
+        return token
+
+    def revoke_api_tokens(self, user_id: str) -> int:
+        user = self.collection.find_one_and_update(
+            {"_id": ObjectId(user_id)},
+            {"$set": {"api_tokens": []}},
+            projection={"api_tokens": 1}
+        )
+        if not user:
+            raise ValueError("User not found")
+        return len(user.get("api_tokens", []))
+
+    def get_user_id_for_token(self, token: str) -> Optional[str]:
+        """User id of an API token, or None when unknown or the account is inactive"""
+        if not token:
+            return None
+        user = self.collection.find_one(
+            {"api_tokens.hash": self._token_hash(token)},
+            {"is_activate": 1, "pending_deletion": 1}
+        )
+        if not user or user.get("is_activate") is not True or user.get("pending_deletion"):
+            return None
+        return str(user["_id"])
+
     # =============================================
     # CASCADE DELETION - DATA LEAK PREVENTION
     # =============================================
@@ -73,6 +143,7 @@ class UserModel:
         # Count transactions
         transaction_collection = self.db_manager.get_collection(config.COLLECTIONS['transaction'])
         transaction_count = transaction_collection.count_documents({"user_id": user_oid})
+        transaction_count += TransactionArchiveModel().count_documents({"user_id": user_oid})
         
         # Count custom categories (excluding defaults)
         category_collection = self.db_manager.get_collection(config.COLLECTIONS['category'])
@@ -88,15 +159,73 @@ class UserModel:
             "categories": category_count
         }
     
+    def request_account_deletion(self, user_id: str, background: bool = True) -> str:
+        """
+        Schedule deletion of a user and all related data.
+
+        The user is marked pending_deletion right away (login is blocked);
+        transactions are then deleted by a throttled background job in
+        `_id`-ordered batches (config.ACCOUNT_DELETION_BATCH_SIZE /
+        ACCOUNT_DELETION_RATE), with progress checkpointed on the job.
+        The final summary is stored as the job's result.
+
+        Args:
+            user_id: The user ID to delete
+            background: False runs the job in the calling thread
+
+        Returns:
+            str: The deletion job id
+
+        Raises:
+            ValueError: If user not found
+        """
+        user_oid = ObjectId(user_id)
+
+        result = self.collection.update_one(
+            {"_id": user_oid},
+            {"$set": {
+                "pending_deletion": True,
+                "is_activate": False,
+                "deletion_requested_at": datetime.now()
+            }}
+        )
+        if result.matched_count == 0:
+            raise ValueError("User not found")
+
+        transaction_collection = self.db_manager.get_collection(config.COLLECTIONS['transaction'])
+        jobs = JobModel()
+        job_id = jobs.create(
+            user_oid,
+            "delete_account",
+            {},
+            total=transaction_collection.count_documents({"user_id": user_oid})
+        )
+
+        if not background:
+            runner = JobRunner()
+            job = jobs.claim(runner.lease, job_id)
+            if job:
+                runner.run_job(job)
+        return job_id
+
+    def get_deletion_job(self, user_id: str) -> dict:
+        """Latest account deletion job of a user (progress, status, result)."""
+        return JobModel().collection.find_one(
+            {"user_id": ObjectId(user_id), "kind": "delete_account"},
+            sort=[("created_at", -1)]
+        )
+
     def delete_user_cascade(self, user_id: str) -> dict:
         """
-        Safely delete user and all related data.
-        
+        Safely delete user and all related data, waiting for the result.
+
         This prevents data leaks by ensuring all user data is removed:
         - All transactions belonging to the user
         - All custom categories created by the user (preserves system defaults)
         - The user document itself
-        
+
+        Runs the same chunked job as request_account_deletion, inline.
+
         Args:
             user_id: The user ID to delete
             
@@ -111,43 +240,11 @@ class UserModel:
         Raises:
             ValueError: If user not found
         """
-        user_oid = ObjectId(user_id)
-        
-        # Verify user exists
-        user = self.collection.find_one({"_id": user_oid})
-        if not user:
-            raise ValueError("User not found")
-        
-        deletion_summary = {
-            "user": 0,
-            "transactions": 0,
-            "categories": 0
-        }
-        
-        try:
-            # 1. Delete all user's transactions
-            transaction_collection = self.db_manager.get_collection(config.COLLECTIONS['transaction'])
-            transaction_result = transaction_collection.delete_many({"user_id": user_oid})
-            deletion_summary["transactions"] = transaction_result.deleted_count
-            
-            # 2. Delete user's custom categories (preserve system defaults)
-            category_collection = self.db_manager.get_collection(config.COLLECTIONS['category'])
-            default_categories = config.DEFAULT_CATEGORIES_EXPENSE + config.DEFAULT_CATEGORIES_INCOME
-            
-            category_result = category_collection.delete_many({
-                "user_id": user_oid,
-                "name": {"$nin": default_categories}
-            })
-            deletion_summary["categories"] = category_result.deleted_count
-            
-            # 3. Delete the user document
-            user_result = self.collection.delete_one({"_id": user_oid})
-            deletion_summary["user"] = user_result.deleted_count
-            
-            return deletion_summary
-            
-        except Exception as e:
-            raise Exception(f"Error during cascade deletion: {str(e)}")
+        job_id = self.request_account_deletion(user_id, background=False)
+        job = JobModel().get(job_id)
+        if job["status"] != "done":
+            raise Exception(f"Error during cascade deletion: {job.get('error')}")
+        return job["result"]
     
     def get_user_by_id(self, user_id: str) -> dict:
         """Get user by ID"""
@@ -155,4 +252,62 @@ class UserModel:
             return self.collection.find_one({"_id": ObjectId(user_id)})
         except Exception as e:
             print(f"Error getting user: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+# =============================================
+# ACCOUNT DELETION JOB
+# =============================================
+class DeleteAccountJob(JobHandler):
+    """
+    Delete a user's transactions in throttled batches, then everything else.
+
+    Categories, sketches, snapshots, tombstones and other jobs are small
+    per user and removed in finish(); the user document goes last.
+    """
+
+    collection_name = config.COLLECTIONS['transaction']
+    batch_size = config.ACCOUNT_DELETION_BATCH_SIZE
+    throttle_seconds = config.ACCOUNT_DELETION_BATCH_SIZE / config.ACCOUNT_DELETION_RATE
+
+    def query(self) -> dict:
+        return {"user_id": self.user_id}
+
+    def apply(self, ids: list) -> int:
+        return self.collection.delete_many({"_id": {"$in": ids}, "user_id": self.user_id}).deleted_count
+
+    def finish(self) -> dict:
+        db_manager = DatabaseManager()
+        user_id = str(self.user_id)
+
+        # Delete user's custom categories (preserve system defaults)
+        default_categories = config.DEFAULT_CATEGORIES_EXPENSE + config.DEFAULT_CATEGORIES_INCOME
+        category_result = db_manager.get_collection(config.COLLECTIONS['category']).delete_many({
+            "user_id": self.user_id,
+            "name": {"$nin": default_categories}
+        })
+        CategoryModel.drop_catalog(user_id)
+
+        # Archived transactions are cold: one delete instead of throttled batches
+        archived = TransactionArchiveModel().delete_user_archive(user_id)
+
+        # Drop precomputed quantile sketches, dashboard snapshots, month buckets, sync tombstones and other jobs
+        QuantileSketchModel().delete_user_sketches(user_id)
+        TransactionBucketModel().delete_user_buckets(user_id)
+        DashboardSnapshotModel().delete_user_snapshots(user_id)
+        TransactionTombstoneModel().delete_user_tombstones(user_id)
+        JobModel().delete_user_jobs(user_id, keep_job_id=self.job["_id"])
+
+        # Delete the user document
+        user_result = db_manager.get_collection(collection_name).delete_one({"_id": self.user_id})
+
+        summary = {
+            "user": user_result.deleted_count,
+            "transactions": self.job.get("processed", 0) + archived,
+            "categories": category_result.deleted_count
+        }
+        print(f"Account {user_id} deleted: {summary}")
+        return summary
+
+
+JOB_HANDLERS["delete_account"] = DeleteAccountJob
@@ -0,0 +1,103 @@
+"""
+Import-time budget check.
+
+Imports each module in a fresh interpreter with `python -X importtime`,
+compares the cumulative time against its budget and checks that heavy
+libraries are not loaded where they should not be.
+
+Usage:
+    python scripts/check_import_time.py            # exit 1 on regression
+    python scripts/check_import_time.py --scale 2  # looser budgets on slow machines
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# streamlit itself loads plotly.graph_objects to register its chart theme,
+# so only plotly.express is checked for plotly
+HEAVY_PLOTTING = ("plotly.express", "matplotlib", "seaborn")
+
+# module -> (budget in ms, modules that must not be imported)
+BUDGETS = {
+    "config": (50, HEAVY_PLOTTING + ("pandas", "streamlit", "dotenv")),
+    "database": (500, HEAVY_PLOTTING + ("pandas", "streamlit")),
+    "analytics": (50, HEAVY_PLOTTING + ("pandas", "numpy")),
+    "views": (50, HEAVY_PLOTTING + ("pandas",)),
+    "views.category_view": (900, HEAVY_PLOTTING + ("pandas",)),
+    "views.transaction_view": (1000, HEAVY_PLOTTING + ("pandas",)),
+    "analytics.precompute": (600, HEAVY_PLOTTING + ("pandas",)),
+    "analytics.visualizer": (800, HEAVY_PLOTTING + ("plotly.graph_objects",)),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def measure(module: str):
+    """
+    Import `module` in a subprocess.
+
+    Returns:
+        tuple: (cumulative import time in ms, set of imported module names)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip()[-2000:]}")
+
+    cumulative_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        imported.add(name)
+        # the top-level entry (single space indent) carries the cumulative time
+        if name == module and len(match.group(3)) == 1:
+            cumulative_us = int(match.group(2))
+
+    return cumulative_us / 1000, imported
+
+
+def check(scale: float = 1.0) -> list[str]:
+    failures = []
+    for module, (budget_ms, forbidden) in BUDGETS.items():
+        try:
+            elapsed_ms, imported = measure(module)
+        except RuntimeError as e:
+            failures.append(str(e))
+            print(f"ERROR {module}")
+            continue
+
+        limit = budget_ms * scale
+        loaded = sorted(name for name in forbidden if name in imported)
+        ok = elapsed_ms <= limit and not loaded
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<28} {elapsed_ms:8.1f} ms  (budget {limit:.0f} ms)")
+
+        if elapsed_ms > limit:
+            failures.append(f"{module}: {elapsed_ms:.1f} ms over budget of {limit:.0f} ms")
+        if loaded:
+            failures.append(f"{module}: imports {', '.join(loaded)}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check per-module import time budgets")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget by this factor")
+    args = parser.parse_args()
+
+    failures = check(args.scale)
+    if failures:
+        print("\nImport time regressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll modules within budget")
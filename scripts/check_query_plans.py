@@ -0,0 +1,294 @@
+"""
+Query-plan check for the Transactions page filters.
+
+Seeds a scratch database with synthetic transactions, builds every filter
+combination the Transactions page can emit (type, category, min / max
+amount, start / end date, text search) through TransactionModel._build_query
+and runs `explain` on each, with the sorts the model reads with. A shape
+fails when its winning plan
+
+  - contains a COLLSCAN,
+  - sorts in memory (SORT stage), except for the filters listed in
+    SORT_EXCEPTIONS,
+  - examines more index keys or documents than its bound (plus slack):
+      - without a SORT, the walk of the user's rows in sort order that
+        yields the page (all of the user's rows for the unlimited list sort);
+      - with an excepted SORT, the user's rows matching the excepted filter
+        alone, so only a sort of those rows passes.
+
+Both `transactions` and `transactions_archive` are checked; reads reaching
+past a user's archive cutoff send the same query to the archive.
+
+Needs a running MongoDB (the scratch database is dropped afterwards). Run it
+before merging a change to TransactionModel._build_query, the Transactions
+page filters or the indexes in DatabaseManager, and after a MongoDB upgrade:
+    python scripts/check_query_plans.py                        # exit 1 on regression
+    python scripts/check_query_plans.py --uri mongodb://host:27017 --users 10 --per-user 5000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH_DATABASE = "finance_tracker_query_plans"
+
+# filter key -> value used when the dimension is on
+FILTER_VALUES = {
+    "transaction_type": "Expense",
+    "category": "Food",
+    "min_amount": 200.0,
+    "max_amount": 220.0,
+    "start_date": datetime.now() - timedelta(days=120),
+    "end_date": datetime.now() - timedelta(days=60),
+    "search_text": "coffee",
+}
+
+# name -> (sort, limit): get_transactions / iter_transactions and get_transactions_page
+SORTS = {
+    "list": ([("created_at", -1)], 0),
+    "page": ([("created_at", -1), ("_id", -1)], 51),
+}
+
+# Filters whose winning plan may sort in memory -> why that is accepted.
+# Date ranges are not listed: (user_id, created_at, _id, date) serves them in
+# list order, filtering the date on the index keys.
+SORT_EXCEPTIONS = {
+    ("min_amount", "max_amount"):
+        "the amount indexes select the few rows in range, which carry no created_at order; "
+        "sorting them beats walking every row of the user in created_at order",
+    ("category",):
+        "(user_id, type, category_id) selects one category's rows (a tenth of the user's); "
+        "sorting them beats walking every row of the user in created_at order",
+}
+# allowance over a bound: boundary keys, $or branches, the EOF key
+BOUND_SLACK = 1.1
+BOUND_SLACK_KEYS = 10
+
+DESCRIPTIONS = ("coffee", "groceries", "rent", "salary", "taxi", "dinner", "")
+
+
+def filter_shapes():
+    """Every combination of the page's filters (the empty one included)"""
+    keys = list(FILTER_VALUES)
+    for size in range(len(keys) + 1):
+        for combination in itertools.combinations(keys, size):
+            yield {key: FILTER_VALUES[key] for key in combination}
+
+
+# -----------------------------------------------------------
+# SEED
+# -----------------------------------------------------------
+def seed(users: int, per_user: int, archived_per_user: int) -> list[str]:
+    """Insert synthetic users and transactions; returns the user ids"""
+    from bson import ObjectId
+    from bson.int64 import Int64
+
+    import config
+    from database.category_models import CategoryModel
+    from database.database_manager import DatabaseManager
+
+    db = DatabaseManager().db
+    rnd = random.Random(42)
+    now = datetime.now()
+    user_ids = []
+
+    for i in range(users):
+        user_id = db[config.COLLECTIONS["user"]].insert_one(
+            {"email": f"plan-check-{i}@example.com", "is_activate": True, "created_at": now}
+        ).inserted_id
+        user_ids.append(str(user_id))
+        categories = CategoryModel(str(user_id))
+        names = {
+            "Expense": config.DEFAULT_CATEGORIES_EXPENSE,
+            "Income": config.DEFAULT_CATEGORIES_INCOME,
+        }
+
+        def row(days_ago_range):
+            transaction_type = rnd.choice(("Expense", "Expense", "Expense", "Income"))
+            category = rnd.choice(names[transaction_type])
+            when = now - timedelta(days=rnd.uniform(*days_ago_range))
+            doc = {
+                "_id": ObjectId(),
+                "user_id": user_id,
+                "type": transaction_type,
+                "date": when,
+                "description": rnd.choice(DESCRIPTIONS),
+                "created_at": when + timedelta(minutes=rnd.randint(0, 600)),
+                "last_modified": when,
+            }
+            if rnd.random() < 0.05:
+                # rows from before the category-id / cents migrations
+                doc.update({"category": category, "amount": round(rnd.uniform(1, 500), 2)})
+            else:
+                doc.update({
+                    "category_id": categories.get_category_id(transaction_type, category),
+                    "amount_cents": Int64(rnd.randint(100, 50000)),
+                })
+            return doc
+
+        db[config.COLLECTIONS["transaction"]].insert_many([row((0, 730)) for _ in range(per_user)])
+        if archived_per_user:
+            db[config.COLLECTIONS["transaction_archive"]].insert_many(
+                [row((730, 1460)) for _ in range(archived_per_user)]
+            )
+    return user_ids
+
+
+# -----------------------------------------------------------
+# PLANS
+# -----------------------------------------------------------
+def plan_stages(plan):
+    """All stage nodes of an explain plan (classic and SBE layouts)"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+
+def with_slack(rows: int) -> int:
+    return int(rows * BOUND_SLACK) + BOUND_SLACK_KEYS
+
+
+def walk_bound(collection, user_id, query: dict, sort: list, limit: int, user_total: int) -> int:
+    """
+    Rows an index walk in sort order visits to produce the result: up to the
+    limit-th match, or all of the user's rows without a limit (or with fewer
+    matches).
+    """
+    if not limit:
+        return with_slack(user_total)
+    last = list(collection.find(query, {"created_at": 1}).sort(sort).skip(limit - 1).limit(1))
+    if not last:
+        return with_slack(user_total)
+    # sorts are descending: the rows at or before the last match in that order
+    created_at, _id = last[0]["created_at"], last[0]["_id"]
+    walked = collection.count_documents({"user_id": user_id, "$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "_id": {"$gte": _id}},
+    ]})
+    return with_slack(walked)
+
+
+def sort_exception_bound(collection, model, filters: dict) -> int:
+    """Rows an excepted in-memory SORT may cover (0 when the shape has no excepted filter)"""
+    bounds = [
+        collection.count_documents(model._build_query({key: filters[key] for key in keys if key in filters}))
+        for keys in SORT_EXCEPTIONS if any(key in filters for key in keys)
+    ]
+    return with_slack(max(bounds)) if bounds else 0
+
+
+def plan_problems(explain: dict, walk: int, sort_bound: int) -> list[str]:
+    """Reasons the explained query fails the check (empty when it passes)"""
+    stages = list(plan_stages(explain["queryPlanner"]["winningPlan"]))
+    names = {stage["stage"] for stage in stages}
+    stats = explain["executionStats"]
+    problems = []
+
+    if "COLLSCAN" in names:
+        problems.append("COLLSCAN")
+    bound = walk
+    if "SORT" in names:
+        if not sort_bound:
+            problems.append("in-memory SORT")
+        bound = sort_bound or walk
+    if stats["totalKeysExamined"] > bound or stats["totalDocsExamined"] > bound:
+        problems.append(
+            f"{stats['totalKeysExamined']} keys / {stats['totalDocsExamined']} docs examined, bound {bound}"
+        )
+    return problems
+
+
+def describe(explain: dict) -> str:
+    stages = list(plan_stages(explain["queryPlanner"]["winningPlan"]))
+    indexes = sorted({stage.get("indexName", "") for stage in stages if stage["stage"] == "IXSCAN"})
+    stats = explain["executionStats"]
+    return (
+        f"{'+'.join(s['stage'] for s in stages)} [{', '.join(indexes)}] "
+        f"keys={stats['totalKeysExamined']} docs={stats['totalDocsExamined']} n={stats['nReturned']}"
+    )
+
+
+def check(user_ids: list[str], verbose: bool = False) -> list[str]:
+    from bson import ObjectId
+
+    import config
+    from database.database_manager import DatabaseManager
+    from database.transaction_model import TransactionModel
+
+    db = DatabaseManager().db
+    failures = []
+    user_id = user_ids[len(user_ids) // 2]
+    model = TransactionModel(user_id)
+
+    for collection_name in (config.COLLECTIONS["transaction"], config.COLLECTIONS["transaction_archive"]):
+        collection = db[collection_name]
+        user_total = collection.count_documents({"user_id": ObjectId(user_id)})
+        for filters in filter_shapes():
+            query = model._build_query(filters)
+            sort_bound = sort_exception_bound(collection, model, filters)
+            for sort_name, (sort, limit) in SORTS.items():
+                command = {"find": collection_name, "filter": query, "sort": dict(sort)}
+                if limit:
+                    command["limit"] = limit
+                explain = db.command("explain", command, verbosity="executionStats")
+
+                shape = f"{collection_name}/{sort_name} {'+'.join(filters) or '(no filters)'}"
+                walk = walk_bound(collection, ObjectId(user_id), query, sort, limit, user_total)
+                problems = plan_problems(explain, walk, sort_bound)
+                if problems or verbose:
+                    print(f"{'ok  ' if not problems else 'FAIL'} {shape:<96} {describe(explain)}")
+                if problems:
+                    failures.append(f"{shape}: {', '.join(problems)}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that every transaction filter shape is served by an index")
+    parser.add_argument("--uri", default=os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default=SCRATCH_DATABASE, help="scratch database, dropped afterwards")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--per-user", type=int, default=2000, help="transactions per user")
+    parser.add_argument("--archived-per-user", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="do not drop the scratch database")
+    parser.add_argument("--verbose", action="store_true", help="print the plan of every shape")
+    args = parser.parse_args()
+
+    # settings are read once, on the first DatabaseManager()
+    os.environ.update({"MONGO_URI": args.uri, "DATABASE_NAME": args.database, "TRANSACTION_LAYOUT": "document"})
+    os.environ.pop("MONGO_PARTITIONS", None)
+    import config
+    if args.database == config.DEFAULT_DATABASE_NAME:
+        parser.error("refusing to use the application database as scratch database")
+
+    from database.database_manager import DatabaseManager
+    try:
+        db_manager = DatabaseManager()
+    except Exception as e:
+        print(f"Cannot connect to {args.uri}: {e}")
+        sys.exit(2)
+
+    db_manager.client.drop_database(args.database)
+    db_manager._create_index()
+    try:
+        failures = check(seed(args.users, args.per_user, args.archived_per_user), verbose=args.verbose)
+    finally:
+        if not args.keep:
+            db_manager.client.drop_database(args.database)
+
+    shapes = 2 * len(SORTS) * len(list(filter_shapes()))
+    if failures:
+        print(f"\n{len(failures)} of {shapes} query shapes regressed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print(f"\nAll {shapes} query shapes use an index")
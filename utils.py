@@ -1,9 +1,39 @@
 from datetime import datetime, timedelta, date
-import streamlit as st
+from decimal import Decimal, ROUND_HALF_UP
+import functools
+import json
+
+def to_cents(amount) -> int:
+    """Convert a currency amount (float, str, Decimal) to integer cents, rounding half up"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents) -> float:
+    """Convert integer cents back to a float amount for display / charts"""
+    return int(cents) / 100
+
+def format_cents(cents) -> str:
+    """Format integer cents as currency without going through float"""
+    sign = "-" if cents < 0 else ""
+    units, rest = divmod(abs(int(cents)), 100)
+    return f"{sign}${units:,}.{rest:02d}"
 
 def format_currency(amount):
     """Format number as currency"""
-    return f"${amount:,.2f}" #
+    return format_cents(to_cents(amount))
+
+def normalize_amount(transaction: dict) -> dict:
+    """
+    Tolerant read of a transaction's amount.
+
+    Rows store `amount_cents` (int64); rows not migrated yet still carry a
+    float `amount`. Afterwards the row has both: exact `amount_cents` for
+    arithmetic and `amount` in currency units for display.
+    """
+    if transaction.get("amount_cents") is not None:
+        transaction["amount"] = from_cents(transaction["amount_cents"])
+    elif transaction.get("amount") is not None:
+        transaction["amount_cents"] = to_cents(transaction["amount"])
+    return transaction
 
 def get_date_range_options():
     """Get predefined date range options"""
@@ -42,6 +72,8 @@ def validate_amount(amount):
 
 def display_metric_card(title, value, delta=None, delta_color="normal"):
     """Display a metric card"""
+    import streamlit as st
+
     st.metric(
         label=title,
         value=value,
@@ -49,10 +81,88 @@ def display_metric_card(title, value, delta=None, delta_color="normal"):
         delta_color=delta_color
     )
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def cached_data_fetch(func, *args, **kwargs):
-    """Cache data fetching functions"""
-    return func(*args, **kwargs)
+def _data_fetch(_fetch, method: str, user_id: str, data_version: int, args_key: str):
+    return _fetch()
+
+@functools.lru_cache(maxsize=None)
+def _cached_data_fetch():
+    # streamlit is imported on first use so database models (which use
+    # handler_datetime) stay importable from workers and CLIs without it
+    import streamlit as st
+
+    return st.cache_data(ttl=3600, max_entries=2000, show_spinner=False)(_data_fetch)
+
+def cached_data_fetch(_fetch, method: str, user_id: str, data_version: int, args_key: str):
+    """
+    Cache data fetching functions.
+
+    `_fetch` (a bound call, not hashed) only runs on a miss; the key is the
+    method name, user id, the user's data version and the normalized arguments.
+    """
+    return _cached_data_fetch()(_fetch, method, user_id, data_version, args_key)
+
+def _normalize_args(args, kwargs) -> str:
+    """Stable cache key for call arguments (dates, ObjectIds etc. via str)"""
+    return json.dumps([list(args), kwargs], sort_keys=True, default=str)
+
+class CachedReads:
+    """
+    Read-through cache around a model (TransactionModel, CategoryModel, FinanceAnalyzer).
+
+    Methods listed in the model's CACHEABLE_READS are served from
+    cached_data_fetch, shared across reruns and tabs of the same user.
+    Writes bump the user's data version, so results are fresh right after an
+    edit. Every other attribute passes straight through to the model.
+    """
+
+    def __init__(self, model, version_model):
+        self._model = model
+        self._versions = version_model
+        self._reads = set(getattr(model, "CACHEABLE_READS", ()))
+
+    def _user_id(self):
+        user_id = getattr(self._model, "user_id", None)
+        if user_id is None and hasattr(self._model, "transaction_model"):
+            user_id = getattr(self._model.transaction_model, "user_id", None)
+        return user_id
+
+    def __getattr__(self, name):
+        attr = getattr(self._model, name)
+        if name not in self._reads:
+            return attr
+
+        @functools.wraps(attr)
+        def cached(*args, **kwargs):
+            user_id = self._user_id()
+            if not user_id:
+                return attr(*args, **kwargs)
+            return cached_data_fetch(
+                functools.partial(attr, *args, **kwargs),
+                f"{type(self._model).__name__}.{name}",
+                str(user_id),
+                self._versions.get_version(user_id),
+                _normalize_args(args, kwargs)
+            )
+
+        return cached
+
+def synced_transactions(transaction_model, filters: dict = None) -> list[dict]:
+    """
+    The user's transactions from the session's delta-synced copy.
+
+    One TransactionSync lives in st.session_state per user; each call only
+    fetches rows changed since the previous one (nothing when the data
+    version is unchanged), then applies `filters` in memory.
+    """
+    import streamlit as st
+    from database.transaction_sync import TransactionSync
+
+    sync = st.session_state.get("transaction_sync")
+    if sync is None or sync.user_id != transaction_model.user_id:
+        sync = st.session_state["transaction_sync"] = TransactionSync(transaction_model.user_id)
+
+    sync.refresh(transaction_model)
+    return sync.transactions(filters)
 
 def handler_datetime(date_: datetime | date | str) -> datetime:
     """Convert various date formats to datetime object"""
@@ -1,7 +1,18 @@
-from views.category_view import render_categories
-from views.transaction_view import render_transactions
-from views.user_view import render_user_profile
-from views.home_views import render_dashboard
+import importlib
+
+# Each page view is imported on first use, so rendering one page does not
+# pay for the imports (pandas, plotly) of the others.
+_LAZY = {
+    "render_categories": "views.category_view",
+    "render_transactions": "views.transaction_view",
+    "render_user_profile": "views.user_view",
+    "render_dashboard": "views.home_views",
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "render_categories",
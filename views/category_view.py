@@ -30,12 +30,15 @@ def _render_delete_dialog(category_model):
         delete_key = f"delete_all_{cat_id}"
         
         if st.button("❌ Delete all", key=delete_key):
-            category_model.delete_category_safe(
+            result = category_model.delete_category_safe(
                 category_type=cat_type,
                 category_name=cat_name,
                 strategy="Cascade"
             )
-            st.success(f"Category '{cat_name}' deleted with all transactions.")
+            if isinstance(result, str):
+                st.success(f"Deleting '{cat_name}' and its transactions in the background.")
+            else:
+                st.success(f"Category '{cat_name}' deleted with all transactions.")
             if "delete_category" in st.session_state:
                 del st.session_state["delete_category"]
             if reassign_key in st.session_state:
@@ -59,18 +62,14 @@ def _render_delete_dialog(category_model):
             new_cat = st.selectbox("New Category", other_names, key=f"reassign_select_{cat_id}")
 
             if st.button("💾 Change Category and Delete", key=f"reassign_delete_{cat_id}"):
-                category_model.update_transactions_category(
-                    old_name=cat_name,
-                    new_name=new_cat,
-                    category_type=cat_type
-                )
+                # moves the transactions in batches, then deletes the category
                 category_model.delete_category_safe(
                     category_type=cat_type,
                     category_name=cat_name,
                     strategy="Reassign",
                     new_category=new_cat
                 )
-                st.success(f"Moved all transactions → '{new_cat}' and deleted '{cat_name}'.")
+                st.success(f"Moving transactions → '{new_cat}', then deleting '{cat_name}'.")
                 del st.session_state["delete_category"]
                 del st.session_state[reassign_key]  
                 st.rerun()
@@ -137,7 +136,7 @@ def _render_category_list(category_model, category_type: str):
 
                         # Show warning inside form
                         if tx_count > 0:
-                            st.warning(f"{tx_count} transactions will update to the new name.")
+                            st.warning(f"{tx_count} transactions will show the new name.")
 
                         confirm = st.checkbox("I understand the changes")
                         save = st.form_submit_button("💾 Save")
@@ -146,13 +145,16 @@ def _render_category_list(category_model, category_type: str):
                             if not confirm:
                                 st.error("Please confirm first.")
                             else:
-                                updated = category_model.rename_category(
+                                job_id = category_model.rename_category(
                                     category_type, name, new_name
                                 )
-                                st.success(
-                                    f"Renamed '{name}' → '{new_name}'. "
-                                    f"{updated} transactions updated."
-                                )
+                                if job_id:
+                                    st.success(
+                                        f"Merging '{name}' into '{new_name}'. "
+                                        f"{tx_count} transactions are being moved in the background."
+                                    )
+                                else:
+                                    st.success(f"Renamed '{name}' → '{new_name}'.")
                                 st.rerun()
         if "delete_category" in st.session_state:
             if st.session_state["delete_category"]["id"] == cat_id:
@@ -201,12 +203,40 @@ def _render_add_category(category_model):
                 st.rerun()
 
 
+# ---------------------------------------------------------
+# BACKGROUND JOB PROGRESS
+# ---------------------------------------------------------
+JOB_LABELS = {
+    "move_transactions": "Moving '{from}' → '{to}'",
+    "cascade_category": "Deleting '{name}'",
+}
+
+@st.fragment(run_every=2)
+def _render_job_progress(category_model):
+    """Poll running rename / reassign / delete jobs; rerun the page when one finishes."""
+    jobs = category_model.get_active_jobs()
+    job_ids = {str(job["_id"]) for job in jobs}
+
+    # a job shown last time is gone → it finished, refresh the lists
+    previous = st.session_state.get("category_job_ids", set())
+    st.session_state["category_job_ids"] = job_ids
+    if previous - job_ids:
+        st.rerun()
+
+    for job in jobs:
+        label = JOB_LABELS.get(job["kind"], job["kind"]).format(**job["params"])
+        total = max(job.get("total") or 0, 1)
+        done = min(job.get("processed", 0), total)
+        st.progress(done / total, text=f"⏳ {label}: {done}/{job.get('total', 0)} transactions")
+
 # ---------------------------------------------------------
 # MAIN RENDER FUNCTION
 # ---------------------------------------------------------
 def render_categories(category_model):
     st.title("🏷️ Category Management")
 
+    _render_job_progress(category_model)
+
     _render_add_category(category_model)
 
     st.divider()
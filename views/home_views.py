@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import time
-from utils import format_currency, get_date_range_options
+from datetime import datetime, timedelta
+from utils import format_currency, format_cents, get_date_range_options, synced_transactions
 from analytics.analyzer import FinanceAnalyzer
 from analytics.visualizer import FinanceVisualizer
 from database.transaction_model import TransactionModel
@@ -41,6 +42,10 @@ def render_dashboard(analyzer_model: FinanceAnalyzer,
     # Display charts
     _render_charts(analyzer_model, visualizer_model, start_date, end_date)
     st.divider()
+
+    # Transaction timeline with zoom window
+    _render_timeline(analyzer_model, visualizer_model, start_date, end_date)
+    st.divider()
     
     # Optional: Display recent transactions
     _render_recent_transactions(transaction_model)
@@ -104,18 +109,42 @@ def _render_charts(analyzer_model: FinanceAnalyzer, visualizer_model: FinanceVis
         st.info("No data available for monthly trend")
 
 
+# ------------------------------
+# Timeline Section
+# ------------------------------
+def _render_timeline(analyzer_model: FinanceAnalyzer, visualizer_model: FinanceVisualizer, start_date, end_date):
+    """Render the transaction timeline for a zoom window inside the selected range"""
+    st.subheader("Transaction Timeline")
+
+    today = datetime.now().date()
+    default_window = (start_date or today - timedelta(days=90), end_date or today)
+
+    # Changing the window refetches only that range from the database
+    window = st.date_input("Zoom window", value=default_window, key="timeline_window")
+    if not isinstance(window, (tuple, list)) or len(window) != 2:
+        st.info("Select a start and end date")
+        return
+
+    timeline = analyzer_model.get_timeline_window(window[0], window[1])
+    if not timeline.empty:
+        fig = visualizer_model.plot_transaction_timeline(timeline)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No transactions in this window")
+
+
 # ------------------------------
 # Recent Transactions (optional)
 # ------------------------------
 def _render_recent_transactions(transaction_model: TransactionModel):
     """Render the recent transactions table"""
     st.subheader("Recent Transactions")
-    recent = transaction_model.get_transactions()
+    recent = synced_transactions(transaction_model)
 
     if recent:
         df_recent = pd.DataFrame(recent)
         df_recent['date'] = pd.to_datetime(df_recent['date']).dt.date
-        df_recent['amount'] = df_recent['amount'].apply(format_currency)
+        df_recent['amount'] = df_recent['amount_cents'].apply(format_cents)
         st.dataframe(
             df_recent[['date', 'type', 'category', 'amount', 'description']],
             use_container_width=True
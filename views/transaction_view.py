@@ -1,21 +1,31 @@
 import streamlit as st
+import uuid
 import config
 from datetime import date, datetime, timedelta
-import time
-from utils import handler_datetime, format_currency, format_date
+from utils import handler_datetime, format_currency, format_date, synced_transactions
 from database.transaction_model import TransactionModel
 from database.category_models import CategoryModel
 
 # -----------------------------
 # Render single transaction
 # -----------------------------
+@st.fragment
 def _render_transaction_card(model: TransactionModel, category_model, item: dict):
+    # Card reruns on its own; apply local edits / deletes made since the last full run
+    tx_id = str(item['_id'])
+    notice = st.session_state.pop('transaction_notice', None)
+    if notice:
+        st.toast(notice)
+    if tx_id in st.session_state.deleted_transactions:
+        return
+    item = st.session_state.transaction_overrides.get(tx_id, item)
+
     transaction_type = item.get('type', 'Unknown')
     amount = item.get('amount', 0)
     tx_date = item.get('date', datetime.now())
     category = item.get('category', 'Others')
     type_color = "🔴" if transaction_type == "Expense" else "🟢"
-    amount_str = f"${amount:,.2f}"
+    amount_str = format_currency(amount)
     date_str = format_date(tx_date)
     header = f"{type_color} {date_str} | {category} | {amount_str}"
 
@@ -35,17 +45,15 @@ def _render_transaction_card(model: TransactionModel, category_model, item: dict
         st.divider()
         col_edit, col_delete, col_space = st.columns([1,1,3])
         with col_edit:
-            if st.button("✏️ Edit", key=f"edit_{item['_id']}", use_container_width=True):
-                st.session_state.editing_transaction = str(item['_id'])
-                st.rerun()
+            st.button(
+                "✏️ Edit", key=f"edit_{item['_id']}", use_container_width=True,
+                on_click=_set_editing, args=(tx_id,)
+            )
         with col_delete:
-            if st.button("🗑️ Delete", key=f"delete_{item['_id']}", use_container_width=True):
-                if model.delete_transaction(str(item['_id'])):
-                    st.success("Transaction deleted successfully!")
-                    time.sleep(1)
-                    st.rerun()
-                else:
-                    st.error("Failed to delete transaction")
+            st.button(
+                "🗑️ Delete", key=f"delete_{item['_id']}", use_container_width=True,
+                on_click=_delete_transaction, args=(model, tx_id)
+            )
     
     # Show edit form RIGHT HERE if this transaction is being edited
     if st.session_state.get('editing_transaction') == str(item['_id']):
@@ -53,10 +61,59 @@ def _render_transaction_card(model: TransactionModel, category_model, item: dict
             st.write("")  # Small spacing
             _render_edit_transaction_form(model, category_model, item)
 
+# Card callbacks run before the fragment reruns, so the card redraws with the
+# new state without a full-app st.rerun()
+def _set_editing(tx_id):
+    st.session_state.editing_transaction = tx_id
+
+def _delete_transaction(model: TransactionModel, tx_id: str):
+    if model.delete_transaction(tx_id):
+        st.session_state.deleted_transactions.add(tx_id)
+        st.session_state.transaction_notice = "Transaction deleted successfully!"
+    else:
+        st.session_state.transaction_notice = "❌ Failed to delete transaction"
+
+def _save_transaction(model: TransactionModel, tx_item: dict):
+    tx_id = str(tx_item['_id'])
+    transaction_type = st.session_state[f"edit_type_{tx_id}"]
+    category = st.session_state[f"edit_category_{tx_id}"]
+    amount = st.session_state[f"edit_amount_{tx_id}"]
+    description = st.session_state[f"edit_description_{tx_id}"]
+    transaction_date = datetime.combine(st.session_state[f"edit_date_{tx_id}"], datetime.now().time())
+
+    success = model.update_transaction(
+        transaction_id=tx_id,
+        type=transaction_type,
+        category=category,
+        amount=amount,
+        date=transaction_date,
+        description=description
+    )
+    if success:
+        # Optimistic update: patch the card locally instead of refetching
+        st.session_state.transaction_overrides[tx_id] = {
+            **tx_item,
+            "type": transaction_type,
+            "category": category,
+            "amount": amount,
+            "date": transaction_date,
+            "description": description,
+            "last_modified": datetime.now()
+        }
+        st.session_state.transaction_notice = "Transaction updated successfully!"
+        st.session_state.editing_transaction = None
+    else:
+        st.session_state.transaction_notice = "❌ Failed to update transaction"
+
 # -----------------------------
 # Filters
 # -----------------------------
+@st.fragment
 def _render_filters(transaction_model, category_model):
+    # Widget changes rerun only this panel; Apply / Clear rerun the app to refresh the list
+    if not st.session_state.show_filters:
+        return
+
     st.subheader("🔍 Filters")
 
     col1, col2 = st.columns(2)
@@ -148,11 +205,25 @@ def _render_filters(transaction_model, category_model):
             st.session_state.show_filters = False
             st.rerun()
 
+    st.divider()
+
 # -----------------------------
 # Create Transaction Form
 # -----------------------------
+def _hide_create_form():
+    st.session_state.show_create_form = False
+    st.session_state.create_form_key = None
+
+@st.fragment
 def _render_create_transaction_form(transaction_model: TransactionModel, category_model):
+    # Type switches rerun only the form; a saved row reruns the app to show it in the list
+    if not st.session_state.show_create_form:
+        return
+
     st.subheader("➕ Create New Transaction")
+    if not st.session_state.create_form_key:
+        # one idempotency key per opened form: a double click or retried save inserts once
+        st.session_state.create_form_key = uuid.uuid4().hex
     col1, col2 = st.columns(2)
     with col1:
         transaction_type = st.selectbox("Type *", options=config.TRANSACTION_TYPES, key="create_type")
@@ -178,20 +249,21 @@ def _render_create_transaction_form(transaction_model: TransactionModel, categor
                 category=category,
                 amount=amount,
                 transaction_date=transaction_date,
-                description=description
+                description=description,
+                idempotency_key=st.session_state.create_form_key
             )
             if transaction_id:
                 st.success("✅ Transaction created successfully!")
-                st.session_state.show_create_form = False
+                _hide_create_form()
                 # ✅ CLEAR FILTERS after adding new transaction
                 st.session_state.active_filters = None
                 st.rerun()
             else:
                 st.error("❌ Failed to create transaction")
     with col_cancel:
-        if st.button("❌ Cancel", use_container_width=True):
-            st.session_state.show_create_form = False
-            st.rerun()
+        st.button("❌ Cancel", use_container_width=True, on_click=_hide_create_form)
+
+    st.divider()
 
 # -----------------------------
 # Edit Transaction Form
@@ -222,25 +294,161 @@ def _render_edit_transaction_form(transaction_model: TransactionModel, category_
     
     col_save, col_cancel = st.columns(2)
     with col_save:
-        if st.button("💾 Save Changes", key=f"save_{tx_item['_id']}", use_container_width=True):
-            transaction_date = datetime.combine(date_input, datetime.now().time())
-            success = transaction_model.update_transaction(
-                transaction_id=str(tx_item['_id']),
-                type=transaction_type,
-                category=category,
-                amount=amount,
-                date=transaction_date,
-                description=description
-            )
-            if success:
-                st.success("Transaction updated successfully!")
-                st.session_state.editing_transaction = None
-                st.rerun()
-            else:
-                st.error("Failed to update transaction")
+        st.button(
+            "💾 Save Changes", key=f"save_{tx_item['_id']}", use_container_width=True,
+            on_click=_save_transaction, args=(transaction_model, tx_item)
+        )
     with col_cancel:
-        if st.button("❌ Cancel", key=f"cancel_{tx_item['_id']}", use_container_width=True):
-            st.session_state.editing_transaction = None
+        st.button(
+            "❌ Cancel", key=f"cancel_{tx_item['_id']}", use_container_width=True,
+            on_click=_set_editing, args=(None,)
+        )
+
+# -----------------------------
+# Bulk (grid) editor
+# -----------------------------
+GRID_PAGE_SIZE = 50
+
+def _grid_row_to_fields(row: dict) -> dict:
+    """Map edited grid cells to transaction fields"""
+    fields = {}
+    if "type" in row:
+        fields["type"] = row["type"]
+    if "category" in row:
+        fields["category"] = row["category"]
+    if "amount" in row and row["amount"] is not None:
+        fields["amount"] = float(row["amount"])
+    if row.get("date"):
+        fields["date"] = handler_datetime(row["date"])
+    if "description" in row:
+        fields["description"] = row["description"] or ""
+    return fields
+
+def _validate_grid_fields(fields: dict, categories: dict) -> str | None:
+    if fields.get("type") not in categories:
+        return "Type must be Expense or Income"
+    if fields.get("category") not in categories[fields["type"]]:
+        return f"Category '{fields.get('category')}' is not a {fields['type']} category"
+    if fields.get("amount") is None or fields["amount"] <= 0:
+        return "Amount must be greater than 0"
+    return None
+
+def _render_bulk_editor(transaction_model: TransactionModel, category_model, transactions: list[dict]):
+    # pandas only loads once grid mode is switched on
+    import pandas as pd
+
+    categories = {
+        t: [c['name'] for c in category_model.get_categories_by_type(t)]
+        for t in config.TRANSACTION_TYPES
+    }
+    all_categories = sorted({name for names in categories.values() for name in names})
+
+    page_count = max(1, -(-len(transactions) // GRID_PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="grid_page")
+    page_rows = transactions[(page - 1) * GRID_PAGE_SIZE: page * GRID_PAGE_SIZE]
+
+    columns = ["select", "id", "type", "category", "amount", "date", "description"]
+    original = pd.DataFrame([
+        {
+            "select": False,
+            "id": str(t['_id']),
+            "type": t.get('type'),
+            "category": t.get('category'),
+            "amount": float(t.get('amount', 0)),
+            "date": t['date'].date() if isinstance(t.get('date'), datetime) else t.get('date'),
+            "description": t.get('description', '')
+        }
+        for t in page_rows
+    ], columns=columns)
+
+    # New key after every apply so Streamlit drops the old edit state
+    editor_key = f"bulk_editor_{page}_{st.session_state.grid_nonce}"
+    edited = st.data_editor(
+        original,
+        key=editor_key,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        disabled=["id"],
+        column_config={
+            "select": st.column_config.CheckboxColumn("✔", default=False),
+            "id": None,  # hidden
+            "type": st.column_config.SelectboxColumn("Type", options=config.TRANSACTION_TYPES, required=True),
+            "category": st.column_config.SelectboxColumn("Category", options=all_categories, required=True),
+            "amount": st.column_config.NumberColumn("Amount", min_value=0.01, format="$%.2f", required=True),
+            "date": st.column_config.DateColumn("Date", required=True),
+            "description": st.column_config.TextColumn("Description"),
+        }
+    )
+
+    # ---- diff edits against the original page
+    state = st.session_state.get(editor_key, {})
+    errors, inserts, updates, deletes = [], [], {}, []
+
+    for idx, changes in state.get("edited_rows", {}).items():
+        changes = {k: v for k, v in changes.items() if k != "select"}
+        if not changes:
+            continue
+        base = original.iloc[int(idx)]
+        fields = _grid_row_to_fields(changes)
+        error = _validate_grid_fields({**base.to_dict(), **fields}, categories)
+        if error:
+            errors.append(f"Row {int(idx) + 1}: {error}")
+        updates[base["id"]] = fields
+
+    for row in state.get("added_rows", []):
+        fields = _grid_row_to_fields(row)
+        fields.setdefault("date", datetime.now())
+        error = _validate_grid_fields(fields, categories)
+        if error:
+            errors.append(f"New row: {error}")
+            continue
+        inserts.append({
+            "transaction_type": fields["type"],
+            "category": fields["category"],
+            "amount": fields["amount"],
+            "transaction_date": fields["date"],
+            "description": fields.get("description", "")
+        })
+
+    deletes = [original.iloc[int(idx)]["id"] for idx in state.get("deleted_rows", [])]
+
+    pending = len(inserts) + len(updates) + len(deletes)
+    if errors:
+        for error in errors:
+            st.error(error)
+
+    if st.button(f"💾 Apply {pending} change(s)", disabled=pending == 0 or bool(errors), type="primary"):
+        summary = transaction_model.bulk_apply(inserts=inserts, updates=updates, deletes=deletes)
+        st.toast(f"Saved: {summary['inserted']} added, {summary['updated']} updated, {summary['deleted']} deleted")
+        st.session_state.grid_nonce += 1
+        st.rerun()
+
+    # ---- bulk actions on selected rows
+    selected = edited[edited["select"] & edited["id"].notna()]
+    if selected.empty:
+        return
+
+    st.write(f"**{len(selected)} selected**")
+    col_recat, col_delete = st.columns(2)
+    with col_recat:
+        selected_types = selected["type"].unique().tolist()
+        if len(selected_types) == 1:
+            new_category = st.selectbox("Move to category", categories[selected_types[0]], key="bulk_recategorize")
+            if st.button("🏷️ Recategorize selected", use_container_width=True):
+                summary = transaction_model.bulk_apply(
+                    updates={tx_id: {"category": new_category} for tx_id in selected["id"]}
+                )
+                st.toast(f"Recategorized {summary['updated']} transaction(s)")
+                st.session_state.grid_nonce += 1
+                st.rerun()
+        else:
+            st.info("Select rows of one type to recategorize")
+    with col_delete:
+        if st.button("🗑️ Delete selected", use_container_width=True):
+            summary = transaction_model.bulk_apply(deletes=selected["id"].tolist())
+            st.toast(f"Deleted {summary['deleted']} transaction(s)")
+            st.session_state.grid_nonce += 1
             st.rerun()
 
 # -----------------------------
@@ -250,17 +458,24 @@ def initialize_session_state():
     if 'show_filters' not in st.session_state: st.session_state.show_filters = False
     if 'active_filters' not in st.session_state: st.session_state.active_filters = None
     if 'show_create_form' not in st.session_state: st.session_state.show_create_form = False
+    if 'create_form_key' not in st.session_state: st.session_state.create_form_key = None
     if 'editing_transaction' not in st.session_state: st.session_state.editing_transaction = None
+    if 'transaction_overrides' not in st.session_state: st.session_state.transaction_overrides = {}
+    if 'deleted_transactions' not in st.session_state: st.session_state.deleted_transactions = set()
+    if 'grid_mode' not in st.session_state: st.session_state.grid_mode = False
+    if 'grid_nonce' not in st.session_state: st.session_state.grid_nonce = 0
 
 # -----------------------------
 # Render list of transactions
 # -----------------------------
 def _render_list_transaction(transaction_model: TransactionModel, category_model):
     
-    # Get filtered transactions
-    transactions = transaction_model.get_transactions(
-        advanced_filters=st.session_state.active_filters
-    )
+    # Get filtered transactions (delta-synced: only rows changed since the last run are fetched)
+    transactions = synced_transactions(transaction_model, st.session_state.active_filters)
+
+    # A full run has fresh data; local patches from card fragments are no longer needed
+    st.session_state.transaction_overrides = {}
+    st.session_state.deleted_transactions = set()
     
     # Show transaction count
     if st.session_state.active_filters:
@@ -270,7 +485,9 @@ def _render_list_transaction(transaction_model: TransactionModel, category_model
     else:
         st.info(f"📊 Total: {len(transactions)} transaction(s)")
     
-    if not transactions:
+    if st.session_state.grid_mode:
+        _render_bulk_editor(transaction_model, category_model, transactions)
+    elif not transactions:
         if st.session_state.active_filters:
             st.warning("⚠️ No transactions match your filters. Try adjusting them or click 'Show All' above.")
         else:
@@ -296,18 +513,14 @@ def render_transactions(transaction_model, category_model):
     with col_create:
         if st.button("➕ ADD", use_container_width=True):
             st.session_state.show_create_form = not st.session_state.show_create_form
-            st.rerun()
     with col_filter:
         if st.button("🔍 Filters", use_container_width=True):
             st.session_state.show_filters = not st.session_state.show_filters
-            st.rerun()
    
-    if st.session_state.show_create_form:
-        _render_create_transaction_form(transaction_model, category_model)
-        st.divider()
-    
-    if st.session_state.show_filters:
-        _render_filters(transaction_model, category_model)
-        st.divider()
+    # Both panels are fragments and hide themselves when toggled off
+    _render_create_transaction_form(transaction_model, category_model)
+    _render_filters(transaction_model, category_model)
+
+    st.toggle("🧮 Grid edit mode", key="grid_mode")
     
     _render_list_transaction(transaction_model, category_model)
\ No newline at end of file
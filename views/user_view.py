@@ -109,15 +109,14 @@ def render_user_profile(user_model, user: dict):
                     with col2:
                         if st.button("Yes, Delete", type="primary", use_container_width=True, key="confirm_delete"):
                             try:
-                                # Perform cascade deletion
-                                result = user_model.delete_user_cascade(user['id'])
+                                # Schedule cascade deletion (runs in the background, login is blocked meanwhile)
+                                user_model.request_account_deletion(user['id'])
                                 
                                 # Show success message
                                 st.success(
-                                    f"✅ **Account Deleted**\n\n"
-                                    f"Deleted: {result['user']} user, "
-                                    f"{result['transactions']} transactions, "
-                                    f"{result['categories']} categories"
+                                    f"✅ **Account Deletion Scheduled**\n\n"
+                                    f"Your account and {summary['transactions']} transactions "
+                                    f"are being deleted. You will be logged out now."
                                 )
                                 
                                 # Wait a moment then logout